@@ -167,8 +167,75 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Общий для всех воркеров и переживающий рестарт кэш OpenGraph-данных.
+    # Circuit breaker и single-flight требуют атомарных add/incr между
+    # процессами: FileBasedCache их не даёт, в продакшене нужен Redis или
+    # Memcached (предупреждение lists.W001, см. lists/checks.py)
+    "og": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache", "og"),
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+}
+
+# OpenGraph enrichment (lists/og.py)
+OG_CACHE_ALIAS = "og"
+OG_CACHE_TTL = 60 * 60 * 24  # successful fetches are fresh this long...
+OG_CACHE_STALE_TTL = 60 * 60 * 24 * 7  # ...then kept this long for revalidation (ETag/304)
+OG_STALE_WHILE_REVALIDATE = True  # serve stale data at once and refresh in the background
+OG_REVALIDATE_WORKERS = 2  # background revalidation threads per process
+OG_CACHE_NEGATIVE_TTL = 60 * 5  # timeouts / errors
+OG_CACHE_BLOCKED_TTL = 60 * 15  # host answered 401/403/429/503
+OG_BATCH_MAX_WORKERS = 8  # parallel fetches per bulk add / import
+OG_BATCH_PER_HOST = 2  # parallel fetches against one shop
+OG_BATCH_DEADLINE = 25  # seconds for the whole batch
+OG_SESSION_POOL_SIZE = 32  # idle fetcher sessions kept per process
+OG_SESSION_PER_HOST = 4
+OG_SESSION_IDLE_TIMEOUT = 300  # seconds before an idle session is closed
+OG_MAX_HEAD_BYTES = 256 * 1024  # stop reading a page after </head> or this many bytes
+OG_MAX_BODY_BYTES = 4 * 1024 * 1024  # cap for pages parsed in full (Amazon)
+OG_PARSER_BACKEND = "auto"  # "lxml" if installed, else "html.parser"; see lists/og_extract.py
+OG_BREAKER_THRESHOLD = 5  # consecutive failures before a host's circuit opens
+OG_BREAKER_WINDOW = 60 * 5  # failure counter expires after this many quiet seconds
+OG_BREAKER_BASE_BACKOFF = 30  # first open period; doubles on each failed probe
+OG_BREAKER_MAX_BACKOFF = 60 * 60
+OG_BREAKER_PROBE_TIMEOUT = 30  # only one half-open probe per host in this window
+OG_FLIGHT_LOCK_TTL = 15  # cross-process fetch lock; also how long followers wait
+OG_FLIGHT_POLL_INTERVAL = 0.1  # how often followers in other processes re-check the cache
+OG_DEFERRED_ENRICHMENT = True  # create items as "pending"; `manage.py enrich_items` fills them
+OG_ENRICH_BATCH_SIZE = 50  # pending items per enrich_items batch
+
+# Local item thumbnails (lists/thumbnails.py), served from THUMB_URL with a far-future cache
+THUMB_ROOT = os.path.join(BASE_DIR, "media", "thumbs")
+THUMB_URL = "/thumbs/"
+THUMB_WIDTHS = (160, 320, 640)
+THUMB_MAX_SOURCE_BYTES = 15 * 1024 * 1024
+THUMB_MAX_WORKERS = 4
+
 LOG_DIR = "logs/"
 
+# Audit volume control (lists/audit.py). Keys are event names or "prefix.*".
+# Sampling keeps the given fraction; rate limits are (key, limit, window seconds),
+# keyed by "user_id", "wishlist_id" or a meta field. Suppressed counts are logged
+# as "audit.suppressed" records every AUDIT_SUMMARY_INTERVAL seconds.
+AUDIT_SAMPLING = {
+    "og.cache.*": 0.05,
+    "og.flight.join": 0.1,
+}
+AUDIT_RATE_LIMITS = {
+    # anonymous scanners share one key (user_id=None)
+    "access.denied": ("user_id", 30, 60),
+    "og.fetch.*": ("host", 120, 60),
+}
+AUDIT_SUMMARY_INTERVAL = 60
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -181,20 +248,35 @@ LOGGING = {
             "format": "{levelname}: {message}",
             "style": "{",
         },
+        # one JSON object per line: {"ts", "event", "user_id", "wishlist_id", "meta"}
+        "audit_json": {
+            "()": "lists.audit_logging.AuditJSONFormatter",
+        },
     },
     "handlers": {
+        # Non-blocking: records go through a queue to a writer thread; the rotating file
+        # is shared safely between worker processes (see lists/audit_logging.py)
         "wishlist_audit_file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": os.path.join(BASE_DIR, "logs", "wishlist_audit.log"),
+            "()": "lists.audit_logging.AuditQueueHandler",
+            "filename": os.path.join(BASE_DIR, "logs", "wishlist_audit.jsonl"),
             "encoding": "utf-8",
             "maxBytes": 1024 * 1024 * 5,
             "backupCount": 5,
-            "formatter": "verbose",
+            "queue_size": 10000,
+            "formatter": "audit_json",
+        },
+        # Buffered bulk INSERTs into lists.AuditEvent (the per-wishlist history page).
+        # OpenGraph chatter and events without a wishlist stay in the file only.
+        "wishlist_audit_db": {
+            "()": "lists.audit_logging.AuditDBHandler",
+            "batch_size": 50,
+            "max_age": 5,
+            "exclude_prefixes": ("og.",),
         },
     },
     "loggers": {
         "wishlist.audit": {
-            "handlers": ["wishlist_audit_file"],
+            "handlers": ["wishlist_audit_file", "wishlist_audit_db"],
             "level": "INFO",
             "propagate": False,
         },
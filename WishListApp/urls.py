@@ -25,6 +25,7 @@ from rest_framework.routers import DefaultRouter
 
 from lists.sitemaps import PublicWishlistSitemap
 from lists.views import ItemViewSet, WishlistViewSet
+from lists.views_front import thumbnail
 from profiles.views import PublicProfileView
 
 router = DefaultRouter()
@@ -58,6 +59,7 @@ urlpatterns = [
     path("accounts/", include("django.contrib.auth.urls")),
     path("accounts/", include("lists.accounts.urls")),
     path("robots.txt", robots_txt),
+    path("thumbs/<str:name>", thumbnail, name="thumbnail"),
     path(
         "sitemap.xml", sitemap, {"sitemaps": sitemaps}, name="django.contrib.sitemaps.views.sitemap"
     ),
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from lists.models import Item, Wishlist
+from lists.models import AuditEvent, Item, Wishlist
 
 # Register your models here.
 
@@ -14,7 +14,7 @@ class ItemInline(admin.TabularInline):
 
 @admin.register(Wishlist)
 class WishlistAdmin(admin.ModelAdmin):
-    list_display = ("id", "owner", "title", "is_public", "created_at")
+    list_display = ("id", "owner", "title", "is_public", "item_count", "created_at")
     search_fields = ("title", "owner__username", "owner__email")
     list_filter = ("is_public", "created_at")
     date_hierarchy = "created_at"
@@ -32,3 +32,19 @@ class ItemAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
     list_per_page = 50
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ("ts", "event", "user_id", "wishlist_id")
+    list_filter = ("event",)
+    search_fields = ("=wishlist_id", "=user_id")
+    ordering = ("-ts", "-id")
+    list_per_page = 50
+    show_full_result_count = False  # COUNT(*) по большой таблице на каждую страницу не нужен
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -6,6 +6,6 @@ class ListsConfig(AppConfig):
     name = "lists"
 
     def ready(self):
-        from . import signals
+        from . import checks, signals  # noqa: F401
 
         print(signals)
@@ -1,8 +1,31 @@
+import atexit
 import logging
+import random
+import threading
 import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import Model
+
+from .commit_buffer import CommitBuffer
 
 logger = logging.getLogger("wishlist.audit")
 
+# Подавленные семплированием и лимитами события (в пределах процесса):
+# {(event, scope): [sampled_out, rate_limited]}, раз в AUDIT_SUMMARY_INTERVAL
+# уходят в лог записью "audit.suppressed", так что суммарные количества
+# сходятся. scope — (поле meta, значение) из правила лимита, например
+# ("host", "ex.com"): анализатор видит, сколько og.fetch.* пропало по хосту.
+_suppressed = {}
+# Окна лимитов: {(шаблон правила, key): [начало окна, число событий]} — у
+# "og.fetch.*" одно окно на все og.fetch.ok/og.fetch.error/…
+_windows = {}
+SAMPLED_OUT, RATE_LIMITED = 0, 1
+_last_summary = time.monotonic()
+_lock = threading.Lock()
+_local = threading.local()
+
 
 def mask_token(token: str, keep=4):
     if not token:
@@ -10,13 +33,231 @@ def mask_token(token: str, keep=4):
     return token[:keep] + "…" + token[-keep:]
 
 
+def _plain(value):
+    # Модели в логе — только их id (signals передают, например, granted_to=instance.user)
+    return value.pk if isinstance(value, Model) else value
+
+
+def _rule(config: dict, event: str):
+    """
+    (шаблон, правило) для события: точное имя, затем "og.fetch.*", "og.*" и т.д.;
+    (None, None), если правила нет.
+    """
+    if event in config:
+        return event, config[event]
+    parts = event.split(".")
+    for i in range(len(parts) - 1, 0, -1):
+        pattern = ".".join(parts[:i]) + ".*"
+        rule = config.get(pattern)
+        if rule is not None:
+            return pattern, rule
+    return None, None
+
+
+def _limit_key(field: str, user, wishlist, meta):
+    if field == "user_id":
+        return getattr(user, "id", None)
+    if field == "wishlist_id":
+        return getattr(wishlist, "id", None)
+    return _plain(meta.get(field))
+
+
+def _admit(event: str, user, wishlist, meta) -> bool:
+    """
+    Пропустить ли событие через AUDIT_RATE_LIMITS и AUDIT_SAMPLING.
+    Лимит — фиксированное окно: не больше limit событий за window секунд на ключ
+    (например, access.denied на одного пользователя — анонимы делят один ключ);
+    все события под одним шаблоном правила делят одно окно.
+    """
+    reason = scope = None
+    pattern, limit_rule = _rule(getattr(settings, "AUDIT_RATE_LIMITS", {}), event)
+    _, rate = _rule(getattr(settings, "AUDIT_SAMPLING", {}), event)
+    now = time.monotonic()
+    with _lock:
+        if limit_rule is not None:
+            field, limit, window = limit_rule
+            key = (pattern, _limit_key(field, user, wishlist, meta))
+            if field not in ("user_id", "wishlist_id"):
+                scope = (field, key[1])
+            slot = _windows.setdefault(key, [now, 0])
+            if now - slot[0] >= window:
+                slot[0], slot[1] = now, 0
+            slot[1] += 1
+            if slot[1] > limit:
+                reason = RATE_LIMITED
+        if reason is None and rate is not None and random.random() >= rate:
+            reason = SAMPLED_OUT
+        if reason is not None:
+            _suppressed.setdefault((event, scope), [0, 0])[reason] += 1
+    return reason is None
+
+
+def flush_suppressed(force: bool = False):
+    """Записать сводки "audit.suppressed", если подошло время (или force)."""
+    global _last_summary
+    now = time.monotonic()
+    with _lock:
+        interval = getattr(settings, "AUDIT_SUMMARY_INTERVAL", 60)
+        if not force and now - _last_summary < interval:
+            return
+        period, _last_summary = now - _last_summary, now
+        counts = dict(_suppressed)
+        _suppressed.clear()
+        # устаревшие окна больше не нужны — не даём словарю расти от новых ключей
+        for key in [k for k, slot in _windows.items() if now - slot[0] >= interval]:
+            del _windows[key]
+    ts = round(time.time(), 3)
+    for (event, scope), (sampled_out, rate_limited) in counts.items():
+        meta = {"event": event}
+        if scope is not None:
+            meta[scope[0]] = scope[1]
+        meta.update(sampled_out=sampled_out, rate_limited=rate_limited, period_s=round(period, 1))
+        logger.info(
+            {
+                "ts": ts,
+                "event": "audit.suppressed",
+                "user_id": None,
+                "wishlist_id": None,
+                "meta": meta,
+            }
+        )
+
+
+atexit.register(flush_suppressed, force=True)
+
+
 def log_event(event: str, user, wishlist, **meta):
+    """
+    Записать audit-событие. Схема записи стабильна:
+    {"ts", "event", "user_id", "wishlist_id", "meta"}; в файл она пишется
+    JSON-строкой (см. lists.audit_logging.AuditJSONFormatter).
+    Шумные события семплируются и ограничиваются (AUDIT_SAMPLING, AUDIT_RATE_LIMITS).
+    """
+    if _suppressed or _windows:
+        flush_suppressed()
+    if not _admit(event, user, wishlist, meta):
+        return
+    if wishlist is not None:
+        meta.setdefault("wishlist_slug", getattr(wishlist, "slug", None))
     payload = {
-        "ts": int(time.time()),
+        "ts": round(time.time(), 3),
         "event": event,  # e.g. "share.generate", "share.revoke", "import.bulk", "public.view"
         "user_id": getattr(user, "id", None),
         "wishlist_id": getattr(wishlist, "id", None),
-        "wishlist_slug": getattr(wishlist, "slug", None),
+        "meta": {k: _plain(v) for k, v in meta.items()},
     }
-    payload.update(meta)
     logger.info(payload)
+
+
+@contextmanager
+def bulk_operation():
+    """
+    Заглушить события на каждый объект (lists.signals) в этом потоке — например,
+    на время queryset.delete(), который шлёт post_delete по каждой строке.
+    Вместо них вызывающий код пишет сводку через log_bulk_event.
+    """
+    depth = getattr(_local, "bulk_depth", 0)
+    _local.bulk_depth = depth + 1
+    try:
+        yield
+    finally:
+        _local.bulk_depth = depth
+
+
+def in_bulk_operation() -> bool:
+    return getattr(_local, "bulk_depth", 0) > 0
+
+
+def log_bulk_event(event: str, user, objects=None, wishlist=None, **meta):
+    """
+    Одна запись на пакет bulk_create / bulk_update / удаления: число объектов
+    и диапазон их id (objects — модели или id). Без objects — count и прочее
+    передаются в meta явно. Как и события сигналов, пишется после коммита:
+    сводка откаченного пакета в лог не попадает.
+    """
+    if objects is not None:
+        ids = [getattr(obj, "pk", obj) for obj in objects]
+        meta["count"] = len(ids)
+        ids = [pk for pk in ids if pk is not None]
+        if ids:
+            meta["id_min"], meta["id_max"] = min(ids), max(ids)
+    # свой key на каждую сводку — с другими событиями не склеивается
+    log_on_commit(("bulk", object()), event, user, wishlist, **meta)
+
+
+# --- События сигналов, отложенные до коммита -------------------------------
+#
+# log_on_commit копит события текущей транзакции (lists.commit_buffer) и пишет
+# их один раз после коммита, склеив по объекту: create + update -> один create
+# с итоговыми значениями, несколько update -> один diff, create + delete ->
+# ничего. События откаченных блоков (в том числе savepoint-ов) в пачку не
+# попадают: их колбэки Django выбрасывает сам.
+
+CREATE_ACTIONS = {"create", "grant"}
+DELETE_ACTIONS = {"delete", "revoke"}
+
+
+def _merge(contributions):
+    """Склеить события одного объекта в одно (или ни одного)."""
+    merged = None
+    for event, user, wishlist, meta in contributions:
+        action = event.rsplit(".", 1)[-1]
+        if merged is None:
+            merged = [event, user, wishlist, dict(meta)]
+            continue
+        prev_action = merged[0].rsplit(".", 1)[-1]
+        if action in DELETE_ACTIONS:
+            # объект, созданный в этой же транзакции, снаружи так и не появился
+            merged = None if prev_action in CREATE_ACTIONS else [event, user, wishlist, meta]
+            continue
+        merged[1] = user or merged[1]
+        changes = meta.get("changes")
+        if changes is None:
+            if "old" in merged[3] and "new" in meta:
+                merged[3]["new"] = meta["new"]
+            else:
+                merged[3].update(meta)
+        elif prev_action in CREATE_ACTIONS:
+            for name, change in changes.items():
+                if name in merged[3]:
+                    merged[3][name] = change["to"]
+        else:
+            combined = merged[3].setdefault("changes", {})
+            for name, change in changes.items():
+                first = combined.get(name, change)["from"]
+                combined[name] = {"from": first, "to": change["to"]}
+    if merged is not None:
+        meta = merged[3]
+        if "changes" in meta:
+            meta["changes"] = {k: v for k, v in meta["changes"].items() if v["from"] != v["to"]}
+            if not meta["changes"]:
+                return None
+        if "old" in meta and "new" in meta and meta["old"] == meta["new"]:
+            return None
+    return merged
+
+
+def _flush_events(entries):
+    from lists import audit_logging
+
+    by_key = {}
+    for key, *contribution in entries:
+        by_key.setdefault(key, []).append(contribution)
+    # все события транзакции — одной пачкой в БД (см. AuditDBHandler)
+    with audit_logging.hold_db_writes():
+        for contributions in by_key.values():
+            merged = _merge(contributions)
+            if merged is not None:
+                log_event(*merged[:3], **merged[3])
+
+
+_pending_events = CommitBuffer("audit_events", _flush_events, robust=True)
+
+
+def log_on_commit(key, event: str, user, wishlist, **meta):
+    """
+    log_event, отложенный до коммита текущей транзакции и склеенный с другими
+    событиями того же key (например, ("item", pk)). Вне транзакции — сразу.
+    """
+    if not _pending_events.add((key, event, user, wishlist, meta)):
+        log_event(event, user, wishlist, **meta)
@@ -0,0 +1,342 @@
+"""
+Обработчики логов для audit-событий (logger "wishlist.audit").
+
+AuditQueueHandler — то, что стоит в пути запроса: кладёт запись в
+ограниченную очередь и сразу возвращается. Пишет в файл отдельный поток
+(QueueListener) через ProcessSafeRotatingFileHandler. Если очередь
+переполнена, запись отбрасывается (поток запроса никогда не ждёт диск),
+а число потерь попадает в лог отдельной записью.
+
+ProcessSafeRotatingFileHandler — RotatingFileHandler, который можно делить
+между несколькими воркерами gunicorn: запись и ротация идут под flock на
+<file>.lock, а файл, уже повёрнутый другим процессом, открывается заново.
+
+AuditDBHandler — копит события вишлистов в памяти и пишет их в
+lists.AuditEvent одним bulk INSERT: когда набралось batch_size записей или
+после запроса, если буфер старше max_age секунд. Внутри транзакции запись
+откладывается до её коммита. Пишут только главный поток и потоки запросов:
+события из фоновых пулов ждут в общем буфере, пока его не заберёт один из них.
+
+AuditJSONFormatter — одна JSON-строка на событие (JSON lines) через orjson,
+если он установлен.
+"""
+
+import datetime
+import decimal
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from .commit_buffer import CommitBuffer
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: без межпроцессной блокировки
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+SCHEMA_KEYS = ("ts", "event", "user_id", "wishlist_id", "meta")
+
+
+def _default(value):
+    """Всё, что JSON не умеет сам: модели — в id, остальное — в строку."""
+    pk = getattr(getattr(value, "_meta", None), "pk", None)
+    if pk is not None:
+        return value.pk
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return str(value)
+
+
+def dumps(payload) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+class AuditJSONFormatter(logging.Formatter):
+    """Сериализует запись log_event как есть; прочие сообщения приводит к той же схеме."""
+
+    def format(self, record):
+        msg = record.msg
+        if isinstance(msg, dict) and set(msg) == set(SCHEMA_KEYS):
+            payload = msg
+        else:
+            meta = dict(msg) if isinstance(msg, dict) else {"message": record.getMessage()}
+            payload = {
+                "ts": round(record.created, 3),
+                "event": meta.pop("event", record.levelname.lower()),
+                "user_id": meta.pop("user_id", None),
+                "wishlist_id": meta.pop("wishlist_id", None),
+                "meta": meta,
+            }
+        if record.exc_info:
+            payload = dict(
+                payload, meta=dict(payload["meta"], exc=self.formatException(record.exc_info))
+            )
+        return dumps(payload)
+
+
+class ProcessSafeRotatingFileHandler(RotatingFileHandler):
+    def __init__(self, filename, mode="a", maxBytes=0, backupCount=0, encoding=None, delay=True):
+        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay)
+        self.lock_path = self.baseFilename + ".lock"
+
+    def emit(self, record):
+        if fcntl is None:
+            return super().emit(record)
+        try:
+            with open(self.lock_path, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    self._reopen_if_rotated()
+                    super().emit(record)
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        except OSError:
+            self.handleError(record)
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self.stream.fileno()).st_ino:
+            # другой процесс уже переименовал файл — пишем в новый, а не в архивный
+            self.stream.close()
+            self.stream = self._open()
+
+
+class AuditQueueHandler(QueueHandler):
+    """
+    Неблокирующий обработчик: параметры те же, что у RotatingFileHandler,
+    плюс queue_size — сколько записей может ждать записи на диск.
+    """
+
+    def __init__(
+        self, filename, maxBytes=0, backupCount=0, encoding=None, queue_size=10000, target=None
+    ):
+        self.target = target or ProcessSafeRotatingFileHandler(
+            filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding
+        )
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+        super().__init__(queue.Queue(queue_size))
+
+    def setFormatter(self, fmt):
+        # Форматирование — работа потока-писателя, не потока запроса
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Запись не покидает процесс, так что копировать и форматировать её заранее незачем
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            if not self._put(self._dropped_record(dropped)):
+                self.dropped += dropped
+        if not self._put(record):
+            self.dropped += 1
+
+    def _put(self, record) -> bool:
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            return False
+
+    @staticmethod
+    def _dropped_record(count):
+        msg = {"event": "audit.dropped", "count": count}
+        return logging.LogRecord("wishlist.audit", logging.WARNING, __file__, 0, msg, None, None)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # После fork поток-писатель родителя в дочернем процессе не существует
+            self.queue = queue.Queue(self.queue_size)
+            self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def flush(self, timeout=5.0):
+        """Дождаться (не дольше timeout), пока всё, что уже в очереди, будет записано."""
+        if self._listener is not None and self._pid == os.getpid():
+            deadline = time.monotonic() + timeout
+            while self.queue.unfinished_tasks and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.target.flush()
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+        self._listener = None
+        self._pid = None
+        self.target.close()
+        super().close()
+
+
+_db_handlers = weakref.WeakSet()
+# сброс буферов, отложенный до коммита: один на транзакцию, сколько бы раз
+# буфер ни заполнялся (см. lists.commit_buffer)
+_after_commit = CommitBuffer("audit_db_flush", lambda handlers: [h.flush() for h in set(handlers)])
+_hold = threading.local()
+_serving = threading.local()
+
+
+def _mark_request_thread(**kwargs):
+    _serving.requests = True
+
+
+def _may_write() -> bool:
+    """
+    Писать в БД из этого потока? Да — главный поток и потоки запросов: их
+    соединения закрывает цикл запроса. Поток пула (например, превью в
+    thumbnails.build_many) открыл бы соединение, которое никто не закроет.
+    """
+    return threading.current_thread() is threading.main_thread() or getattr(
+        _serving, "requests", False
+    )
+
+
+def flush_db():
+    """Записать в БД всё, что накопили AuditDBHandler процесса (например, перед чтением истории)."""
+    for handler in list(_db_handlers):
+        handler.flush()
+
+
+@contextmanager
+def hold_db_writes():
+    """
+    Не сбрасывать буфер по batch_size внутри блока: сколько бы событий ни
+    набралось, на выходе они уйдут одним bulk INSERT (или останутся ждать
+    обычного сброса, если batch_size не набран).
+    """
+    depth = getattr(_hold, "depth", 0)
+    _hold.depth = depth + 1
+    try:
+        yield
+    finally:
+        _hold.depth = depth
+        if not depth:
+            for handler in list(_db_handlers):
+                if len(handler._buffer) >= handler.batch_size:
+                    handler._flush_soon()
+
+
+class AuditDBHandler(logging.Handler):
+    """
+    Буферизованная запись событий в таблицу lists.AuditEvent.
+    exclude_prefixes — события, которые в БД не нужны (остаются только в файле);
+    события без wishlist_id история вишлиста не показывает — их тоже не пишем.
+    """
+
+    def __init__(self, batch_size=50, max_age=5.0, exclude_prefixes=(), level=logging.NOTSET):
+        super().__init__(level)
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.exclude_prefixes = tuple(exclude_prefixes)
+        self.failed = 0
+        self._buffer = []
+        self._first_at = None
+        self._pid = os.getpid()
+        self._buffer_lock = threading.Lock()
+        _db_handlers.add(self)
+
+        from django.core.signals import request_finished, request_started
+
+        request_started.connect(_mark_request_thread, dispatch_uid="audit_db_request_thread")
+        request_finished.connect(self._on_request_finished, weak=True)
+
+    def emit(self, record):
+        msg = record.msg
+        if not isinstance(msg, dict) or set(msg) != set(SCHEMA_KEYS):
+            return
+        if msg["wishlist_id"] is None or msg["event"].startswith(self.exclude_prefixes):
+            return
+        with self._buffer_lock:
+            if self._pid != os.getpid():
+                # буфер скопирован из родителя при fork — его запишет родитель
+                self._buffer, self._first_at, self._pid = [], None, os.getpid()
+            if not self._buffer:
+                self._first_at = time.monotonic()
+            self._buffer.append(msg)
+            full = len(self._buffer) >= self.batch_size
+        if full and not getattr(_hold, "depth", 0):
+            self._flush_soon()
+
+    def _on_request_finished(self, **kwargs):
+        with self._buffer_lock:
+            due = self._buffer and time.monotonic() - self._first_at >= self.max_age
+        if due:
+            self._flush_soon()
+
+    def _flush_soon(self):
+        if not _may_write():
+            return  # буфер общий: его запишет поток запроса или главный поток
+        # Не пишем посреди чужой транзакции: события уйдут в БД после её коммита
+        if not _after_commit.add(self):
+            self.flush()
+
+    def flush(self):
+        with self._buffer_lock:
+            batch, self._buffer, self._first_at = self._buffer, [], None
+            if self._pid != os.getpid():
+                batch, self._pid = [], os.getpid()
+        if not batch:
+            return
+        try:
+            from django.db import transaction
+
+            from lists.models import AuditEvent
+
+            rows = [self._to_row(AuditEvent, payload) for payload in batch]
+            # savepoint: неудачная вставка не ломает транзакцию вызывающего кода
+            with transaction.atomic():
+                AuditEvent.objects.bulk_create(rows)
+        except Exception:
+            # БД недоступна (или запрещена, как в SimpleTestCase) — события есть в файле
+            self.failed += len(batch)
+
+    @staticmethod
+    def _to_row(model, payload):
+        return model(
+            ts=datetime.datetime.fromtimestamp(payload["ts"], tz=datetime.timezone.utc),
+            event=payload["event"][:64],
+            user_id=payload["user_id"],
+            wishlist_id=payload["wishlist_id"],
+            # приводим meta к чистому JSON теми же правилами, что и в файле
+            meta=json.loads(dumps(payload["meta"] or {})),
+        )
+
+    def close(self):
+        self.flush()
+        _db_handlers.discard(self)
+        super().close()
@@ -0,0 +1,225 @@
+"""
+Потоковый разбор audit-лога (JSON lines, см. lists.audit_logging).
+
+Файлы читаются построчно, включая повёрнутые (<file>.1 … <file>.N) и сжатые
+gzip (<file>.N.gz). Память не зависит от длины лога: по событиям и хостам
+храним счётчики, а для времени загрузки — гистограмму с логарифмическими
+корзинами (перцентили с точностью ~2%). Растёт только топ вишлистов —
+по числу разных wishlist_id, а не строк.
+"""
+
+import gzip
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+    import json
+
+    _loads = json.loads
+
+ROTATED_RE = re.compile(r"\.(\d+)(\.gz)?$")
+PERCENTILES = (50, 90, 95, 99)
+
+
+def log_files(path) -> list:
+    """Текущий файл и все повёрнутые, от старых к новым."""
+    path = Path(path)
+    rotated = []
+    for candidate in path.parent.glob(path.name + ".*"):
+        m = ROTATED_RE.fullmatch(candidate.name[len(path.name) :])
+        if m:
+            rotated.append((int(m.group(1)), candidate))
+    files = [p for _, p in sorted(rotated, reverse=True)]
+    if path.exists():
+        files.append(path)
+    return files
+
+
+def _open(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_records(paths, errors: Counter = None, needles=()):
+    """
+    Записи из файлов по одной. Битые строки (например, оборванная при сбое) пропускаем.
+    needles — байтовые подстроки: строки без любой из них не разбираем вовсе.
+    """
+    search = re.compile(b"|".join(map(re.escape, needles))).search if needles else None
+    for path in paths:
+        with _open(Path(path)) as fh:
+            for line in fh:
+                if search is not None and search(line) is None:
+                    continue
+                if not line.strip():
+                    continue
+                try:
+                    record = _loads(line)
+                except ValueError:
+                    if errors is not None:
+                        errors["bad_lines"] += 1
+                    continue
+                if isinstance(record, dict):
+                    yield record
+
+
+class LatencyHistogram:
+    """До 64 мс — точные значения, дальше корзины шириной 2%."""
+
+    EXACT = 64
+    GROWTH = 1.02
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.max = 0
+
+    def _index(self, ms):
+        if ms < self.EXACT:
+            return int(ms) if ms > 0 else 0
+        return self.EXACT + int(math.log(ms / self.EXACT) / self._LOG_GROWTH)
+
+    def _upper(self, index):
+        if index < self.EXACT:
+            return index
+        return self.EXACT * self.GROWTH ** (index - self.EXACT + 1)
+
+    def add(self, ms):
+        index = self._index(ms)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return round(min(self._upper(index), self.max))
+        return self.max
+
+
+class AuditStats:
+    """
+    Агрегаты по записям: число событий (и подавленных семплированием — из
+    "audit.suppressed"), перцентили ms для og.fetch.* по хостам, топ вишлистов.
+    og.fetch.* ограничены лимитом по хосту, поэтому перцентили посчитаны по
+    неполной выборке — рядом с ними отдаём число подавленных по этому хосту.
+    event — учитывать только события с этим префиксом; since — только ts >= since.
+    """
+
+    def __init__(self, event: str = "", since: float = None):
+        self.event = event
+        self.since = since
+        self.events = Counter()
+        self.suppressed = Counter()
+        self.hosts = {}
+        self.hosts_suppressed = Counter()
+        self.wishlists = Counter()
+        self.errors = Counter()
+        self._kinds = {}
+        self.first_ts = None
+        self.last_ts = None
+
+    def _kind(self, event):
+        # (учитывать ли событие, это og.fetch.*) — считаем один раз на имя события
+        kind = self._kinds.get(event)
+        if kind is None:
+            kind = self._kinds[event] = (
+                event.startswith(self.event),
+                event.startswith("og.fetch."),
+            )
+        return kind
+
+    def add(self, record):
+        ts = record.get("ts")
+        if self.since is not None and (ts is None or ts < self.since):
+            return
+        event = record.get("event") or ""
+        if event == "audit.suppressed":
+            meta = record.get("meta") or {}
+            name = meta.get("event") or ""
+            if name.startswith(self.event):
+                count = meta.get("sampled_out", 0) + meta.get("rate_limited", 0)
+                self.suppressed[name] += count
+                if self._kind(name)[1]:
+                    self.hosts_suppressed[meta.get("host") or "unknown"] += count
+            return
+        wanted, is_fetch = self._kind(event)
+        if not wanted:
+            return
+
+        self.events[event] += 1
+        if ts is not None:
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+        wishlist_id = record.get("wishlist_id")
+        if wishlist_id is not None:
+            self.wishlists[wishlist_id] += 1
+        if is_fetch:
+            meta = record.get("meta") or {}
+            ms = meta.get("ms")
+            if isinstance(ms, (int, float)):
+                host = meta.get("host") or "unknown"
+                hist = self.hosts.get(host)
+                if hist is None:
+                    hist = self.hosts[host] = LatencyHistogram()
+                hist.add(ms)
+
+    def consume(self, paths):
+        # С фильтром по событию большинство строк отсеиваем без JSON-разбора
+        needles = (self.event.encode(), b"audit.suppressed") if self.event else ()
+        for record in iter_records(paths, self.errors, needles):
+            self.add(record)
+        return self
+
+    def _host_histograms(self):
+        # хост, все загрузки которого подавлены, тоже показываем — с пустой выборкой
+        for host in self.hosts_suppressed:
+            if host not in self.hosts:
+                self.hosts[host] = LatencyHistogram()
+        return self.hosts.items()
+
+    def to_dict(self, top: int = 10) -> dict:
+        names = sorted(set(self.events) | set(self.suppressed))
+        return {
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "bad_lines": self.errors["bad_lines"],
+            "events": {
+                name: {
+                    "logged": self.events[name],
+                    "suppressed": self.suppressed[name],
+                    "total": self.events[name] + self.suppressed[name],
+                }
+                for name in names
+            },
+            "hosts": {
+                host: dict(
+                    count=hist.count,
+                    suppressed=self.hosts_suppressed[host],
+                    **{f"p{p}": hist.percentile(p) for p in PERCENTILES},
+                    max=hist.max,
+                )
+                for host, hist in sorted(
+                    self._host_histograms(), key=lambda kv: kv[1].count, reverse=True
+                )
+            },
+            "top_wishlists": [
+                {"wishlist_id": wid, "events": n} for wid, n in self.wishlists.most_common(top)
+            ],
+        }
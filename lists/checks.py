@@ -0,0 +1,34 @@
+"""
+Проверки настроек при старте (manage.py check, runserver, migrate).
+"""
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Бэкенды, где add/incr атомарны между процессами; locmem атомарен внутри
+# процесса и другим процессам не виден вовсе, так что гонок между ними нет
+ATOMIC_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django_redis.cache.RedisCache",
+}
+
+
+@register()
+def og_cache_is_atomic(app_configs, **kwargs):
+    # Circuit breaker (счётчик отказов, проба) и single-flight (блокировка
+    # загрузки) полагаются на атомарные cache.add / cache.incr
+    alias = getattr(settings, "OG_CACHE_ALIAS", "default")
+    backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+    if backend in ATOMIC_CACHE_BACKENDS:
+        return []
+    return [
+        Warning(
+            f"OG cache {alias!r} uses {backend}, where add/incr are not atomic across processes.",
+            hint="Concurrent workers may miscount circuit breaker failures or fetch the same "
+            "URL twice. Use Redis or Memcached for this alias in production.",
+            id="lists.W001",
+        )
+    ]
@@ -0,0 +1,70 @@
+"""
+Буфер до коммита: значения, накопленные за транзакцию, обрабатываются одним
+вызовом после её коммита (одна пачка audit-событий, один UPDATE и т.п.).
+
+Каждое значение регистрирует обычный transaction.on_commit, который кладёт
+его в пачку. При откате savepoint-а или всей транзакции Django сам
+выбрасывает такие колбэки, поэтому в пачку попадает только закоммиченное.
+
+Следом за значением ставится обработчик пачки — тоже через on_commit, в тех
+же savepoint-ах. Новый обработчик отменяет прежние, если выполнится всегда,
+когда выполнятся они: его savepoint-ы — подмножество их savepoint-ов.
+Значения одного блока и вложенных в него savepoint-ов уходят одной пачкой;
+соседние savepoint-ы, у которых нет общего обработчика, — каждый своей.
+"""
+
+from django.db import transaction
+
+
+class CommitBuffer:
+    """
+    flush(values) — обработать значения одной транзакции в порядке добавления.
+    robust — как у transaction.on_commit: ошибка flush только логируется.
+    """
+
+    def __init__(self, name, flush, robust=False):
+        self.attr = f"_commit_buffer_{name}"
+        self.flush = flush
+        self.robust = robust
+
+    def add(self, value, using=None) -> bool:
+        """Отложить value до коммита. False — транзакции нет, value обрабатывает вызывающий."""
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            return False
+        batch = getattr(connection, self.attr, None)
+        if batch is None:
+            batch = _Batch(self, using)
+            setattr(connection, self.attr, batch)
+        transaction.on_commit(lambda: batch.values.append(value), using)
+        batch.schedule(frozenset(connection.savepoint_ids))
+        return True
+
+
+class _Batch:
+    def __init__(self, buffer, using):
+        self.buffer = buffer
+        self.using = using
+        self.values = []
+        # {обработчик: savepoint-ы, при откате которых Django его выбросит}
+        self.hooks = {}
+
+    def schedule(self, savepoints):
+        def hook():
+            self.run(hook)
+
+        self.hooks = {h: sps for h, sps in self.hooks.items() if not sps >= savepoints}
+        self.hooks[hook] = savepoints
+        transaction.on_commit(hook, self.using, robust=self.buffer.robust)
+
+    def run(self, hook):
+        if hook not in self.hooks:
+            return  # отменён более поздним обработчиком — пачку отдаст он
+        if next(reversed(self.hooks)) is hook:
+            # последний обработчик транзакции: следующая начнёт новую пачку
+            connection = transaction.get_connection(self.using)
+            if getattr(connection, self.buffer.attr, None) is self:
+                setattr(connection, self.buffer.attr, None)
+        values, self.values = self.values, []
+        if values:
+            self.buffer.flush(values)
@@ -0,0 +1,155 @@
+"""
+Денормализованная статистика вишлиста: item_count, purchased_count,
+reserved_count и суммы цен по валютам (WishlistPriceTotal).
+
+Одиночные изменения товаров приходят приращениями через F() в той же
+транзакции, что и сам товар: UPDATE ... SET item_count = item_count + 1 не
+теряет параллельные правки вишлиста. Прежний вклад товара Item.save/delete
+читают из БД с SELECT ... FOR UPDATE, а не из снимка при загрузке: две
+правки одного товара ждут друг друга и считают дельты от того, что реально
+записано. bulk_create передаёт дельты пачкой, а QuerySet.update/delete с
+непредсказуемым эффектом пересчитывают затронутые вишлисты целиком
+(recount) — GROUP BY по их товарам.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Item, Wishlist, WishlistPriceTotal
+
+COUNTERS = ("item_count", "purchased_count", "reserved_count")
+CENT = Decimal("0.01")
+
+
+def _amount(value):
+    # float из seed/OG превращаем в Decimal через str, иначе 12.49 → 12.4900000000000002…
+    return Decimal(str(value)).quantize(CENT)
+
+
+class Deltas:
+    """Накопитель изменений: строки товаров (Item.stats_row) со знаком +1/-1."""
+
+    def __init__(self):
+        self.counts = defaultdict(lambda: [0, 0, 0])
+        self.totals = defaultdict(Decimal)
+
+    def add(self, row, sign=1):
+        if row is None or row[0] is None:
+            return self
+        wishlist_id, purchased, reserved, currency, amount = row
+        counts = self.counts[wishlist_id]
+        counts[0] += sign
+        counts[1] += sign * bool(purchased)
+        counts[2] += sign * bool(reserved)
+        if amount is not None:
+            self.totals[(wishlist_id, currency or "")] += sign * _amount(amount)
+        return self
+
+    def apply(self):
+        for wishlist_id, counts in self.counts.items():
+            changes = {name: F(name) + d for name, d in zip(COUNTERS, counts) if d}
+            if changes:
+                Wishlist.objects.filter(pk=wishlist_id).update(**changes)
+        for (wishlist_id, currency), amount in self.totals.items():
+            if amount:
+                _add_total(wishlist_id, currency, amount)
+
+
+def _add_total(wishlist_id, currency, amount):
+    qs = WishlistPriceTotal.objects.filter(wishlist_id=wishlist_id, currency=currency)
+    if qs.update(amount=F("amount") + amount):
+        return
+    try:
+        with transaction.atomic():
+            WishlistPriceTotal.objects.create(
+                wishlist_id=wishlist_id, currency=currency, amount=amount
+            )
+    except IntegrityError:
+        qs.update(amount=F("amount") + amount)  # строку успел создать параллельный запрос
+
+
+def item_saved(before, after):
+    """Вклад товара до и после save(); before=None — строки в БД не было."""
+    if before == after:
+        return
+    Deltas().add(before, -1).add(after, +1).apply()
+
+
+def items_created(items):
+    deltas = Deltas()
+    for item in items:
+        deltas.add(item.stats_row())
+    deltas.apply()
+
+
+def recount(wishlist_ids, dry_run=False) -> list:
+    """
+    Пересчитать статистику вишлистов с нуля: два GROUP BY по их товарам.
+    Пишем только разошедшиеся; возвращаем их id.
+    """
+    ids = {pk for pk in wishlist_ids if pk is not None}
+    if not ids:
+        return []
+    with transaction.atomic():
+        wishlists = Wishlist.objects.filter(pk__in=ids).only("pk", *COUNTERS).order_by("pk")
+        if not dry_run:
+            # Сначала блокируем строки вишлистов: чужие F()-приращения подождут,
+            # а уже сделанные закоммитятся до наших агрегатов — ничего не потеряем
+            wishlists = wishlists.select_for_update()
+        wishlists = list(wishlists)
+        drifted = _drifted(wishlists, ids)
+        if drifted and not dry_run:
+            Wishlist.objects.bulk_update([w for w, _ in drifted], COUNTERS)
+            drifted_ids = [w.pk for w, _ in drifted]
+            WishlistPriceTotal.objects.filter(wishlist_id__in=drifted_ids).delete()
+            WishlistPriceTotal.objects.bulk_create(
+                WishlistPriceTotal(wishlist_id=w.pk, currency=currency, amount=amount)
+                for w, totals in drifted
+                for currency, amount in totals.items()
+            )
+    return [w.pk for w, _ in drifted]
+
+
+def _drifted(wishlists, ids) -> list:
+    """[(вишлист с уже исправленными счётчиками, {валюта: сумма}), …] для разошедшихся."""
+    actual = {
+        row["wishlist_id"]: (row["items"], row["purchased"], row["reserved"])
+        for row in Item.objects.filter(wishlist_id__in=ids)
+        .values("wishlist_id")
+        .annotate(
+            items=Count("id"),
+            purchased=Count("id", filter=Q(is_purchased=True)),
+            reserved=Count("id", filter=Q(is_reserved=True)),
+        )
+        .order_by()
+    }
+    totals = defaultdict(dict)
+    for row in (
+        Item.objects.filter(wishlist_id__in=ids, price_amount__isnull=False)
+        .values("wishlist_id", "price_currency")
+        .annotate(amount=Sum("price_amount"))
+        .order_by()
+    ):
+        if row["amount"]:
+            totals[row["wishlist_id"]][row["price_currency"]] = _amount(row["amount"])
+    stored = defaultdict(dict)
+    for wishlist_id, currency, amount in WishlistPriceTotal.objects.filter(
+        wishlist_id__in=ids
+    ).values_list("wishlist_id", "currency", "amount"):
+        if amount:
+            stored[wishlist_id][currency] = _amount(amount)
+
+    drifted = []
+    for wishlist in wishlists:
+        counts = actual.get(wishlist.pk, (0, 0, 0))
+        if (
+            tuple(getattr(wishlist, name) for name in COUNTERS) != counts
+            or stored[wishlist.pk] != totals[wishlist.pk]
+        ):
+            for name, value in zip(COUNTERS, counts):
+                setattr(wishlist, name, value)
+            drifted.append((wishlist, totals[wishlist.pk]))
+    return drifted
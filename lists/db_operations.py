@@ -0,0 +1,43 @@
+"""
+Операции миграций для живых таблиц.
+
+AddIndexConcurrently — AddIndex, который в PostgreSQL строит индекс через
+CREATE INDEX CONCURRENTLY: запись в таблицу не блокируется на всё время
+построения. Миграция с такой операцией должна быть atomic = False
+(CONCURRENTLY не работает внутри транзакции). Остальные СУБД получают
+обычный AddIndex.
+
+Своя операция, а не django.contrib.postgres.operations: та требует psycopg
+уже при импорте, а миграции загружаются и в тестах на SQLite.
+"""
+
+from django.db import NotSupportedError, migrations
+
+
+def _concurrently(schema_editor) -> bool:
+    if schema_editor.connection.vendor != "postgresql":
+        return False
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError("CREATE INDEX CONCURRENTLY needs a migration with atomic = False.")
+    return True
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    atomic = False
+
+    def describe(self):
+        return f"Concurrently create index {self.index.name} on {self.model_name}"
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
@@ -0,0 +1,145 @@
+"""
+Локальный стенд вместо живых магазинов — для бенчмарков и тестов загрузчика.
+
+Отдаёт страницы из корпуса (по умолчанию lists/tests/fixtures/og) по пути
+/p/<имя файла без .html> с настраиваемой задержкой, кодами ответа и размером
+тела. Работает и как HTTP-прокси: запрос к http://www.amazon.bench/p/amazon_product
+через HTTP_PROXY=http://127.0.0.1:<port> придёт сюда с нужным Host, так что
+проверки вида "amazon." in host срабатывают без DNS.
+
+Параметры запроса переопределяют настройки сервера для одного ответа:
+?latency=<ms>&status=<code>&pad=<bytes>.
+"""
+
+import hashlib
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "tests" / "fixtures" / "og"
+
+
+def parse_status_mix(spec: str):
+    """ "200:90,403:5,503:5" -> [(200, 90), (403, 5), (503, 5)]."""
+    mix = []
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        code, _, weight = part.partition(":")
+        mix.append((int(code), int(weight or 1)))
+    return mix or [(200, 1)]
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        corpus=DEFAULT_CORPUS,
+        host="127.0.0.1",
+        port=0,
+        latency_ms=0,
+        jitter_ms=0,
+        status_mix="200:1",
+        pad_bytes=0,
+        seed=None,
+    ):
+        super().__init__((host, port), _Handler)
+        self.pages = {p.stem: p.read_bytes() for p in sorted(Path(corpus).glob("*.html"))}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.status_mix = parse_status_mix(status_mix)
+        self.pad_bytes = pad_bytes
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle_error(self, request, client_address):
+        # загрузчик рвёт keep-alive соединения, дочитав <head>, — это не ошибка стенда
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def pick_status(self) -> int:
+        codes, weights = zip(*self.status_mix)
+        with self._lock:
+            return self.random.choices(codes, weights)[0]
+
+    def pick_latency(self) -> float:
+        with self._lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)  # в режиме прокси path абсолютный
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        server.count()
+
+        status = int(query["status"]) if "status" in query else server.pick_status()
+        if "latency" in query:
+            delay = float(query["latency"]) / 1000
+        else:
+            delay = server.pick_latency()
+        if delay:
+            time.sleep(delay)
+
+        name = parts.path.rstrip("/").rsplit("/", 1)[-1]
+        page = server.pages.get(name)
+        if page is None:
+            status = 404
+        if status != 200:
+            return self._send(status, b"<html><head><title>Error</title></head></html>")
+
+        pad = int(query.get("pad", server.pad_bytes))
+        body = page + (b"<!--" + b"x" * pad + b"-->" if pad else b"")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", etag=etag)
+        self._send(200, body, etag=etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # загрузчик закрыл соединение после </head> — это нормально
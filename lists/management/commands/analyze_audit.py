@@ -0,0 +1,103 @@
+import datetime
+import json
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lists.audit_stats import PERCENTILES, AuditStats, log_files
+
+SINCE_RE = re.compile(r"^(\d+)([smhd])$")
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_since(value: str) -> float:
+    """'7d', '12h', '30m' — относительно текущего момента, иначе ISO-дата или дата-время."""
+    m = SINCE_RE.match(value)
+    if m:
+        return time.time() - int(m.group(1)) * UNITS[m.group(2)]
+    try:
+        dt = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Bad --since value: {value!r} (use 7d, 12h or an ISO date).")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def _default_log_path():
+    handler = settings.LOGGING.get("handlers", {}).get("wishlist_audit_file", {})
+    return handler.get("filename")
+
+
+class Command(BaseCommand):
+    help = (
+        "Aggregate the audit log (current and rotated files, gzip included): event counts, "
+        "OpenGraph fetch latency percentiles per host and the busiest wishlists."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="Log files. Default: the wishlist_audit_file log and its rotated copies.",
+        )
+        parser.add_argument("--event", default="", help='Only events with this prefix, e.g. "og."')
+        parser.add_argument("--since", help="Only records newer than 7d / 12h / 30m or ISO date.")
+        parser.add_argument("--top", type=int, default=10, help="Rows in top lists.")
+        parser.add_argument("--format", choices=("table", "json"), default="table")
+
+    def handle(self, *args, **opts):
+        if opts["paths"]:
+            paths = opts["paths"]
+        else:
+            base = _default_log_path()
+            if not base:
+                raise CommandError("No audit log configured; pass file paths explicitly.")
+            paths = log_files(base)
+        if not paths:
+            raise CommandError("No audit log files found.")
+
+        since = parse_since(opts["since"]) if opts["since"] else None
+        started = time.perf_counter()
+        stats = AuditStats(event=opts["event"], since=since).consume(paths)
+        result = stats.to_dict(top=opts["top"])
+        result["files"] = [str(p) for p in paths]
+        result["seconds"] = round(time.perf_counter() - started, 3)
+
+        if opts["format"] == "json":
+            self.stdout.write(json.dumps(result, indent=2, ensure_ascii=False))
+            return
+        self._print_table(result, opts["top"])
+
+    def _print_table(self, result, top):
+        events = result["events"]
+        total = sum(row["logged"] for row in events.values())
+        self.stdout.write(
+            f"{total} records from {len(result['files'])} file(s) in {result['seconds']}s"
+            + (f", {result['bad_lines']} unreadable lines" if result["bad_lines"] else "")
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nEvents"))
+        self.stdout.write(f"{'event':<32} {'logged':>10} {'suppressed':>10} {'total':>10}")
+        for name, row in sorted(events.items(), key=lambda kv: kv[1]["total"], reverse=True):
+            self.stdout.write(
+                f"{name:<32} {row['logged']:>10} {row['suppressed']:>10} {row['total']:>10}"
+            )
+
+        if result["hosts"]:
+            # suppressed — загрузки, выпавшие из выборки по лимиту AUDIT_RATE_LIMITS
+            self.stdout.write(self.style.MIGRATE_HEADING("\nog.fetch latency, ms"))
+            cols = "".join(f"{'p' + str(p):>8}" for p in PERCENTILES)
+            self.stdout.write(f"{'host':<32} {'count':>8} {'suppressed':>10}{cols}{'max':>8}")
+            for host, row in list(result["hosts"].items())[:top]:
+                values = "".join(f"{row['p' + str(p)]:>8}" for p in PERCENTILES)
+                self.stdout.write(
+                    f"{host:<32} {row['count']:>8} {row['suppressed']:>10}{values}{row['max']:>8}"
+                )
+
+        if result["top_wishlists"]:
+            self.stdout.write(self.style.MIGRATE_HEADING("\nTop wishlists"))
+            for row in result["top_wishlists"]:
+                self.stdout.write(f"{row['wishlist_id']:>10} {row['events']:>10}")
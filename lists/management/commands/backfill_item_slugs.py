@@ -1,10 +1,7 @@
-from collections import defaultdict
-
 from django.core.management.base import BaseCommand
 
-# from django.utils.text import slugify
-from slugify import slugify
-
+from lists import slugs
+from lists.audit import log_bulk_event
 from lists.models import Item
 
 
@@ -12,34 +9,35 @@ class Command(BaseCommand):
     help = "Backfill missing Item.slug values, unique per wishlist."
 
     def handle(self, *args, **kwargs):
-        used = defaultdict(set)
         qs = Item.objects.all().only("id", "wishlist_id", "title", "slug")
 
-        # preload existing
-        for wid, slug in (
-            qs.exclude(slug="").exclude(slug__isnull=True).values_list("wishlist_id", "slug")
-        ):
-            used[wid].add(slug)
-
         batch = []
         for item in qs.filter(slug__isnull=True) | qs.filter(slug=""):
-            base = (slugify(item.title or "") or "item")[:200]
-            slug = base
-            i = 1
-            while slug in used[item.wishlist_id]:
-                i += 1
-                suffix = f"-{i}"
-                slug = (base[: 220 - len(suffix)]) + suffix
-            item.slug = slug
-            used[item.wishlist_id].add(slug)
+            item.slug = None
             batch.append(item)
             if len(batch) >= 2000:
-                Item.objects.bulk_update(batch, ["slug"])
+                self._flush(batch)
                 self.stdout.write(f"Updated {len(batch)} items…")
                 batch.clear()
 
         if batch:
-            Item.objects.bulk_update(batch, ["slug"])
+            self._flush(batch)
             self.stdout.write(f"Updated {len(batch)} items.")
 
         self.stdout.write(self.style.SUCCESS("Backfill complete."))
+
+    def _flush(self, batch):
+        # занятые слаги подтягиваются по префиксам пакета, а не всей таблицей
+        slugs.assign(batch)
+        Item.objects.bulk_update(batch, ["slug"])
+        self._audit(batch)
+
+    def _audit(self, batch):
+        log_bulk_event(
+            "item.bulk_update",
+            None,
+            batch,
+            source="backfill_item_slugs",
+            fields=["slug"],
+            wishlists=len({item.wishlist_id for item in batch}),
+        )
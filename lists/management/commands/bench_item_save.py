@@ -0,0 +1,85 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from lists.audit import bulk_operation
+from lists.models import Item, Wishlist
+
+MODES = (Item.VALIDATE_FULL, Item.VALIDATE_FAST)
+BENCH_USER = "bench-item-save"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark Item.save() validation modes: queries and CPU time per create and update. "
+        "Saves run outside a transaction, as in a request; the bench user and its "
+        "wishlists are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=500, help="Saves per mode and operation.")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **opts):
+        results = []
+        users = get_user_model().objects
+        # строки бенча временные — ни создание, ни удаление в audit-лог не пишем
+        with bulk_operation():
+            users.filter(username=BENCH_USER).delete()  # остатки прерванного прогона
+            owner = users.create_user(BENCH_USER, email=f"{BENCH_USER}@example.invalid")
+            try:
+                for mode in MODES:
+                    wishlist = Wishlist.objects.create(owner=owner, title=f"bench {mode}")
+                    items = [
+                        Item(
+                            wishlist=wishlist,
+                            url=f"https://shop.example/p/{i}",
+                            title=f"Item {i}",
+                            created_by=owner,
+                        )
+                        for i in range(opts["items"])
+                    ]
+                    results.append(self._measure("create", mode, items))
+                    for item in items:
+                        item.title = f"{item.title} v2"
+                    results.append(self._measure("update", mode, items))
+            finally:
+                owner.delete()
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'operation':<10} {'mode':<6} {'saves':>6} {'queries/save':>13} "
+            f"{'cpu µs/save':>12} {'saves/s':>9}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['operation']:<10} {r['mode']:<6} {r['saves']:>6} "
+                f"{r['queries_per_save']:>13.2f} {r['cpu_us_per_save']:>12.0f} "
+                f"{r['saves_per_s']:>9.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    @staticmethod
+    def _measure(operation, mode, items):
+        with CaptureQueriesContext(connection) as ctx:
+            cpu = time.process_time()
+            wall = time.perf_counter()
+            for item in items:
+                item.save(validation=mode)
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+        saves = len(items)
+        return {
+            "operation": operation,
+            "mode": mode,
+            "saves": saves,
+            "queries_per_save": round(len(ctx.captured_queries) / saves, 2),
+            "cpu_us_per_save": round(cpu / saves * 1e6),
+            "saves_per_s": round(saves / wall, 1) if wall else 0.0,
+        }
@@ -0,0 +1,179 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+from bs4 import BeautifulSoup
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from lists import og, og_batch, og_sessions
+
+from ._og_standin import DEFAULT_CORPUS, StandinServer
+
+SCENARIOS = ("fetch", "amazon", "bulk")
+
+
+def percentile(sorted_values, p):
+    """Перцентиль методом ближайшего ранга по отсортированному списку."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+@contextmanager
+def _proxied(server):
+    """Все http:// запросы процесса — на стенд (requests берёт прокси из окружения)."""
+    env = {"HTTP_PROXY": server.url, "http_proxy": server.url, "NO_PROXY": "", "no_proxy": ""}
+    with mock.patch.dict(os.environ, env):
+        og_sessions.get_pool().clear()
+        try:
+            yield
+        finally:
+            og_sessions.get_pool().clear()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark OpenGraph enrichment (enrich_from_url, _enrich_amazon, bulk add) against "
+        "a local stand-in server replaying the HTML corpus."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", type=str, default=str(DEFAULT_CORPUS))
+        parser.add_argument("--scenario", action="append", choices=SCENARIOS)
+        parser.add_argument("--requests", type=int, default=60, help="Operations per scenario.")
+        parser.add_argument("--latency", type=float, default=50, help="Server latency, ms.")
+        parser.add_argument("--jitter", type=float, default=10, help="Latency jitter, ms.")
+        parser.add_argument(
+            "--status-mix", default="200:1", help='Weighted statuses, e.g. "200:90,503:10".'
+        )
+        parser.add_argument("--pad", type=int, default=0, help="Extra bytes after </html>.")
+        parser.add_argument("--hosts", type=int, default=4, help="Distinct shop hosts.")
+        parser.add_argument("--bulk-size", type=int, default=40, help="URLs per bulk-add batch.")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **opts):
+        corpus = Path(opts["corpus"])
+        names = sorted(p.stem for p in corpus.glob("*.html"))
+        if not names:
+            raise CommandError(f"No *.html files found in {corpus}.")
+        self.names = names
+        self.corpus = corpus
+        self.opts = opts
+
+        server = StandinServer(
+            corpus=corpus,
+            latency_ms=opts["latency"],
+            jitter_ms=opts["jitter"],
+            status_mix=opts["status_mix"],
+            pad_bytes=opts["pad"],
+            seed=1,
+        )
+        results = []
+        # Отдельный кэш, чтобы не трогать общий OG-кэш и состояние breaker-ов
+        with server, _proxied(server), override_settings(OG_CACHE_ALIAS="default"):
+            for scenario in opts["scenario"] or SCENARIOS:
+                run = getattr(self, f"_run_{scenario}")
+                caches["default"].clear()
+                latencies, ops, elapsed = run(opts["requests"])
+                caches["default"].clear()
+                peak = self._peak_memory(run)
+                results.append(self._summary(scenario, latencies, ops, elapsed, peak))
+            requests_served = server.requests
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"Stand-in: latency={opts['latency']}±{opts['jitter']} ms, "
+                f"status mix={opts['status_mix']}, pad={opts['pad']} B, "
+                f"{requests_served} requests served"
+            )
+        )
+        self.stdout.write(
+            f"{'scenario':<8} {'ops':>5} {'total s':>8} {'ops/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'peak MB':>8}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['scenario']:<8} {r['ops']:>5} {r['total_s']:>8.2f} {r['ops_per_s']:>8.1f} "
+                f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['peak_mb']:>8.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    # --- сценарии: возвращают (задержки в мс, число операций, общее время) ---
+
+    def _urls(self, count, offset=0):
+        urls = []
+        for i in range(offset, offset + count):
+            name = self.names[i % len(self.names)]
+            host = (
+                "www.amazon.bench"
+                if name.startswith("amazon")
+                else f"shop{i % self.opts['hosts']}.bench"
+            )
+            urls.append(f"http://{host}/p/{name}?n={i}")
+        return urls
+
+    def _run_fetch(self, count):
+        latencies = []
+        started = time.perf_counter()
+        for url in self._urls(count):
+            t = time.perf_counter()
+            og.enrich_from_url(url, use_cache=False)
+            latencies.append((time.perf_counter() - t) * 1000)
+        return latencies, count, time.perf_counter() - started
+
+    def _run_amazon(self, count):
+        pages = [n for n in self.names if n.startswith("amazon")] or self.names
+        htmls = [(self.corpus / f"{n}.html").read_text(encoding="utf-8") for n in pages]
+        latencies = []
+        started = time.perf_counter()
+        for i in range(count):
+            t = time.perf_counter()
+            og._enrich_amazon(BeautifulSoup(htmls[i % len(htmls)], "html.parser"), "https://a/")
+            latencies.append((time.perf_counter() - t) * 1000)
+        return latencies, count, time.perf_counter() - started
+
+    def _run_bulk(self, count):
+        size = self.opts["bulk_size"]
+        latencies = []
+        started = time.perf_counter()
+        done = 0
+        while done < count:
+            urls = self._urls(min(size, count - done), offset=done)
+            t = time.perf_counter()
+            og_batch.enrich_many(urls)
+            latencies.append((time.perf_counter() - t) * 1000)
+            done += len(urls)
+        return latencies, done, time.perf_counter() - started
+
+    def _peak_memory(self, run):
+        """Отдельный короткий прогон под tracemalloc: он сам замедляет код в разы."""
+        tracemalloc.start()
+        try:
+            run(min(self.opts["requests"], self.opts["bulk_size"], 20))
+            return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+            caches["default"].clear()
+
+    @staticmethod
+    def _summary(scenario, latencies, ops, elapsed, peak_mb):
+        latencies = sorted(latencies)
+        return {
+            "scenario": scenario,
+            "ops": ops,
+            "total_s": round(elapsed, 3),
+            "ops_per_s": round(ops / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "peak_mb": round(peak_mb, 1),
+        }
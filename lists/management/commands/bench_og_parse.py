@@ -0,0 +1,84 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lists import og_extract
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "tests" / "fixtures" / "og"
+
+
+class Command(BaseCommand):
+    help = "Benchmark OpenGraph metadata extraction backends over a corpus of saved HTML pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--corpus",
+            type=str,
+            default=str(DEFAULT_CORPUS),
+            help="Directory with *.html pages (default: lists/tests/fixtures/og).",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="How many times to parse each page."
+        )
+        parser.add_argument(
+            "--backend",
+            action="append",
+            choices=sorted(og_extract.BACKENDS),
+            help="Backend(s) to measure (default: all available).",
+        )
+        parser.add_argument(
+            "--head-only",
+            action="store_true",
+            help="Parse only the prefix up to </head>, like the streaming fetcher does.",
+        )
+
+    def handle(self, *args, **opts):
+        corpus = Path(opts["corpus"])
+        pages = sorted(corpus.glob("*.html"))
+        if not pages:
+            raise CommandError(f"No *.html files found in {corpus}.")
+
+        docs = []
+        for p in pages:
+            html = p.read_text(encoding="utf-8", errors="replace")
+            if opts["head_only"]:
+                end = html.lower().find("</head>")
+                html = html[: end + 7] if end != -1 else html
+            docs.append((p.name, html))
+
+        backends = opts["backend"] or sorted(og_extract.BACKENDS)
+        repeat = opts["repeat"]
+        url = "https://shop.example.com/product/1"
+        total_kb = sum(len(h.encode()) for _, h in docs) / 1024
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"Corpus: {len(docs)} pages, {total_kb:.0f} KB, repeat={repeat}"
+            )
+        )
+
+        reference = {name: og_extract.extract(html, url, backend="bs4") for name, html in docs}
+        timings = {}
+        for backend in backends:
+            mismatches = [
+                name
+                for name, html in docs
+                if og_extract.extract(html, url, backend=backend) != reference[name]
+            ]
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for _, html in docs:
+                    og_extract.extract(html, url, backend=backend)
+            elapsed = time.perf_counter() - started
+            timings[backend] = elapsed
+            per_page = elapsed / (repeat * len(docs)) * 1000
+            line = f"{backend:<12} total={elapsed:8.3f}s  per page={per_page:8.3f} ms"
+            if "bs4" in timings and backend != "bs4":
+                line += f"  speedup x{timings['bs4'] / elapsed:.1f}"
+            self.stdout.write(line)
+            if mismatches:
+                self.stdout.write(
+                    self.style.ERROR(f"  output differs from bs4 on: {', '.join(mismatches)}")
+                )
+
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from lists.models import Item
+from lists.thumbnails import build_many
+
+
+class Command(BaseCommand):
+    help = "Download item images and build local WebP/JPEG thumbnails (backfill)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=None, help="Parallel downloads.")
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Also retry images whose previous build failed.",
+        )
+
+    def handle(self, *args, **opts):
+        qs = Item.objects.exclude(image_url="").only("id", "image_url", "thumb_key", "thumb_source")
+        if opts["retry_failed"]:
+            qs = qs.exclude(thumb_source=F("image_url"), thumb_key__gt="")
+        else:
+            qs = qs.exclude(thumb_source=F("image_url"))
+
+        built = failed = 0
+        last_pk = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk).order_by("pk")[: opts["batch_size"]])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            ok = build_many(batch, max_workers=opts["workers"])
+            built += ok
+            failed += len(batch) - ok
+            self.stdout.write(f"Processed {built + failed} items…")
+
+        self.stdout.write(self.style.SUCCESS(f"Thumbnails built: {built}, failed: {failed}."))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lists.models import Item
+from lists.og_worker import drain
+
+
+class Command(BaseCommand):
+    help = "Fill title/image of items waiting for OpenGraph enrichment (status 'pending')."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=None, help="Items per batch (OG_ENRICH_BATCH_SIZE)."
+        )
+        parser.add_argument(
+            "--limit", type=int, default=None, help="Stop after this many items per pass."
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and poll for new pending items.",
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=5.0, help="Seconds between passes with --loop."
+        )
+
+    def handle(self, *args, **opts):
+        while True:
+            totals = drain(batch_size=opts["batch_size"], limit=opts["limit"])
+            if totals:
+                summary = ", ".join(f"{k}={v}" for k, v in sorted(totals.items()))
+                self.stdout.write(f"Enriched {sum(totals.values())} items: {summary}")
+            if not opts["loop"]:
+                break
+            time.sleep(opts["sleep"])
+
+        left = Item.objects.filter(enrichment_status=Item.ENRICH_PENDING).count()
+        self.stdout.write(self.style.SUCCESS(f"Done. Still pending: {left}."))
@@ -0,0 +1,110 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from lists.models import Item, Wishlist, WishlistAccess
+
+
+def hot_queries(owner_id, wishlist_id, user_id):
+    """Запросы списочных страниц в том виде, в каком их строят представления."""
+    mine = Wishlist.objects.filter(owner_id=owner_id)
+    public = Wishlist.objects.filter(owner_id=owner_id, is_public=True)
+    return {
+        "my_lists": mine.order_by("-created_at")[:8],
+        "my_lists_by_title": mine.order_by("title")[:8],
+        "public_profile": public.order_by("-created_at")[:8],
+        "sitemap": Wishlist.objects.filter(is_public=True).order_by()[:1000],
+        "shared_with_me": Wishlist.objects.filter(accesses__user_id=user_id)
+        .select_related("owner")
+        .order_by("-created_at")
+        .distinct()[:8],
+        "items_page": Item.objects.filter(wishlist_id=wishlist_id).order_by("created_at", "pk")[:8],
+        "items_last_page": Item.objects.filter(wishlist_id=wishlist_id).order_by(
+            "created_at", "pk"
+        )[200:208],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN and time the list-page queries (my wishlists, public profile, sitemap, "
+        "shared with me, items page) for the busiest owner, wishlist and grantee. "
+        "Plans and timings are only as good as the database they come from: "
+        "run it against PostgreSQL before drawing conclusions for production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50, help="Runs per query.")
+        parser.add_argument("--query", action="append", help="Only these queries.")
+        parser.add_argument("--explain", action="store_true", help="Print query plans.")
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="EXPLAIN ANALYZE: plans with actual rows and timings (PostgreSQL only).",
+        )
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **opts):
+        owner = Wishlist.objects.values("owner_id").annotate(n=Count("id")).order_by("-n").first()
+        wishlist = Wishlist.objects.order_by("-item_count").values("pk", "item_count").first()
+        grantee = (
+            WishlistAccess.objects.values("user_id").annotate(n=Count("id")).order_by("-n").first()
+        )
+        if not owner or not wishlist:
+            raise CommandError("No data: seed it first (manage.py seed_wishlist).")
+        postgres = connection.vendor == "postgresql"
+        if opts["analyze"] and not postgres:
+            raise CommandError(f"--analyze needs PostgreSQL, not {connection.vendor}.")
+        explain = {"analyze": True, "buffers": True} if opts["analyze"] else {}
+
+        queries = hot_queries(
+            owner["owner_id"], wishlist["pk"], grantee["user_id"] if grantee else None
+        )
+        results = []
+        for name, qs in queries.items():
+            if opts["query"] and name not in opts["query"]:
+                continue
+            timings = []
+            for _ in range(opts["repeat"]):
+                t = time.perf_counter()
+                list(qs.all())  # .all() — новый запрос без кэша результатов
+                timings.append((time.perf_counter() - t) * 1000)
+            results.append(
+                {
+                    "query": name,
+                    "vendor": connection.vendor,
+                    "p50_ms": round(statistics.median(timings), 3),
+                    "p95_ms": round(statistics.quantiles(timings, n=20)[-1], 3),
+                    "plan": qs.explain(**explain),
+                }
+            )
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        if not postgres:
+            # цифры другой СУБД не переносятся на PostgreSQL в проде
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{connection.vendor}: plans and timings below are {connection.vendor}-only, "
+                    "not representative of PostgreSQL."
+                )
+            )
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"{connection.vendor}: owner={owner['owner_id']} ({owner['n']} wishlists), "
+                f"wishlist={wishlist['pk']} ({wishlist['item_count']} items), "
+                f"grantee={grantee['user_id'] if grantee else '-'}"
+            )
+        )
+        self.stdout.write(f"{'query':<20} {'p50 ms':>9} {'p95 ms':>9}")
+        for r in results:
+            self.stdout.write(f"{r['query']:<20} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f}")
+            if opts["explain"] or opts["analyze"]:
+                for line in r["plan"].splitlines():
+                    self.stdout.write(f"    {line}")
+        self.stdout.write(self.style.SUCCESS("Done."))
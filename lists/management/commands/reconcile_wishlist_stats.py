@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from lists import counters
+from lists.models import Wishlist
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute denormalized wishlist statistics (item/purchased/reserved counts, "
+        "per-currency price totals) from items, in batches, fixing any drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Wishlists per batch.")
+        parser.add_argument("--wishlist", type=int, action="append", help="Only these ids.")
+        parser.add_argument("--dry-run", action="store_true", help="Report drift, change nothing.")
+
+    def handle(self, *args, **opts):
+        qs = Wishlist.objects.order_by("pk")
+        if opts["wishlist"]:
+            qs = qs.filter(pk__in=opts["wishlist"])
+
+        checked = 0
+        drifted = []
+        last_pk = 0
+        # keyset по pk: каждая пачка — отдельная короткая транзакция
+        while True:
+            ids = list(qs.filter(pk__gt=last_pk).values_list("pk", flat=True)[: opts["batch_size"]])
+            if not ids:
+                break
+            drifted += counters.recount(ids, dry_run=opts["dry_run"])
+            checked += len(ids)
+            last_pk = ids[-1]
+
+        verb = "would fix" if opts["dry_run"] else "fixed"
+        self.stdout.write(f"Checked {checked} wishlists, {verb} {len(drifted)}.")
+        if drifted:
+            preview = ", ".join(map(str, drifted[:20])) + (" …" if len(drifted) > 20 else "")
+            self.stdout.write(f"Drifted ids: {preview}")
+        self.stdout.write(self.style.SUCCESS("Done."))
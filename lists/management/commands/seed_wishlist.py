@@ -6,6 +6,8 @@ from django.db import transaction
 from django.utils import timezone
 from faker import Faker
 
+from lists import slugs
+from lists.audit import log_bulk_event
 from lists.models import Item, Wishlist
 
 
@@ -128,7 +130,7 @@ class Command(BaseCommand):
                 )
             )
             with transaction.atomic():
-                # Создаём wishlists батчем
+                # Создаём wishlists батчем, слаги — одним запросом на пакет
                 wl_batch = []
                 now = timezone.now()
                 for _ in range(wl_count):
@@ -141,8 +143,17 @@ class Command(BaseCommand):
                             created_at=now,
                         )
                     )
-                created_wl = Wishlist.objects.bulk_create(wl_batch, batch_size=1000)
+                created_wl = slugs.bulk_create(Wishlist, wl_batch, batch_size=1000)
                 total_wl += len(created_wl)
+                # bulk_create не шлёт сигналы — пишем одну сводку на пакет
+                log_bulk_event(
+                    "wishlist.bulk_create",
+                    None,
+                    created_wl,
+                    source="seed_wishlist",
+                    tag=tag,
+                    owner_id=owner.pk,
+                )
 
                 item_batch = []
                 for wl in created_wl:
@@ -162,7 +173,15 @@ class Command(BaseCommand):
                 BATCH = 5000
                 for i in range(0, len(item_batch), BATCH):
                     chunk = item_batch[i : i + BATCH]
-                    Item.objects.bulk_create(chunk, batch_size=1000)
+                    created = slugs.bulk_create(Item, chunk, batch_size=1000)
+                    log_bulk_event(
+                        "item.bulk_create",
+                        None,
+                        created,
+                        source="seed_wishlist",
+                        tag=tag,
+                        wishlists=len({item.wishlist_id for item in created}),
+                    )
                 total_items += len(item_batch)
         self.stdout.write(
             self.style.SUCCESS(f"Done. Created wishlists={total_wl}, items={total_items}")
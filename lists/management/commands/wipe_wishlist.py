@@ -1,8 +1,10 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models import Max, Min
 from django.utils import timezone
 from django.utils.dateparse import parse_date, parse_datetime
 
+from lists.audit import bulk_operation, log_bulk_event
 from lists.models import Item, Wishlist
 
 
@@ -116,9 +118,31 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS("Dry-run: удаление не выполнялось."))
             return
 
-        with transaction.atomic():
-            # FK on_delete=CASCADE удалит Items автоматически
-            qs.delete()
+        id_range = qs.aggregate(id_min=Min("id"), id_max=Max("id"))
+        with transaction.atomic(), bulk_operation():
+            # FK on_delete=CASCADE удалит Items автоматически; события по каждой
+            # строке заглушены — в аудит идёт одна сводка ниже
+            _, deleted = qs.delete()
+
+        log_bulk_event(
+            "wishlist.bulk_delete",
+            None,
+            source="wipe_wishlist",
+            count=deleted.get(Wishlist._meta.label, 0),
+            items=deleted.get(Item._meta.label, 0),
+            **id_range,
+            filters={
+                k: v
+                for k, v in {
+                    "tag": tag,
+                    "user": user_id,
+                    "all_users": all_users,
+                    "created_after": created_after,
+                    "created_before": created_before,
+                }.items()
+                if v
+            },
+        )
 
         self.stdout.write(
             self.style.SUCCESS(f"Готово. Удалено wishlists={wl_count}, items≈{it_count}")
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0005_item_updated_at_wishlist_updated_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="enrichment_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "pending"),
+                    ("ok", "ok"),
+                    ("failed", "failed"),
+                    ("blocked", "blocked"),
+                ],
+                db_index=True,
+                default="ok",
+                max_length=8,
+            ),
+        ),
+    ]
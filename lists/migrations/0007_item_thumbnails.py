@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0006_item_enrichment_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="thumb_key",
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="thumb_source",
+            field=models.URLField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0007_item_thumbnails"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("ts", models.DateTimeField()),
+                ("event", models.CharField(max_length=64)),
+                ("user_id", models.BigIntegerField(blank=True, null=True)),
+                ("wishlist_id", models.BigIntegerField(blank=True, null=True)),
+                ("meta", models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["wishlist_id", "ts"], name="audit_wishlist_ts_idx"),
+                    models.Index(fields=["event", "ts"], name="audit_event_ts_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2 on 2026-10-17 02:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_counters(apps, schema_editor):
+    Wishlist = apps.get_model("lists", "Wishlist")
+    Item = apps.get_model("lists", "Item")
+    WishlistPriceTotal = apps.get_model("lists", "WishlistPriceTotal")
+
+    counts = (
+        Item.objects.values("wishlist_id")
+        .annotate(
+            items=Count("id"),
+            purchased=Count("id", filter=Q(is_purchased=True)),
+            reserved=Count("id", filter=Q(is_reserved=True)),
+        )
+        .order_by()
+    )
+    for row in counts.iterator():
+        Wishlist.objects.filter(pk=row["wishlist_id"]).update(
+            item_count=row["items"],
+            purchased_count=row["purchased"],
+            reserved_count=row["reserved"],
+        )
+    totals = (
+        Item.objects.filter(price_amount__isnull=False)
+        .values("wishlist_id", "price_currency")
+        .annotate(amount=Sum("price_amount"))
+        .order_by()
+    )
+    WishlistPriceTotal.objects.bulk_create(
+        (
+            WishlistPriceTotal(
+                wishlist_id=row["wishlist_id"],
+                currency=row["price_currency"],
+                amount=row["amount"],
+            )
+            for row in totals.iterator()
+            if row["amount"]
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0008_auditevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wishlist",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="wishlist",
+            name="purchased_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="wishlist",
+            name="reserved_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name="WishlistPriceTotal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("currency", models.CharField(blank=True, max_length=10)),
+                ("amount", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                (
+                    "wishlist",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="price_totals",
+                        to="lists.wishlist",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["currency"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("wishlist", "currency"), name="unique_wishlist_currency_total"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 02:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+from lists.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # индексы строятся CONCURRENTLY — запись в таблицы на это время не блокируется
+    atomic = False
+
+    dependencies = [
+        ("lists", "0009_wishlist_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="item",
+            index=models.Index(fields=["wishlist", "created_at"], name="item_wishlist_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="wishlist",
+            index=models.Index(fields=["owner", "created_at"], name="wishlist_owner_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="wishlist",
+            index=models.Index(
+                condition=models.Q(("is_public", True)),
+                fields=["owner", "created_at"],
+                name="wishlist_public_owner_idx",
+            ),
+        ),
+    ]
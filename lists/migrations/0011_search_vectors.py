@@ -0,0 +1,108 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Триггеры и GIN-индексы для lists.search — только в PostgreSQL; в SQLite
+# колонки остаются пустыми, и поиск идёт через icontains.
+TABLES = {
+    "lists_wishlist": ("title", "description"),
+    "lists_item": ("title", "note"),
+}
+
+VECTOR = (
+    "setweight(to_tsvector('simple', coalesce({new}{title}, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({new}{body}, '')), 'B')"
+)
+
+BATCH = 5000  # строк на один UPDATE заполнения — короткие блокировки строк
+
+FORWARD = (
+    """
+    CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {new_vector};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS {table}_search_vector_trg ON {table}",
+    """
+    CREATE TRIGGER {table}_search_vector_trg
+        BEFORE INSERT OR UPDATE OF {title}, {body} ON {table}
+        FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()
+    """,
+)
+
+# Миграция не атомарная: CONCURRENTLY не блокирует запись на время
+# построения, IF NOT EXISTS позволяет перезапустить её после сбоя
+INDEXES = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_search_vector_gin "
+    "ON {table} USING gin (search_vector)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_title_trgm "
+    "ON {table} USING gin ({title} gin_trgm_ops)",
+)
+
+BACKWARD = (
+    "DROP INDEX CONCURRENTLY IF EXISTS {table}_title_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS {table}_search_vector_gin",
+    "DROP TRIGGER IF EXISTS {table}_search_vector_trg ON {table}",
+    "DROP FUNCTION IF EXISTS {table}_search_vector()",
+)
+
+
+def backfill(schema_editor, table, vector):
+    # Новые и изменённые строки уже ведёт триггер; старые заполняем
+    # диапазонами id, каждый UPDATE коммитится сам
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT coalesce(max(id), 0) FROM {table}")
+        (last_id,) = cursor.fetchone()
+    for start in range(0, last_id, BATCH):
+        schema_editor.execute(
+            f"UPDATE {table} SET search_vector = {vector} "
+            "WHERE id > %s AND id <= %s AND search_vector IS NULL",
+            (start, start + BATCH),
+        )
+
+
+def postgres_forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, (title, body) in TABLES.items():
+        names = dict(table=table, title=title, body=body)
+        names["new_vector"] = VECTOR.format(new="NEW.", **names)
+        for sql in FORWARD:
+            schema_editor.execute(sql.format(**names))
+        backfill(schema_editor, table, VECTOR.format(new="", **names))
+        for sql in INDEXES:
+            schema_editor.execute(sql.format(**names))
+
+
+def postgres_backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in TABLES:
+        for sql in BACKWARD:
+            schema_editor.execute(sql.format(table=table))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("lists", "0010_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="wishlist",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(postgres_forwards, postgres_backwards),
+    ]
@@ -1,13 +1,14 @@
 import hashlib
 import secrets
+import threading
+from contextlib import contextmanager
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.utils import timezone
 
-# from django.utils.text import slugify
-from slugify import slugify
-
+from .commit_buffer import CommitBuffer
 from .validators import https_only, validate_image_url
 
 # Create your models here.
@@ -19,19 +20,102 @@ def short_hash(owner_id, title):
     return h[:4]
 
 
-def _unique_slug_for_global(title, owner_id):
-    base = (slugify(title) or "list")[:170]
-    cand = base
-    if Wishlist.objects.filter(slug=cand).exists():
-        cand = f"{base}-{short_hash(owner_id, title)}"
-        i = 0
-        while Wishlist.objects.filter(slug=cand).exists():
-            i += 1
-            cand = f"{base}-{short_hash(owner_id, title + str(i))}"
-    return cand
+_touches = threading.local()
+
+
+def _touch_now(pks):
+    batched = getattr(_touches, "pks", None)
+    if batched is not None:
+        batched.update(pks)
+        return
+    Wishlist.objects.filter(pk__in=set(pks)).update(updated_at=timezone.now())
+
+
+_pending_touches = CommitBuffer(
+    "wishlist_touches", lambda batches: _touch_now(set().union(*batches))
+)
+
+
+def touch_wishlists(*pks):
+    """
+    Обновить updated_at вишлистов одним UPDATE, без save() и сигналов.
+    Внутри транзакции касания копятся и уходят одним UPDATE после коммита;
+    несколько транзакций подряд склеивает batched_touches.
+    Касания из откаченных блоков (в том числе savepoint-ов) не применяются.
+    """
+    pks = {pk for pk in pks if pk is not None}
+    if not pks:
+        return
+    if not _pending_touches.add(pks):
+        _touch_now(pks)
+
+
+@contextmanager
+def batched_touches():
+    """
+    Касания из нескольких транзакций подряд — например, строк импорта, у
+    каждой своя короткая транзакция, — одним UPDATE на выходе из блока.
+    """
+    if getattr(_touches, "pks", None) is not None:
+        yield
+        return
+    _touches.pks = set()
+    try:
+        yield
+    finally:
+        pks, _touches.pks = _touches.pks, None
+        if pks:
+            _touch_now(pks)
+
+
+class TrackedFieldsMixin:
+    """
+    Запоминает значения tracked_fields при загрузке из БД (from_db) и после
+    каждого save, чтобы сигналы видели, что поменялось, без лишнего SELECT.
+    Отложенные (.only/.defer) поля в снимок не попадают, пока их не загрузят.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked()
+        return instance
+
+    def _snapshot_tracked(self, fields=None):
+        snapshot = self.__dict__.setdefault("_tracked_snapshot", {})
+        for name in fields or self.tracked_fields:
+            if name in self.tracked_fields and name in self.__dict__:
+                snapshot[name] = self.__dict__[name]
+
+    def tracked_changes(self, fields=None) -> dict:
+        """
+        {поле: (было, стало)} для изменённых tracked_fields (только из fields, если
+        заданы — как update_fields в save). Поля без снимка пропускаются.
+        """
+        snapshot = self.__dict__.get("_tracked_snapshot", {})
+        changes = {}
+        for name in fields or self.tracked_fields:
+            if name in snapshot and snapshot[name] != getattr(self, name):
+                changes[name] = (snapshot[name], getattr(self, name))
+        return changes
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        self._snapshot_tracked(fields)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        super().save(*args, **kwargs)
+        if update_fields is not None:
+            # update_fields=["wishlist"] — в снимке FK хранится как wishlist_id
+            update_fields = [self._meta.get_field(name).attname for name in update_fields]
+        # post_save уже отработал со старым снимком — теперь БД совпадает с объектом
+        self._snapshot_tracked(update_fields)
 
 
-class Wishlist(models.Model):
+class Wishlist(TrackedFieldsMixin, models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="wishlists")
     title = models.CharField(max_length=160)
     description = models.TextField(blank=True)
@@ -52,10 +136,34 @@ class Wishlist(models.Model):
     public_view_count = models.PositiveIntegerField(default=0)
     last_viewed_at = models.DateTimeField(null=True, blank=True)
 
+    # Денормализованная статистика товаров, ведёт lists.counters; суммы цен по
+    # валютам — в WishlistPriceTotal (related_name="price_totals")
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    purchased_count = models.PositiveIntegerField(default=0, editable=False)
+    reserved_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Полнотекстовый индекс title + description (lists.search). В PostgreSQL его
+    # пересчитывает триггер из миграции 0011, в остальных СУБД он всегда NULL.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    tracked_fields = ("title", "is_public")
+
     class Meta:
         constraints = [
+            # заодно индекс (owner, title) — сортировка «моих» списков по названию
             models.UniqueConstraint(fields=["owner", "title"], name="unique_owner_title")
         ]
+        indexes = [
+            # «Мои вишлисты»: owner = ? ORDER BY created_at [DESC] LIMIT 8
+            models.Index(fields=["owner", "created_at"], name="wishlist_owner_created_idx"),
+            # Публичный профиль и sitemap: только публичные, индекс меньше и не
+            # обновляется на приватных списках
+            models.Index(
+                fields=["owner", "created_at"],
+                condition=models.Q(is_public=True),
+                name="wishlist_public_owner_idx",
+            ),
+        ]
 
     def ensure_share_token(self, rotate: bool = False) -> str:
         """Вернуть существующий токен или сгенерировать новый (rotate=True — пересоздать)."""
@@ -72,27 +180,17 @@ class Wishlist(models.Model):
             self.share_token = None
             self.save(update_fields=["share_token"])
 
-    def _build_unique_slug(self):
-        max_len = self._meta.get_field("slug").max_length
-        base = slugify(self.title) or "list"
-        base = base[: max_len - 5]
-        cand = base
-        i = 2
-        while Wishlist.objects.filter(slug=cand).exclude(pk=self.pk).exists():
-            cand = f"{base}-{i}"
-            i += 1
-            if len(cand) > max_len:
-                cand = cand[:max_len]
-        return cand
-
     def save(self, *args, **kwargs):
         if self.title:
             self.title = self.title.strip()
             self.title = self.title[:1].upper() + self.title[1:]
 
-        if not self.slug:
-            self.slug = _unique_slug_for_global(self.title, self.owner_id)
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        from . import slugs
+
+        self.slug = slugs.allocate(self)
+        return slugs.save_retrying(self, lambda: super(Wishlist, self).save(*args, **kwargs))
 
     def can_view(self, user) -> bool:
         from . import policies
@@ -104,6 +202,11 @@ class Wishlist(models.Model):
 
         return policies.can_edit(user, self).allowed
 
+    def can_view_history(self, user) -> bool:
+        from . import policies
+
+        return policies.can_view_history(user, self).allowed
+
     @property
     def event_short(self):
         if self.event_date:
@@ -120,12 +223,94 @@ class Wishlist(models.Model):
             return self.event_date.strftime("%Y-%m-%d")
         return ""
 
+    @property
+    def stat_badges(self) -> list:
+        """Бейджи карточки: число товаров и суммы (price_totals стоит prefetch-ить)."""
+        badges = [{"text": f"{self.item_count} item{'' if self.item_count == 1 else 's'}"}]
+        for total in self.price_totals.all():
+            if total.amount:
+                badges.append({"text": f"{total.amount} {total.currency}".strip()})
+        return badges
+
     def touch(self):
         self.updated_at = timezone.now()
-        self.save(update_fields=["updated_at"])
+        touch_wishlists(self.pk)
 
 
-class Item(models.Model):
+class ItemQuerySet(models.QuerySet):
+    """Массовые операции держат статистику вишлистов (lists.counters) в порядке."""
+
+    STATS_NAMES = frozenset(
+        ("wishlist", "wishlist_id", "is_purchased", "is_reserved", "price_currency", "price_amount")
+    )
+
+    def _wishlist_ids(self):
+        return set(self.order_by().values_list("wishlist_id", flat=True).distinct())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from . import counters
+
+        with transaction.atomic(savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+                # какие строки реально вставились, неизвестно
+                counters.recount({obj.wishlist_id for obj in objs})
+            else:
+                counters.items_created(objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from . import counters
+
+        objs = list(objs)
+        with transaction.atomic(savepoint=False):
+            # старые вишлисты пересчитает update() внутри, новые — здесь
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            if {"wishlist", "wishlist_id"} & set(fields):
+                counters.recount({obj.wishlist_id for obj in objs})
+        return rows
+
+    def update(self, **kwargs):
+        from . import counters
+
+        if self.STATS_NAMES.isdisjoint(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(savepoint=False):
+            ids = self._wishlist_ids()
+            rows = super().update(**kwargs)
+            moved_to = kwargs.get("wishlist_id", kwargs.get("wishlist"))
+            if isinstance(moved_to, (int, Wishlist)):
+                ids.add(getattr(moved_to, "pk", moved_to))
+            counters.recount(ids)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        from . import counters
+
+        with transaction.atomic(savepoint=False):
+            ids = self._wishlist_ids()
+            result = super().delete()
+            counters.recount(ids)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class Item(TrackedFieldsMixin, models.Model):
+    ENRICH_PENDING = "pending"
+    ENRICH_OK = "ok"
+    ENRICH_FAILED = "failed"
+    ENRICH_BLOCKED = "blocked"
+    ENRICHMENT_CHOICES = [
+        (ENRICH_PENDING, "pending"),
+        (ENRICH_OK, "ok"),
+        (ENRICH_FAILED, "failed"),
+        (ENRICH_BLOCKED, "blocked"),
+    ]
+
     wishlist = models.ForeignKey(Wishlist, on_delete=models.CASCADE, related_name="items")
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -162,6 +347,30 @@ class Item(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     slug = models.SlugField(max_length=220, blank=True, null=True)
+    # pending — ждёт фонового обогащения из OpenGraph (manage.py enrich_items)
+    enrichment_status = models.CharField(
+        max_length=8, choices=ENRICHMENT_CHOICES, default=ENRICH_OK, db_index=True
+    )
+    # Локальные превью image_url (lists.thumbnails): ключ по хэшу содержимого и URL,
+    # из которого они сделаны; пустой ключ при заполненном source — не получилось
+    thumb_key = models.CharField(max_length=32, blank=True, editable=False)
+    thumb_source = models.URLField(blank=True, editable=False)
+    # title + note для lists.search, ведёт триггер (см. Wishlist.search_vector)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Вклад товара в статистику вишлиста (lists.counters)
+    stats_fields = ("wishlist_id", "is_purchased", "is_reserved", "price_currency", "price_amount")
+    tracked_fields = ("title", "url", "image_url") + stats_fields
+
+    objects = ItemQuerySet.as_manager()
+
+    # Проверка данных в save():
+    # FULL — full_clean(): валидаторы полей, clean() и unique-проверки отдельными
+    #        запросами. Для данных из-за границы доверия (OpenGraph, API, shell).
+    # FAST — данные уже проверены (ItemForm) или пишутся изнутри: без валидаторов
+    #        и без запросов; уникальность, NOT NULL и FK проверяет сама БД.
+    VALIDATE_FULL = "full"
+    VALIDATE_FAST = "fast"
 
     class Meta:
         constraints = [
@@ -170,34 +379,132 @@ class Item(models.Model):
                 name="unique_item_slug_per_wishlist",
             ),
         ]
+        indexes = [
+            # страница товаров: wishlist = ? ORDER BY created_at LIMIT 8 OFFSET …
+            models.Index(fields=["wishlist", "created_at"], name="item_wishlist_created_idx"),
+        ]
+
+    def save(self, *args, validation=VALIDATE_FULL, **kwargs):
+        if kwargs.pop("skip_full_clean", False):
+            validation = self.VALIDATE_FAST
+        if validation not in (self.VALIDATE_FULL, self.VALIDATE_FAST):
+            raise ValueError(f"Unknown validation mode: {validation!r}")
 
-    def save(self, *args, **kwargs):
         if self.title:
             self.title = self.title.strip()
             self.title = self.title[:1].upper() + self.title[1:]
 
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            counter = 1
-            while Item.objects.filter(wishlist=self.wishlist, slug=slug).exists():
-                counter += 1
-                slug = f"{base_slug}-{counter}"
-            self.slug = slug
+        new_slug = not self.slug
+        if new_slug:
+            from . import slugs
 
-        if not kwargs.pop("skip_full_clean", False):
-            self.full_clean()
+            self.slug = slugs.allocate(self)
 
-        if self.wishlist_id:
-            self.wishlist.touch()
+        if validation == self.VALIDATE_FULL:
+            self.full_clean()
 
-        super().save(*args, **kwargs)
+        from . import counters
+
+        update_fields = kwargs.get("update_fields")
+        # update_fields мимо статистики — без пересчёта и лишних запросов
+        track_stats = update_fields is None or not ItemQuerySet.STATS_NAMES.isdisjoint(
+            update_fields
+        )
+        if update_fields is None and not self._state.adding and self._stats_unchanged():
+            # вклад в статистику тот же: его поля не пишем (не затираем чужую
+            # свежую правку цены старым значением) — и блокировать нечего
+            kwargs["update_fields"] = update_fields = self._fields_without_stats()
+            track_stats = False
+
+        def write():
+            with transaction.atomic(savepoint=False):
+                before = None
+                if track_stats and not self._state.adding:
+                    before = self._locked_stats_row()
+                result = super(Item, self).save(*args, **kwargs)
+                if track_stats:
+                    counters.item_saved(before, self._saved_stats_row(before, update_fields))
+                # после записи: упавший INSERT/UPDATE родителя не трогает
+                touch_wishlists(self.wishlist_id)
+            return result
+
+        if new_slug:
+            # повтор — вся транзакция записи; вне чужой транзакции без savepoint-а
+            return slugs.save_retrying(self, write)
+        return write()
 
     def delete(self, *args, **kwargs):
-        wishlist = self.wishlist
-        super().delete(*args, **kwargs)
-        if wishlist:
-            wishlist.touch()
+        from . import counters
+
+        wishlist_id = self.wishlist_id
+        with transaction.atomic(savepoint=False):
+            row = self._locked_stats_row()
+            result = super().delete(*args, **kwargs)
+            counters.Deltas().add(row, -1).apply()  # row=None — строку уже удалили
+            touch_wishlists(wishlist_id)
+        return result
+
+    def stats_row(self):
+        """Значения stats_fields объекта — его вклад в статистику вишлиста."""
+        return tuple(getattr(self, name) for name in self.stats_fields)
+
+    def _stats_unchanged(self) -> bool:
+        """stats_fields совпадают со снимком из БД; поле без снимка считаем изменённым."""
+        snapshot = self.__dict__.get("_tracked_snapshot", {})
+        deferred = self.get_deferred_fields()  # отложенные save и так не пишет
+        return all(
+            name in deferred or (name in snapshot and snapshot[name] == getattr(self, name))
+            for name in self.stats_fields
+        )
+
+    def _fields_without_stats(self) -> list:
+        deferred = self.get_deferred_fields()
+        return [
+            f.name
+            for f in self._meta.concrete_fields
+            if not f.primary_key
+            and f.attname not in self.stats_fields
+            and f.attname not in deferred
+        ]
+
+    def _locked_stats_row(self):
+        """
+        Вклад товара по данным БД, строка блокируется до конца транзакции: две
+        параллельные правки одного товара считают дельты по очереди, а не от
+        одного и того же старого значения. None — строки нет.
+        """
+        return (
+            Item.objects.select_for_update()
+            .filter(pk=self.pk)
+            .values_list(*self.stats_fields)
+            .first()
+        )
+
+    def _saved_stats_row(self, before, update_fields):
+        """Вклад после save(): записанные поля — из объекта, остальные остались как в before."""
+        if before is None:
+            return self.stats_row()  # INSERT пишет все поля
+        if update_fields is None:
+            # save() отложенных полей не пишет (Django сам сужает update_fields)
+            written = set(self.stats_fields) - self.get_deferred_fields()
+        else:
+            written = {self._meta.get_field(name).attname for name in update_fields}
+        return tuple(
+            getattr(self, name) if name in written else old
+            for name, old in zip(self.stats_fields, before)
+        )
+
+    @property
+    def is_enrichment_pending(self) -> bool:
+        return self.enrichment_status == self.ENRICH_PENDING
+
+    @property
+    def has_thumbnail(self) -> bool:
+        return bool(self.thumb_key) and self.thumb_source == self.image_url
+
+    def has_placeholder_title(self) -> bool:
+        """Название ещё не настоящее: при отложенном обогащении вместо него ставится URL."""
+        return bool(self.url) and self.title.lower() == self.url[:200].lower()
 
     def can_view(self, user) -> bool:
         return self.wishlist.can_view(user)
@@ -230,3 +537,56 @@ class WishlistAccess(models.Model):
 
     def __str__(self):
         return f"{self.user.username} → {self.wishlist.title} ({self.role})"
+
+
+class WishlistPriceTotal(models.Model):
+    """Сумма цен товаров вишлиста в одной валюте; ведёт lists.counters."""
+
+    wishlist = models.ForeignKey(Wishlist, on_delete=models.CASCADE, related_name="price_totals")
+    currency = models.CharField(max_length=10, blank=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["currency"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wishlist", "currency"], name="unique_wishlist_currency_total"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.wishlist_id}: {self.amount} {self.currency}"
+
+
+class AuditEventQuerySet(models.QuerySet):
+    def for_wishlist(self, wishlist_id):
+        return self.filter(wishlist_id=wishlist_id).order_by("-ts", "-id")
+
+    def before(self, ts, pk):
+        """Keyset-пагинация: события старше курсора (ts, id), без OFFSET."""
+        return self.filter(models.Q(ts__lt=ts) | models.Q(ts=ts, id__lt=pk))
+
+
+class AuditEvent(models.Model):
+    """
+    Audit-событие из log_event (см. lists.audit_logging.AuditDBHandler).
+    user_id / wishlist_id — просто числа, без внешних ключей: история должна
+    переживать удаление пользователя или вишлиста.
+    """
+
+    ts = models.DateTimeField()
+    event = models.CharField(max_length=64)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    wishlist_id = models.BigIntegerField(null=True, blank=True)
+    meta = models.JSONField(default=dict, blank=True)
+
+    objects = AuditEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wishlist_id", "ts"], name="audit_wishlist_ts_idx"),
+            models.Index(fields=["event", "ts"], name="audit_event_ts_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ts:%Y-%m-%d %H:%M:%S} {self.event}"
@@ -1,49 +1,142 @@
+import codecs
 import json
+import re
 import time
 from urllib.parse import urljoin, urlparse
 
-import cloudscraper
 import requests
 from bs4 import BeautifulSoup
 
+from lists import og_breaker, og_cache, og_extract, og_flight, og_sessions
 from lists.audit import log_event
+from lists.pools import BackgroundPool, setting
 
+CHUNK_SIZE = 16 * 1024
+HEAD_END_RE = re.compile(rb"</head\s*>|<body[\s>]", re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?\s*([\w.:-]+)", re.IGNORECASE)
 
-def enrich_from_url(url: str):
+
+def enrich_from_url(url: str, use_cache: bool = True):
     """
     Возвращает {"title": ..., "image_url": ...} на основе OpenGraph мета-тегов.
+    Результаты (в том числе неудачные) кэшируются, см. lists.og_cache;
+    одновременные запросы одного URL делят одну загрузку, см. lists.og_flight.
     """
+    return fetch_metadata(url, use_cache)[0]
+
+
+def fetch_metadata(url: str, use_cache: bool = True):
+    """То же, что enrich_from_url, но возвращает (data, status) — статус из og_cache.STATUS_*."""
     if not url:
-        return {}
-    start = time.time()
-    scraper = cloudscraper.create_scraper(
-        browser={"browser": "chrome", "platform": "windows", "mobile": False}
+        return {}, og_cache.STATUS_FAILED
+    host = urlparse(url).netloc or "unknown"
+    if not use_cache:
+        return _fetch_fresh(url, host, store=False)
+
+    entry = og_cache.lookup(url, host)
+    if entry is not None:
+        if og_cache.is_fresh(entry):
+            return dict(entry["data"]), entry["status"]
+        if setting("OG_STALE_WHILE_REVALIDATE", True):
+            # Отдаём устаревшие данные сразу, перепроверяем в фоне
+            _schedule_refresh(url, host, entry)
+            return dict(entry["data"]), entry["status"]
+
+    result = og_flight.do(
+        og_cache.url_key(url),
+        lambda: _revalidate(url, host, entry) if entry else _fetch_fresh(url, host),
+        peek=lambda: og_cache.peek(url, newer_than=entry["ts"] if entry else None),
+        host=host,
     )
+    # None — не дождались чужой загрузки
+    data, status = result or ({}, og_cache.STATUS_SKIPPED)
+    return dict(data), status
 
-    sess = requests.Session()
-    parsed = urlparse(url)
-    host = parsed.netloc or "unknown"
-    origin = f"{parsed.scheme}://{parsed.netloc}"
 
+def _fetch_fresh(url: str, host: str, store: bool = True):
+    if not og_breaker.allow(host):
+        # Хост массово отказывает — не ходим туда и не кэшируем пустой ответ
+        log_event("og.fetch.rejected", None, None, host=host, reason="circuit-open")
+        return {}, og_cache.STATUS_SKIPPED
+
+    data, status = _fetch_og(url)
+    validators = {k: data.pop(k) for k in og_cache.VALIDATOR_FIELDS if k in data}
+    if store:
+        og_cache.store(url, host, data, status, validators)
+    return data, status
+
+
+def _revalidate(url: str, host: str, entry):
+    """
+    Перепроверить устаревшую запись условным запросом. 304 — дешёвое продление;
+    при ошибке продолжаем отдавать старые данные (stale-if-error).
+    """
+    stale = dict(entry["data"]), entry["status"]
+    if entry["status"] != og_cache.STATUS_OK or not og_breaker.allow(host):
+        return stale
+
+    data, status = _fetch_og(url, validators=entry.get("validators"))
+    if status == og_cache.STATUS_NOT_MODIFIED:
+        og_cache.refresh(url, host, entry)
+        return stale
+    if status != og_cache.STATUS_OK:
+        return stale
+    validators = {k: data.pop(k) for k in og_cache.VALIDATOR_FIELDS if k in data}
+    og_cache.store(url, host, data, status, validators)
+    return data, status
+
+
+_refresh_pool = BackgroundPool("og-revalidate", "OG_REVALIDATE_WORKERS", 2)
+
+
+def _schedule_refresh(url: str, host: str, entry):
+    # Одна фоновая перепроверка URL на все процессы
+    lock_key = f"{og_cache.url_key(url)}:refresh"
+    if not og_cache.get_cache().add(lock_key, 1, setting("OG_FLIGHT_LOCK_TTL", 15)):
+        return
+    _refresh_pool.submit(_refresh, url, host, entry, lock_key)
+
+
+def _refresh(url, host, entry, lock_key):
     try:
-        sess.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 6.1; "
-                "Win64; x64; rv:47.0) Gecko/20100101 Firefox/47.0",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9,ru;q=0.8",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Referer": origin,
-                "Cache-Control": "no-cache",
-                "Pragma": "no-cache",
-            }
-        )
+        _revalidate(url, host, entry)
+    except Exception as e:
+        log_event("og.revalidate.error", None, None, host=host, err=str(e)[:100])
+    finally:
+        og_cache.get_cache().delete(lock_key)
+
 
-        resp = scraper.get(url, timeout=10)
+def _fetch_og(url: str, validators=None):
+    """
+    Загрузить страницу и разобрать мета-теги. Возвращает (data, status).
+    validators ({"etag", "last_modified"}) превращают запрос в условный: на 304
+    вернётся ({}, STATUS_NOT_MODIFIED). Валидаторы нового ответа кладутся в data
+    под ключами og_cache.VALIDATOR_FIELDS — их снимает вызывающий код.
+    """
+    start = time.time()
+    host = urlparse(url).netloc or "unknown"
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    try:
+        # Сессия из пула: переиспользуем keep-alive соединения и cookies Cloudflare
+        with og_sessions.get_pool().session(host.lower()) as scraper:
+            with scraper.get(url, timeout=10, stream=True, headers=headers or None) as resp:
+                html = ""
+                if resp.ok and resp.status_code != 304:
+                    # Amazon-у нужны элементы из <body>, остальным хватает <head>
+                    html = _read_html(resp, full_body="amazon." in host)
         elapsed = int((time.time() - start) * 1000)
 
+        if resp.status_code == 304:
+            log_event("og.fetch.not_modified", None, None, host=host, ms=elapsed)
+            og_breaker.record_success(host)
+            return {}, og_cache.STATUS_NOT_MODIFIED
+
         if resp.status_code in (401, 403, 429, 503):
             log_event(
                 "og.fetch.denied",
@@ -54,73 +147,90 @@ def enrich_from_url(url: str):
                 ms=elapsed,
                 reason="blocked",
             )
-            return {}
+            og_breaker.record_failure(host)
+            return {}, og_cache.STATUS_BLOCKED
 
         resp.raise_for_status()
+        og_breaker.record_success(host)
 
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        def _meta(prop=None, name=None):
-            if prop:
-                tag = soup.find("meta", property=prop)
-            else:
-                tag = soup.find("meta", attrs={"name": name})
-            return (tag.get("content") or "").strip() if tag and tag.get("content") else ""
-
-        title = (
-            _meta(prop="og:title")
-            or _meta(name="twitter:title")
-            or (soup.title.string.strip() if soup.title and soup.title.string else "")
-        )
-
-        image = (
-            _meta(name="twitter:image")
-            or _meta(name="twitter:image:src")
-            or _meta(prop="og:image")
-            or _meta(prop="og:image:url")
-            or _meta(prop="og:image:secure_url")
-        )
-
-        if image:
-            image = urljoin(url, image)
-
-        description = (
-            _meta(prop="og:description")
-            or _meta(name="twitter:description")
-            or _meta(name="description")
-        )
-
-        data = {}
-        if title:
-            data["title"] = title
-        if image:
-            data["image_url"] = image
-        if description:
-            data["description"] = description
+        data = og_extract.extract(html, url)
+        has_title, has_image = bool(data.get("title")), bool(data.get("image_url"))
 
         if "amazon." in host:
-            amazon_data = _enrich_amazon(soup, url)
+            # Для Amazon по-прежнему нужно дерево: productTitle / landingImage из <body>
+            amazon_data = _enrich_amazon(BeautifulSoup(html, "html.parser"), url)
             data.update({k: v for k, v in amazon_data.items() if v})
 
+        etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+        if etag:
+            data["etag"] = etag
+        if last_modified:
+            data["last_modified"] = last_modified
+
         log_event(
             "og.fetch.ok",
             None,
             None,
             host=host,
             ms=elapsed,
-            has_title=bool(title),
-            has_image=bool(image),
+            has_title=has_title,
+            has_image=has_image,
+            size=len(html),
         )
-        return data
+        return data, og_cache.STATUS_OK
 
     except requests.Timeout:
         elapsed = int((time.time() - start) * 1000)
         log_event("og.fetch.timeout", None, None, host=host, ms=elapsed)
-        return {}
+        og_breaker.record_failure(host)
+        return {}, og_cache.STATUS_FAILED
     except requests.RequestException as e:
         elapsed = int((time.time() - start) * 1000)
+        status_code = getattr(e.response, "status_code", None)
+        if status_code is None or status_code >= 500:
+            og_breaker.record_failure(host)
+        else:
+            # 404 и прочие 4xx — проблема конкретной ссылки, а не хоста
+            og_breaker.record_success(host)
         log_event("og.fetch.error", None, None, host=host, err=str(e)[:100], ms=elapsed)
-        return {}
+        return {}, og_cache.STATUS_FAILED
+
+
+def _read_html(resp, full_body=False):
+    """
+    Потоково прочитать HTML: до конца <head> (или весь документ при full_body),
+    но не больше OG_MAX_HEAD_BYTES / OG_MAX_BODY_BYTES. Остаток ответа не качаем.
+    """
+    if full_body:
+        cap = setting("OG_MAX_BODY_BYTES", 4 * 1024 * 1024)
+    else:
+        cap = setting("OG_MAX_HEAD_BYTES", 256 * 1024)
+
+    buf = bytearray()
+    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+        # ищем конец head с небольшим перекрытием, чтобы не пропустить тег на стыке чанков
+        scan_from = max(0, len(buf) - 16)
+        buf += chunk
+        if len(buf) >= cap:
+            del buf[cap:]
+            break
+        if not full_body and HEAD_END_RE.search(buf, scan_from):
+            break
+
+    return bytes(buf).decode(_html_encoding(resp, buf), errors="replace")
+
+
+def _html_encoding(resp, prefix: bytes) -> str:
+    """Кодировка из заголовка Content-Type, затем из <meta charset>, иначе utf-8."""
+    if "charset=" in resp.headers.get("Content-Type", "").lower() and resp.encoding:
+        candidate = resp.encoding
+    else:
+        m = META_CHARSET_RE.search(prefix[:4096])
+        candidate = m.group(1).decode("ascii", "ignore") if m else "utf-8"
+    try:
+        return codecs.lookup(candidate).name
+    except LookupError:
+        return "utf-8"
 
 
 def _enrich_amazon(soup, url):
@@ -0,0 +1,92 @@
+"""
+Параллельное обогащение набора URL (bulk add, импорт CSV).
+
+Загрузки идут в пуле потоков с общим лимитом параллельности и отдельным
+лимитом на хост, чтобы не долбить один магазин десятком соединений.
+Весь батч ограничен общим дедлайном: то, что не успело, получает {}
+(или ({}, STATUS_SKIPPED) при with_status=True).
+"""
+
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from lists.audit import log_event
+from lists.og import enrich_from_url, fetch_metadata
+from lists.og_cache import STATUS_FAILED, STATUS_SKIPPED
+from lists.pools import setting
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).netloc or "unknown").lower()
+
+
+def enrich_many(urls, *, max_workers=None, per_host=None, deadline=None, with_status=False):
+    """
+    Обогатить URL параллельно. Возвращает {url: data} для каждого переданного URL
+    (в порядке входного списка); упавшие и не успевшие к дедлайну — пустой dict.
+    С with_status=True значения — пары (data, status), как у fetch_metadata.
+    """
+    max_workers = max_workers or setting("OG_BATCH_MAX_WORKERS", 8)
+    per_host = per_host or setting("OG_BATCH_PER_HOST", 2)
+    deadline = deadline or setting("OG_BATCH_DEADLINE", 25)
+
+    unique = list(dict.fromkeys(u for u in urls if u))
+    empty = ({}, STATUS_SKIPPED) if with_status else {}
+    results = {u: empty for u in unique}
+    if not unique:
+        return results
+
+    start = time.monotonic()
+    stop_at = start + deadline
+    pending = deque(unique)
+    running = {}  # future -> url
+    per_host_running = Counter()
+
+    def _run(url):
+        try:
+            if with_status:
+                return fetch_metadata(url)
+            return enrich_from_url(url) or {}
+        except Exception:
+            return ({}, STATUS_FAILED) if with_status else {}
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="og-enrich")
+    try:
+        while pending or running:
+            # Запускаем всё, что позволяют общий и per-host лимиты
+            skipped = deque()
+            while pending and len(running) < max_workers:
+                url = pending.popleft()
+                host = _host(url)
+                if per_host_running[host] >= per_host:
+                    skipped.append(url)
+                    continue
+                per_host_running[host] += 1
+                running[pool.submit(_run, url)] = url
+            pending.extendleft(reversed(skipped))
+
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(list(running), timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                url = running.pop(fut)
+                per_host_running[_host(url)] -= 1
+                results[url] = fut.result()
+    finally:
+        # Не ждём зависшие загрузки: они доработают в фоне, результат игнорируем
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    timed_out = len(pending) + len(running)
+    log_event(
+        "og.batch",
+        None,
+        None,
+        urls=len(unique),
+        hosts=len({_host(u) for u in unique}),
+        timed_out=timed_out,
+        ms=int((time.monotonic() - start) * 1000),
+    )
+    return results
@@ -0,0 +1,114 @@
+"""
+Per-host circuit breaker для загрузчика OpenGraph.
+
+Состояние хранится в кэше OG (общий для всех воркеров), поэтому магазин,
+который начал отвечать 403/429/503 или таймаутами, отсекается сразу во всех
+процессах, а не каждым по отдельности.
+
+closed    — запросы идут; подряд идущие отказы считаются;
+open      — после OG_BREAKER_THRESHOLD отказов запросы сразу отклоняются;
+half-open — по истечении паузы пропускаем один пробный запрос: успех закрывает
+            breaker, неудача снова открывает его с удвоенной паузой.
+
+Отказы считаются через cache.add + cache.incr, а не чтением и записью
+словаря, чтобы одновременные отказы не затирали друг друга. Атомарны эти
+операции только в общих бэкендах (Redis, Memcached) — см. lists.checks.
+"""
+
+import time
+
+from lists.og_cache import KEY_PREFIX, get_cache
+from lists.pools import setting
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+def _state_key(host: str) -> str:
+    return f"{KEY_PREFIX}:cb:{host.lower()}"
+
+
+def _failures_key(host: str) -> str:
+    return f"{KEY_PREFIX}:cb:failures:{host.lower()}"
+
+
+def _probe_key(host: str) -> str:
+    return f"{KEY_PREFIX}:cb:probe:{host.lower()}"
+
+
+def backoff(trips: int) -> int:
+    """Пауза перед следующей пробой: base * 2^(trips-1), но не больше max."""
+    base = setting("OG_BREAKER_BASE_BACKOFF", 30)
+    cap = setting("OG_BREAKER_MAX_BACKOFF", 60 * 60)
+    return min(base * 2 ** max(trips - 1, 0), cap)
+
+
+def _load(host):
+    return get_cache().get(_state_key(host))
+
+
+def _state_ttl(trips: int) -> int:
+    return max(setting("OG_BREAKER_WINDOW", 60 * 5), backoff(trips) * 4)
+
+
+def _count_failure(host) -> int:
+    """Увеличить счётчик отказов через incr; окно продлевается каждым отказом."""
+    cache = get_cache()
+    key = _failures_key(host)
+    window = setting("OG_BREAKER_WINDOW", 60 * 5)
+    cache.add(key, 0, window)
+    try:
+        failures = cache.incr(key)
+    except ValueError:
+        # ключ истёк между add и incr
+        cache.add(key, 1, window)
+        return 1
+    cache.touch(key, window)
+    return failures
+
+
+def state(host: str) -> str:
+    st = _load(host)
+    if st is None:
+        return CLOSED
+    if time.time() < st["opened_at"] + backoff(st["trips"]):
+        return OPEN
+    return HALF_OPEN
+
+
+def allow(host: str) -> bool:
+    """Можно ли сейчас ходить на хост. В half-open пропускает ровно одну пробу."""
+    current = state(host)
+    if current == CLOSED:
+        return True
+    if current == OPEN:
+        return False
+    probe_ttl = setting("OG_BREAKER_PROBE_TIMEOUT", 30)
+    return get_cache().add(_probe_key(host), 1, probe_ttl)
+
+
+def record_success(host: str):
+    cache = get_cache()
+    keys = [_state_key(host), _failures_key(host)]
+    if cache.get_many(keys):
+        cache.delete_many([*keys, _probe_key(host)])
+
+
+def record_failure(host: str):
+    st = _load(host)
+    now = time.time()
+    if st is None:
+        if _count_failure(host) >= setting("OG_BREAKER_THRESHOLD", 5):
+            # порог могут перейти сразу несколько воркеров — открывает первый
+            cache = get_cache()
+            if cache.add(_state_key(host), {"trips": 1, "opened_at": now}, _state_ttl(1)):
+                cache.delete(_failures_key(host))
+        return
+    if now < st["opened_at"] + backoff(st["trips"]):
+        return  # уже открыт: запоздалый ответ запроса, начатого до открытия
+    # провалилась проба в half-open — открываем снова с большей паузой
+    trips = st["trips"] + 1
+    cache = get_cache()
+    cache.set(_state_key(host), {"trips": trips, "opened_at": now}, _state_ttl(trips))
+    cache.delete(_probe_key(host))
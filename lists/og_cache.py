@@ -0,0 +1,143 @@
+"""
+Кэш результатов enrich_from_url.
+
+Ключ — нормализованный URL (без фрагмента, трекинговых параметров и с
+приведённым к нижнему регистру хостом). Храним title/image_url/description
+вместе со статусом загрузки; неудачные и заблокированные загрузки
+кэшируются с более коротким TTL (negative caching). Хосты, которые массово
+отказывают, отсекает circuit breaker (lists.og_breaker).
+
+Успешная запись свежая OG_CACHE_TTL секунд (поле "expires"), потом ещё
+OG_CACHE_STALE_TTL живёт устаревшей: её можно отдать сразу и перепроверить
+условным запросом по сохранённым ETag / Last-Modified (см. lists.og).
+"""
+
+import hashlib
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.core.cache import caches
+
+from lists.audit import log_event
+from lists.pools import setting
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_BLOCKED = "blocked"
+# Не загружали: открыт circuit breaker или не успели к дедлайну батча. Не кэшируется.
+STATUS_SKIPPED = "skipped"
+# Ответ 304 на условный запрос: закэшированные данные всё ещё актуальны. Не кэшируется.
+STATUS_NOT_MODIFIED = "not-modified"
+
+CACHED_FIELDS = ("title", "image_url", "description")
+VALIDATOR_FIELDS = ("etag", "last_modified")
+
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "msclkid", "mc_cid", "mc_eid", "_ga", "ref_"}
+TRACKING_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+KEY_PREFIX = "og:v1"
+
+_stats = {"hit": 0, "miss": 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[setting("OG_CACHE_ALIAS", "default")]
+
+
+def _is_tracking(param: str) -> bool:
+    p = param.lower()
+    return p in TRACKING_PARAMS or p.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url: str) -> str:
+    """Привести URL к каноническому виду для ключа кэша."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    netloc = host
+    if port and str(port) != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    query = urlencode(
+        [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+    )
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def url_key(url: str) -> str:
+    digest = hashlib.sha1(normalize_url(url).encode()).hexdigest()
+    return f"{KEY_PREFIX}:url:{digest}"
+
+
+def _count(kind: str, host: str, **meta):
+    with _stats_lock:
+        _stats[kind] += 1
+        hits, misses = _stats["hit"], _stats["miss"]
+    log_event(f"og.cache.{kind}", None, None, host=host, hits=hits, misses=misses, **meta)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def is_fresh(entry) -> bool:
+    # записи без "expires" сохранены до появления ревалидации — считаем свежими
+    return time.time() < entry.get("expires", float("inf"))
+
+
+def lookup(url: str, host: str):
+    """
+    Вернуть закэшированную запись {"data", "status", "ts", "expires", "validators"}
+    или None. Запись может быть устаревшей — проверяйте is_fresh().
+    """
+    entry = get_cache().get(url_key(url))
+    if entry is not None:
+        _count("hit", host, status=entry["status"], stale=not is_fresh(entry))
+        return entry
+    _count("miss", host)
+    return None
+
+
+def peek(url: str, newer_than=None):
+    """
+    (data, status) из кэша без учёта в статистике hit/miss (для ожидающих
+    single-flight). newer_than — игнорировать записи, сохранённые не позже этого ts.
+    """
+    entry = get_cache().get(url_key(url))
+    if entry is None or (newer_than is not None and entry["ts"] <= newer_than):
+        return None
+    return entry["data"], entry["status"]
+
+
+def store(url: str, host: str, data: dict, status: str = STATUS_OK, validators=None):
+    cache = get_cache()
+    now = time.time()
+    stale_ttl = 0
+    if status == STATUS_OK:
+        ttl = setting("OG_CACHE_TTL", 60 * 60 * 24)
+        stale_ttl = setting("OG_CACHE_STALE_TTL", 60 * 60 * 24 * 7)
+    elif status == STATUS_BLOCKED:
+        ttl = setting("OG_CACHE_BLOCKED_TTL", 60 * 15)
+    else:
+        ttl = setting("OG_CACHE_NEGATIVE_TTL", 60 * 5)
+    entry = {
+        "data": {k: data[k] for k in CACHED_FIELDS if data.get(k)},
+        "status": status,
+        "ts": now,
+        "expires": now + ttl,
+        "validators": {k: v for k, v in (validators or {}).items() if v},
+    }
+    cache.set(url_key(url), entry, ttl + stale_ttl)
+
+
+def refresh(url: str, host: str, entry):
+    """Продлить свежесть записи после ответа 304."""
+    store(url, host, entry["data"], entry["status"], entry.get("validators"))
+
+
+def invalidate(url: str):
+    get_cache().delete(url_key(url))
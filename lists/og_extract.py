@@ -0,0 +1,278 @@
+"""
+Извлечение OpenGraph / Twitter / description / <title> из HTML за один проход.
+
+Раньше enrich_from_url строил дерево BeautifulSoup и вызывал soup.find до
+11 раз, каждый раз обходя документ целиком. Здесь один проход парсера
+собирает первые значения всех интересных мета-тегов, а приоритеты
+применяются уже к словарю.
+
+Бэкенды (OG_PARSER_BACKEND):
+  "lxml"        — SAX-подобный target-парсер libxml2, если lxml установлен;
+  "html.parser" — html.parser из стандартной библиотеки (fallback);
+  "bs4"         — эталон: прежняя реализация на BeautifulSoup (для тестов и бенчмарка);
+  "auto"        — lxml, если доступен, иначе html.parser.
+"""
+
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from django.conf import settings
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is optional
+    etree = None
+
+# Порядок важен: берём первое непустое значение
+TITLE_RULES = (("property", "og:title"), ("name", "twitter:title"))
+IMAGE_RULES = (
+    ("name", "twitter:image"),
+    ("name", "twitter:image:src"),
+    ("property", "og:image"),
+    ("property", "og:image:url"),
+    ("property", "og:image:secure_url"),
+)
+DESCRIPTION_RULES = (
+    ("property", "og:description"),
+    ("name", "twitter:description"),
+    ("name", "description"),
+)
+
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+
+def _wanted(key) -> bool:
+    return bool(key) and (key.startswith(("og:", "twitter:")) or key == "description")
+
+
+class _Comment(str):
+    pass
+
+
+class MetaCollector:
+    """
+    Приёмник событий парсера. Для каждого property/name запоминает content
+    первого встреченного тега (как soup.find), для <title> — аналог .string.
+    """
+
+    def __init__(self):
+        self.meta = {"property": {}, "name": {}}
+        self.title = None
+        self._title_seen = False
+        self._title_stack = None  # мини-дерево содержимого первого <title>
+
+    def start(self, tag, attrs):
+        if self._title_stack is not None:
+            node = []
+            self._title_stack[-1].append(node)
+            if tag not in VOID_TAGS:
+                self._title_stack.append(node)
+            return
+        if tag == "meta":
+            content = attrs.get("content") or ""
+            for attr in ("property", "name"):
+                key = attrs.get(attr)
+                if _wanted(key):
+                    self.meta[attr].setdefault(key, content)
+        elif tag == "title" and not self._title_seen:
+            self._title_seen = True
+            self._title_stack = [[]]
+
+    def end(self, tag):
+        if self._title_stack is None:
+            return
+        if len(self._title_stack) == 1:
+            if tag == "title":
+                self._finish_title()
+            return
+        self._title_stack.pop()
+
+    def data(self, text):
+        if self._title_stack is None:
+            return
+        children = self._title_stack[-1]
+        if children and type(children[-1]) is str:
+            children[-1] += text
+        else:
+            children.append(text)
+
+    def comment(self, text):
+        if self._title_stack is not None:
+            self._title_stack[-1].append(_Comment(text))
+
+    def close(self):
+        if self._title_stack is not None:
+            self._finish_title()
+        return self
+
+    def _finish_title(self):
+        self.title = _node_string(self._title_stack[0])
+        self._title_stack = None
+
+    def first(self, rules) -> str:
+        for attr, key in rules:
+            value = self.meta[attr].get(key)
+            if value is not None:
+                # как в старом _meta(): первый найденный тег решает, даже если content пуст
+                value = value.strip()
+                if value:
+                    return value
+        return ""
+
+
+def _node_string(children):
+    """Повторяет Tag.string из BeautifulSoup: текст единственного потомка или None."""
+    if len(children) != 1:
+        return None
+    child = children[0]
+    if isinstance(child, str):
+        return str(child)
+    return _node_string(child)
+
+
+class _StdlibDriver(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {k: v or "" for k, v in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, {k: v or "" for k, v in attrs})
+        if tag not in VOID_TAGS:
+            self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def handle_comment(self, data):
+        self.collector.comment(data)
+
+
+def _collect_stdlib(html: str) -> MetaCollector:
+    collector = MetaCollector()
+    driver = _StdlibDriver(collector)
+    driver.feed(html)
+    driver.close()
+    return collector.close()
+
+
+class _LxmlTarget:
+    def __init__(self, collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def comment(self, text):
+        self.collector.comment(text)
+
+    def close(self):
+        return self.collector.close()
+
+
+def _collect_lxml(html: str) -> MetaCollector:
+    if not html.strip():
+        return MetaCollector().close()
+    collector = MetaCollector()
+    parser = etree.HTMLParser(target=_LxmlTarget(collector), recover=True)
+    try:
+        parser.feed(html)
+        collector = parser.close()
+    except etree.LxmlError:
+        return _collect_stdlib(html)
+    if collector.title and "<" in collector.title:
+        # libxml2 читает <title> как сырой текст, а html.parser/BeautifulSoup разбирают
+        # вложенную разметку — в этом редком случае берём заголовок как раньше
+        collector.title = _collect_stdlib(html).title
+    return collector
+
+
+def _result(url, title, image, description):
+    data = {}
+    if title:
+        data["title"] = title
+    if image:
+        data["image_url"] = urljoin(url, image)
+    if description:
+        data["description"] = description
+    return data
+
+
+def _extract_collected(collect, html, url):
+    c = collect(html)
+    title = c.first(TITLE_RULES) or (c.title.strip() if c.title else "")
+    return _result(url, title, c.first(IMAGE_RULES), c.first(DESCRIPTION_RULES))
+
+
+def extract_bs4(html: str, url: str, soup=None) -> dict:
+    """Эталонная (прежняя) реализация на BeautifulSoup."""
+    from bs4 import BeautifulSoup
+
+    soup = soup or BeautifulSoup(html, "html.parser")
+
+    def _meta(prop=None, name=None):
+        if prop:
+            tag = soup.find("meta", property=prop)
+        else:
+            tag = soup.find("meta", attrs={"name": name})
+        return (tag.get("content") or "").strip() if tag and tag.get("content") else ""
+
+    def _first(rules):
+        for attr, key in rules:
+            value = _meta(prop=key) if attr == "property" else _meta(name=key)
+            if value:
+                return value
+        return ""
+
+    title = _first(TITLE_RULES) or (
+        soup.title.string.strip() if soup.title and soup.title.string else ""
+    )
+    return _result(url, title, _first(IMAGE_RULES), _first(DESCRIPTION_RULES))
+
+
+BACKENDS = {
+    "html.parser": lambda html, url: _extract_collected(_collect_stdlib, html, url),
+    "bs4": extract_bs4,
+}
+if etree is not None:
+    BACKENDS["lxml"] = lambda html, url: _extract_collected(_collect_lxml, html, url)
+
+
+def get_backend(name=None):
+    name = name or getattr(settings, "OG_PARSER_BACKEND", "auto")
+    if name == "auto":
+        name = "lxml" if "lxml" in BACKENDS else "html.parser"
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown OpenGraph parser backend: {name!r}") from None
+
+
+def extract(html: str, url: str, backend=None) -> dict:
+    """Вернуть {"title", "image_url", "description"} (только непустые ключи)."""
+    return get_backend(backend)(html, url)
@@ -0,0 +1,92 @@
+"""
+Single-flight для загрузок OpenGraph.
+
+og_preview дёргается на каждое изменение поля URL, а одну и ту же ссылку
+часто открывают одновременно в нескольких вкладках или у нескольких
+пользователей. Конкурентные вызовы с одним ключом делят одну загрузку:
+
+* внутри процесса — остальные потоки ждут результат ведущего потока;
+* между процессами — ведущий берёт короткую блокировку в общем кэше
+  (cache.add), остальные опрашивают кэш, пока там не появится результат.
+  Между процессами блокировка надёжна только там, где cache.add атомарен
+  (Redis, Memcached) — см. lists.checks.
+"""
+
+import threading
+import time
+import uuid
+
+from lists import og_cache
+from lists.audit import log_event
+from lists.pools import setting
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def do(key: str, fn, peek=None, **meta):
+    """
+    Выполнить fn() один раз среди всех конкурентных вызовов с этим key.
+
+    peek() читает результат, сохранённый другим процессом (None, если его ещё нет).
+    meta попадает в audit-событие og.flight.join.
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        log_event("og.flight.join", None, None, scope="thread", **meta)
+        if not call.done.wait(setting("OG_FLIGHT_LOCK_TTL", 15)):
+            return peek() if peek else None
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _run_locked(key, fn, peek, meta)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
+
+
+def _run_locked(key, fn, peek, meta):
+    cache = og_cache.get_cache()
+    lock_key = f"{key}:lock"
+    lock_ttl = setting("OG_FLIGHT_LOCK_TTL", 15)
+    token = uuid.uuid4().hex
+
+    if peek is None or cache.add(lock_key, token, lock_ttl):
+        try:
+            return fn()
+        finally:
+            if peek is not None and cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    # Ссылку уже загружает другой процесс — ждём, пока результат появится в кэше
+    log_event("og.flight.join", None, None, scope="process", **meta)
+    poll = setting("OG_FLIGHT_POLL_INTERVAL", 0.1)
+    deadline = time.monotonic() + lock_ttl
+    while time.monotonic() < deadline:
+        time.sleep(poll)
+        result = peek()
+        if result is not None:
+            return result
+        if cache.get(lock_key) is None:
+            break  # владелец закончил, ничего не сохранив (или блокировка истекла)
+    return fn()
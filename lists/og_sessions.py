@@ -0,0 +1,140 @@
+"""
+Пул HTTP-сессий для загрузчика OpenGraph.
+
+cloudscraper-сессия дорогая: свой пул соединений urllib3, TLS-рукопожатие и
+cookies после прохождения challenge Cloudflare. Поэтому держим простаивающие
+сессии по хостам и переиспользуем их между вызовами enrich_from_url.
+Сессия выдаётся одному потоку за раз (requests.Session не потокобезопасна).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import cloudscraper
+from django.conf import settings
+
+
+def create_scraper():
+    return cloudscraper.create_scraper(
+        browser={"browser": "chrome", "platform": "windows", "mobile": False}
+    )
+
+
+class SessionPool:
+    """
+    Ограниченный пул простаивающих сессий, сгруппированных по хосту.
+
+    max_size — всего простаивающих сессий в процессе, per_host — на один хост,
+    max_idle — через сколько секунд простоя сессия закрывается.
+    """
+
+    def __init__(self, factory=create_scraper, max_size=32, per_host=4, max_idle=300):
+        self.factory = factory
+        self.max_size = max_size
+        self.per_host = per_host
+        self.max_idle = max_idle
+        self._idle = OrderedDict()  # host -> [(session, last_used), ...]
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @contextmanager
+    def session(self, host: str):
+        sess = self._acquire(host)
+        try:
+            yield sess
+        finally:
+            self._release(host, sess)
+
+    def _acquire(self, host):
+        with self._lock:
+            self._check_fork()
+            stale = self._evict_idle()
+            bucket = self._idle.get(host)
+            sess = None
+            if bucket:
+                sess, _ = bucket.pop()
+                self._size -= 1
+                if not bucket:
+                    del self._idle[host]
+        _close_all(stale)
+        return sess or self.factory()
+
+    def _release(self, host, sess):
+        extra = []
+        with self._lock:
+            self._check_fork()
+            bucket = self._idle.setdefault(host, [])
+            bucket.append((sess, time.monotonic()))
+            self._idle.move_to_end(host)
+            self._size += 1
+            if len(bucket) > self.per_host:
+                extra.append(bucket.pop(0)[0])
+                self._size -= 1
+            while self._size > self.max_size:
+                # Вытесняем самую давнюю сессию самого давно использованного хоста
+                lru_host, lru_bucket = next(iter(self._idle.items()))
+                extra.append(lru_bucket.pop(0)[0])
+                self._size -= 1
+                if not lru_bucket:
+                    del self._idle[lru_host]
+        _close_all(extra)
+
+    def _evict_idle(self):
+        deadline = time.monotonic() - self.max_idle
+        stale = []
+        for host in list(self._idle):
+            bucket = self._idle[host]
+            fresh = [(s, t) for s, t in bucket if t >= deadline]
+            stale.extend(s for s, t in bucket if t < deadline)
+            if fresh:
+                self._idle[host] = fresh
+            else:
+                del self._idle[host]
+        self._size -= len(stale)
+        return stale
+
+    def _check_fork(self):
+        # Соединения, унаследованные от родителя после fork, использовать нельзя
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._size = 0
+
+    def clear(self):
+        with self._lock:
+            sessions = [s for bucket in self._idle.values() for s, _ in bucket]
+            self._idle.clear()
+            self._size = 0
+        _close_all(sessions)
+
+    def __len__(self):
+        return self._size
+
+
+def _close_all(sessions):
+    for sess in sessions:
+        try:
+            sess.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SessionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SessionPool(
+                    max_size=getattr(settings, "OG_SESSION_POOL_SIZE", 32),
+                    per_host=getattr(settings, "OG_SESSION_PER_HOST", 4),
+                    max_idle=getattr(settings, "OG_SESSION_IDLE_TIMEOUT", 300),
+                )
+    return _pool
@@ -0,0 +1,106 @@
+"""
+Фоновое обогащение товаров, созданных без OpenGraph-данных.
+
+Bulk add, импорт CSV и форма товара больше не ждут сторонние сайты: Item
+создаётся сразу со статусом pending (и ссылкой вместо названия, если его
+не было). manage.py enrich_items забирает pending-товары пачками, загружает
+метаданные через enrich_many и заполняет только пустые поля.
+"""
+
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from lists import og_cache
+from lists.audit import log_event
+from lists.models import Item
+from lists.og_batch import enrich_many
+
+STATUS_MAP = {
+    og_cache.STATUS_OK: Item.ENRICH_OK,
+    og_cache.STATUS_FAILED: Item.ENRICH_FAILED,
+    og_cache.STATUS_BLOCKED: Item.ENRICH_BLOCKED,
+}
+
+
+def deferred_enabled() -> bool:
+    """Создавать товары сразу (pending) вместо синхронной загрузки метаданных."""
+    return getattr(settings, "OG_DEFERRED_ENRICHMENT", True)
+
+
+def apply_result(item: Item, data: dict, status: str) -> str:
+    """
+    Записать результат загрузки в товар. Возвращает новый enrichment_status;
+    для STATUS_SKIPPED товар не трогаем — останется pending до следующего прохода.
+    """
+    new_status = STATUS_MAP.get(status)
+    if new_status is None:
+        return Item.ENRICH_PENDING
+
+    fields = ["enrichment_status", "updated_at"]
+    title = (data.get("title") or "").strip()[:200]
+    if title and item.has_placeholder_title():
+        item.title = title
+        item.slug = None  # slug строился из ссылки — пересоберём из названия
+        fields += ["title", "slug"]
+    image_url = (data.get("image_url") or "").strip()
+    if not item.image_url and image_url.startswith("https://") and len(image_url) <= 200:
+        item.image_url = image_url
+        fields.append("image_url")
+
+    item.enrichment_status = new_status
+    try:
+        item.save(update_fields=fields)
+    except ValidationError:
+        Item.objects.filter(pk=item.pk).update(enrichment_status=Item.ENRICH_FAILED)
+        return Item.ENRICH_FAILED
+    return new_status
+
+
+def drain(batch_size=None, limit=None) -> Counter:
+    """Один проход по pending-товарам. Возвращает Counter итоговых статусов."""
+    batch_size = batch_size or getattr(settings, "OG_ENRICH_BATCH_SIZE", 50)
+    totals = Counter()
+    last_pk = 0
+    seen = 0
+    while limit is None or seen < limit:
+        size = batch_size if limit is None else min(batch_size, limit - seen)
+        pks = list(
+            Item.objects.filter(enrichment_status=Item.ENRICH_PENDING, pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "url")[:size]
+        )
+        if not pks:
+            break
+        last_pk = pks[-1][0]
+        seen += len(pks)
+
+        start = time.monotonic()
+        results = enrich_many([url for _, url in pks if url], with_status=True)
+
+        # Пока шла загрузка, товар могли отредактировать или удалить
+        fresh = Item.objects.filter(
+            pk__in=[pk for pk, _ in pks], enrichment_status=Item.ENRICH_PENDING
+        ).select_related("wishlist")
+        batch = Counter()
+        for item in fresh:
+            if item.url:
+                data, status = results.get(item.url, ({}, og_cache.STATUS_SKIPPED))
+            else:
+                data, status = {}, og_cache.STATUS_FAILED
+            new_status = apply_result(item, data, status)
+            # новая картинка сама ставит превью в очередь (signals.item_thumbnail)
+            batch[new_status] += 1
+
+        log_event(
+            "item.enrich.batch",
+            None,
+            None,
+            items=len(pks),
+            ms=int((time.monotonic() - start) * 1000),
+            **batch,
+        )
+        totals.update(batch)
+    return totals
@@ -31,3 +31,11 @@ def can_edit(user, wl: Wishlist) -> AccessResult:
         if wl.accesses.filter(user_id=user.pk, role="edit").exists():
             return AccessResult(True, "shared-edit")
     return AccessResult(False, "not-owner")
+
+
+def can_view_history(user, wl: Wishlist) -> AccessResult:
+    if user.is_authenticated and user.pk == wl.owner_id:
+        return AccessResult(True, "owner")
+    if user.is_authenticated and user.is_staff:
+        return AccessResult(True, "staff")
+    return AccessResult(False, "not-owner")
@@ -0,0 +1,43 @@
+"""
+Общие помощники фоновой работы: чтение настроек с умолчанием и ленивые
+пулы потоков процесса (фоновая перепроверка OG, превью после коммита).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+class BackgroundPool:
+    """
+    ThreadPoolExecutor на процесс, создаётся при первой задаче.
+    Размер берётся из настройки workers_setting (по умолчанию — default_workers).
+    """
+
+    def __init__(self, thread_name_prefix, workers_setting, default_workers):
+        self.thread_name_prefix = thread_name_prefix
+        self.workers_setting = workers_setting
+        self.default_workers = default_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            # потоки пула не переживают fork — в дочернем процессе создаём заново
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=setting(self.workers_setting, self.default_workers),
+                    thread_name_prefix=self.thread_name_prefix,
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor().submit(fn, *args, **kwargs)
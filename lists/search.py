@@ -0,0 +1,90 @@
+"""
+Поиск по вишлистам (title, description) и товарам (title, note).
+
+PostgreSQL: полнотекстовый поиск по колонке search_vector (название — вес A,
+описание/заметка — вес B; колонку ведёт триггер, см. миграцию 0011) и нечёткое
+совпадение названия через pg_trgm (title %> 'запрос', т.е. word_similarity).
+Оба условия обслуживают GIN-индексы, поэтому время поиска не растёт вместе с
+числом списков у пользователя.
+
+Остальные СУБД (SQLite в тестах): icontains по тем же полям.
+
+Результат аннотирован search_rank — чем больше, тем релевантнее.
+"""
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+from .models import Item, Wishlist
+
+CONFIG = "simple"  # без стемминга: названия пишут на любом языке
+
+# (поле названия, поле текста) по моделям
+FIELDS = {
+    Wishlist: ("title", "description"),
+    Item: ("title", "note"),
+}
+
+# Лукап только на этих полях: django.contrib.postgres в INSTALLED_APPS не нужен
+for _model, (_title, _body) in FIELDS.items():
+    _model._meta.get_field(_title).register_lookup(TrigramWordSimilar)
+
+
+class SimpleBackend:
+    """icontains: совпадение в названии ранжируется выше, чем в тексте."""
+
+    def search(self, qs, q, title, body):
+        in_title = Q(**{f"{title}__icontains": q})
+        return qs.filter(in_title | Q(**{f"{body}__icontains": q})).annotate(
+            search_rank=Case(
+                When(in_title, then=Value(1.0)), default=Value(0.5), output_field=FloatField()
+            )
+        )
+
+
+class PostgresBackend:
+    def search(self, qs, q, title, body):
+        query = SearchQuery(q, config=CONFIG, search_type="websearch")
+        return qs.filter(
+            Q(search_vector=query) | Q(**{f"{title}__trigram_word_similar": q})
+        ).annotate(
+            search_rank=SearchRank(F("search_vector"), query) + TrigramWordSimilarity(q, title)
+        )
+
+
+def backend_for(qs):
+    if connections[qs.db].vendor == "postgresql":
+        return PostgresBackend()
+    return SimpleBackend()
+
+
+def search(qs, q: str):
+    """Отфильтровать qs (вишлисты или товары) по запросу q и добавить search_rank."""
+    title, body = FIELDS[qs.model]
+    return backend_for(qs).search(qs, q.strip(), title, body)
+
+
+RELEVANCE = "relevance"
+
+
+def list_params(request, default_sort="-created"):
+    """(q, sort) списочной страницы; поиск без явной сортировки — по релевантности."""
+    q = request.GET.get("q", "").strip()
+    return q, request.GET.get("sort") or (RELEVANCE if q else default_sort)
+
+
+def search_sorted(qs, q, sort, ordering_map, default="-created_at"):
+    """Поиск по q (если задан) и сортировка по ключу sort из ordering_map."""
+    order_by = ordering_map.get(sort, default)
+    if not q:
+        return qs.order_by(order_by)
+    qs = search(qs, q)
+    if sort == RELEVANCE:
+        return qs.order_by("-search_rank", order_by)
+    return qs.order_by(order_by)
@@ -1,73 +1,69 @@
-from django.db.models.signals import post_delete, post_save, pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .audit import log_event
+from . import thumbnails
+from .audit import in_bulk_operation, log_on_commit
 from .models import Item, Wishlist, WishlistAccess
 
-
-@receiver(pre_save, sender=Wishlist)
-def wishlist_pre_save(sender, instance: Wishlist, **kwargs):
-    if instance.pk:
-        try:
-            old = Wishlist.objects.only("title", "is_public").get(pk=instance.pk)
-            instance._old_title = old.title
-            instance._old_is_public = old.is_public
-        except Wishlist.DoesNotExist:
-            instance._old_title = None
-            instance._old_is_public = None
+ITEM_AUDIT_FIELDS = ("title", "url")
 
 
 @receiver(post_save, sender=Wishlist)
-def wishlist_post_save(sender, instance: Wishlist, created, **kwargs):
+def wishlist_post_save(sender, instance: Wishlist, created, update_fields=None, **kwargs):
+    if in_bulk_operation():
+        return  # пакетные операции пишут одну сводку, см. audit.log_bulk_event
     if created:
-        log_event(
+        log_on_commit(
+            ("wishlist", instance.pk),
             "wishlist.create",
             getattr(instance, "_last_actor", None),
             instance,
             is_public=instance.is_public,
         )
     else:
-        changes = {}
-        if hasattr(instance, "_old_title") and instance._old_title != instance.title:
-            changes["title"] = {"from": instance._old_title, "to": instance.title}
-        if hasattr(instance, "_old_is_public") and instance._old_is_public != instance.is_public:
-            changes["is_public"] = {"from": instance._old_is_public, "to": instance.is_public}
-            log_event(
+        # Старые значения — из снимка, сделанного при загрузке (TrackedFieldsMixin)
+        diff = instance.tracked_changes(update_fields)
+        changes = {name: {"from": old, "to": new} for name, (old, new) in diff.items()}
+        if "is_public" in diff:
+            log_on_commit(
+                ("wishlist.toggle_public", instance.pk),
                 "wishlist.toggle_public",
                 getattr(instance, "_last_actor", None),
                 instance,
-                old=instance._old_is_public,
+                old=diff["is_public"][0],
                 new=instance.is_public,
             )
         if changes:
-            log_event(
-                "wishlist.update", getattr(instance, "_last_actor", None), instance, changes=changes
+            log_on_commit(
+                ("wishlist", instance.pk),
+                "wishlist.update",
+                getattr(instance, "_last_actor", None),
+                instance,
+                changes=changes,
             )
 
 
 @receiver(post_delete, sender=Wishlist)
 def wishlist_post_delete(sender, instance: Wishlist, **kwargs):
-    log_event(
-        "wishlist.delete", None, instance, title=instance.title, was_public=instance.is_public
+    if in_bulk_operation():
+        return
+    log_on_commit(
+        ("wishlist", instance.pk),
+        "wishlist.delete",
+        None,
+        instance,
+        title=instance.title,
+        was_public=instance.is_public,
     )
 
 
-@receiver(pre_save, sender=Item)
-def item_pre_save(sender, instance: Item, **kwargs):
-    if instance.pk:
-        try:
-            old = Item.objects.only("title", "url").get(pk=instance.pk)
-            instance._old_title = old.title
-            instance._old_url = old.url
-        except Item.DoesNotExist:
-            instance._old_title = None
-            instance._old_url = None
-
-
 @receiver(post_save, sender=Item)
-def item_post_save(sender, instance: Item, created, **kwargs):
+def item_post_save(sender, instance: Item, created, update_fields=None, **kwargs):
+    if in_bulk_operation():
+        return
     if created:
-        log_event(
+        log_on_commit(
+            ("item", instance.pk),
             "item.create",
             getattr(instance, "_last_actor", None),
             instance.wishlist,
@@ -75,13 +71,13 @@ def item_post_save(sender, instance: Item, created, **kwargs):
             title=instance.title[:120],
         )
     else:
-        changes = {}
-        if hasattr(instance, "_old_title") and instance._old_title != instance.title:
-            changes["title"] = {"from": instance._old_title, "to": instance.title}
-        if hasattr(instance, "_old_url") and instance._old_url != instance.url:
-            changes["url"] = {"from": instance._old_url, "to": instance.url}
+        # image_url отслеживается ради превью (item_thumbnail), не аудита
+        fields = [f for f in update_fields or ITEM_AUDIT_FIELDS if f in ITEM_AUDIT_FIELDS]
+        diff = instance.tracked_changes(fields) if fields else {}
+        changes = {name: {"from": old, "to": new} for name, (old, new) in diff.items()}
         if changes:
-            log_event(
+            log_on_commit(
+                ("item", instance.pk),
                 "item.update",
                 getattr(instance, "_last_actor", None),
                 instance.wishlist,
@@ -90,16 +86,37 @@ def item_post_save(sender, instance: Item, created, **kwargs):
             )
 
 
+@receiver(post_save, sender=Item)
+def item_thumbnail(sender, instance: Item, created, update_fields=None, **kwargs):
+    # Новая картинка — сразу готовим локальное превью для карточек
+    if not created and "image_url" not in instance.tracked_changes(update_fields):
+        return
+    if instance.image_url and not instance.has_thumbnail:
+        thumbnails.schedule(instance)
+
+
 @receiver(post_delete, sender=Item)
 def item_post_delete(sender, instance: Item, **kwargs):
-    log_event("item.delete", None, instance.wishlist, url=instance.url, title=instance.title[:120])
+    if in_bulk_operation():
+        return
+    log_on_commit(
+        ("item", instance.pk),
+        "item.delete",
+        None,
+        instance.wishlist,
+        url=instance.url,
+        title=instance.title[:120],
+    )
 
 
 @receiver(post_save, sender=WishlistAccess)
 def log_access_save(sender, instance, created, **kwargs):
+    if in_bulk_operation():
+        return
     actor = getattr(instance, "_last_actor", None)
     if created:
-        log_event(
+        log_on_commit(
+            ("access", instance.pk),
             "access.grant",
             actor or instance.wishlist.owner,
             instance.wishlist,
@@ -107,7 +124,8 @@ def log_access_save(sender, instance, created, **kwargs):
             role=instance.role,
         )
     else:
-        log_event(
+        log_on_commit(
+            ("access", instance.pk),
             "access.update",
             actor or instance.wishlist.owner,
             instance.wishlist,
@@ -118,8 +136,11 @@ def log_access_save(sender, instance, created, **kwargs):
 
 @receiver(post_delete, sender=WishlistAccess)
 def log_access_delete(sender, instance, **kwargs):
+    if in_bulk_operation():
+        return
     actor = getattr(instance, "_last_actor", None)
-    log_event(
+    log_on_commit(
+        ("access", instance.pk),
         "access.revoke",
         actor or instance.wishlist.owner,
         instance.wishlist,
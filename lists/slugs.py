@@ -0,0 +1,158 @@
+"""
+Выделение уникальных слагов за один запрос.
+
+Все занятые слаги с нужным префиксом забираем одним SELECT ... LIKE 'base%',
+свободный суффикс выбираем в памяти. Между SELECT и INSERT слаг может занять
+параллельный запрос — тогда INSERT падает на уникальном ограничении, и
+save_retrying() выдаёт слаг заново.
+
+Схемы суффиксов прежние:
+  Wishlist — глобально уникален: base, затем base-<short_hash(owner, title)>;
+  Item     — уникален в пределах вишлиста: base, base-2, base-3, …
+"""
+
+import itertools
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import NamedTuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from slugify import slugify
+
+from .models import Item, Wishlist, short_hash
+
+SLUG_ATTEMPTS = 3
+CHUNK = 300  # префиксов в одном запросе: у SQLite ограничена глубина выражения
+
+
+def _wishlist_candidates(wishlist, base):
+    yield base
+    yield f"{base}-{short_hash(wishlist.owner_id, wishlist.title)}"
+    for i in itertools.count(1):
+        yield f"{base}-{short_hash(wishlist.owner_id, wishlist.title + str(i))}"
+
+
+def _item_candidates(item, base):
+    yield base
+    for i in itertools.count(2):
+        yield f"{base}-{i}"
+
+
+class _Scheme(NamedTuple):
+    scope: str  # поле, в пределах которого слаг уникален; None — глобально
+    fallback: str
+    max_base: int
+    candidates: object
+
+
+SCHEMES = {
+    Wishlist: _Scheme(None, "list", 170, _wishlist_candidates),
+    Item: _Scheme("wishlist_id", "item", 200, _item_candidates),
+}
+
+
+def _base(scheme, obj):
+    return (slugify(obj.title or "") or scheme.fallback)[: scheme.max_base]
+
+
+def _taken(model, scheme, pairs, exclude_pk=None) -> dict:
+    """pairs — (scope, base). Занятые слаги с этими префиксами: {scope: {slug, …}}."""
+    taken = defaultdict(set)
+    pairs = sorted(set(pairs), key=str)
+    fields = (scheme.scope, "slug") if scheme.scope else ("slug",)
+    for i in range(0, len(pairs), CHUNK):
+        cond = Q()
+        for scope, base in pairs[i : i + CHUNK]:
+            q = Q(slug__startswith=base)
+            if scheme.scope:
+                q &= Q(**{scheme.scope: scope})
+            cond |= q
+        qs = model._default_manager.filter(cond)
+        if exclude_pk is not None:
+            qs = qs.exclude(pk=exclude_pk)
+        for row in qs.values_list(*fields):
+            taken[row[0] if scheme.scope else None].add(row[-1])
+    return taken
+
+
+def _pick(scheme, obj, base, taken):
+    for cand in scheme.candidates(obj, base):
+        if cand not in taken:
+            return cand
+
+
+def allocate(obj) -> str:
+    """Свободный слаг для одного объекта: один запрос."""
+    scheme = SCHEMES[obj._meta.model]
+    scope = getattr(obj, scheme.scope) if scheme.scope else None
+    base = _base(scheme, obj)
+    taken = _taken(obj._meta.model, scheme, [(scope, base)], exclude_pk=obj.pk)
+    return _pick(scheme, obj, base, taken[scope])
+
+
+def assign(objs) -> list:
+    """
+    Пакетный режим: слаги для всех объектов без слага, один запрос на CHUNK
+    разных префиксов. Слаги внутри пакета тоже не повторяются.
+    """
+    pending = [obj for obj in objs if not obj.slug]
+    if not pending:
+        return objs
+    model = pending[0]._meta.model
+    scheme = SCHEMES[model]
+    keyed = [
+        (obj, getattr(obj, scheme.scope) if scheme.scope else None, _base(scheme, obj))
+        for obj in pending
+    ]
+    taken = _taken(model, scheme, [(scope, base) for _, scope, base in keyed])
+    for obj, scope, base in keyed:
+        obj.slug = _pick(scheme, obj, base, taken[scope])
+        taken[scope].add(obj.slug)
+    return objs
+
+
+def _savepoint():
+    # Вне транзакции упавшая попытка откатывается сама (save() сам открывает
+    # транзакцию или пишет в autocommit); внутри чужой (Postgres) без
+    # savepoint-а транзакция после ошибки уже непригодна
+    if transaction.get_connection().in_atomic_block:
+        return transaction.atomic()
+    return nullcontext()
+
+
+def save_retrying(obj, save, attempts=SLUG_ATTEMPTS):
+    """
+    save() для объекта с только что выданным слагом. IntegrityError со слагом,
+    который успел занять кто-то другой, — выдать новый и повторить; если новый
+    совпал со старым, конфликт не в слаге — пробрасываем.
+    save открывает транзакцию сам: тогда повтор — новая транзакция, и savepoint
+    нужен только если save_retrying вызван внутри чужой.
+    """
+    for attempt in range(attempts):
+        try:
+            with _savepoint():
+                return save()
+        except IntegrityError:
+            slug = allocate(obj)
+            if slug == obj.slug or attempt == attempts - 1:
+                raise
+            obj.slug = slug
+
+
+def bulk_create(model, objs, batch_size=None, attempts=SLUG_ATTEMPTS):
+    """model.objects.bulk_create() с выдачей слагов пакету и тем же повтором."""
+    objs = list(objs)
+    auto = [obj for obj in objs if not obj.slug]
+    assign(auto)
+    for attempt in range(attempts):
+        try:
+            with _savepoint():
+                return model._default_manager.bulk_create(objs, batch_size=batch_size)
+        except IntegrityError:
+            before = [obj.slug for obj in auto]
+            for obj in auto:
+                obj.slug = None
+            assign(auto)
+            if attempt == attempts - 1 or [obj.slug for obj in auto] == before:
+                raise
@@ -0,0 +1,25 @@
+from django import template
+
+from lists import thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def thumb_src(item):
+    """
+    Картинка для карточки: локальное JPEG-превью средней ширины или, пока его нет,
+    исходный image_url. {% include ... with image_url=item|thumb_src %}
+    """
+    if not item.has_thumbnail:
+        return item.image_url
+    ws = thumbnails.widths()
+    return thumbnails.url(item.thumb_key, ws[len(ws) // 2], "jpg")
+
+
+@register.filter
+def thumb_srcset(item, ext="webp"):
+    """srcset по всем ширинам превью ("" если превью нет): item|thumb_srcset:"jpg"."""
+    if not item.has_thumbnail:
+        return ""
+    return thumbnails.srcset(item.thumb_key, ext)
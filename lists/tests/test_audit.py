@@ -0,0 +1,536 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from lists import audit, audit_logging, slugs
+from lists.audit import log_event
+from lists.audit_logging import (
+    AuditDBHandler,
+    AuditJSONFormatter,
+    AuditQueueHandler,
+    ProcessSafeRotatingFileHandler,
+)
+from lists.audit_stats import log_files
+from lists.models import AuditEvent, Item, Wishlist
+
+User = get_user_model()
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.records = []
+        self.gate = threading.Event()
+
+    def emit(self, record):
+        self.gate.wait(5)
+        time.sleep(self.delay)
+        self.records.append(record)
+
+
+def make_record(msg):
+    return logging.LogRecord("wishlist.audit", logging.INFO, __file__, 0, msg, None, None)
+
+
+class AuditQueueHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.target = SlowHandler()
+        self.handler = AuditQueueHandler(None, queue_size=3, target=self.target)
+        self.addCleanup(self.handler.close)
+
+    def test_emit_does_not_wait_for_writer(self):
+        started = time.monotonic()
+        self.handler.handle(make_record({"event": "a"}))
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.target.records, [])
+
+        self.target.gate.set()
+        self.handler.flush()
+        self.assertEqual([r.msg["event"] for r in self.target.records], ["a"])
+
+    def test_overflow_is_dropped_and_reported(self):
+        for i in range(10):
+            self.handler.handle(make_record({"event": f"e{i}"}))
+        self.assertGreater(self.handler.dropped, 0)
+
+        self.target.gate.set()
+        self.handler.flush()
+        self.handler.handle(make_record({"event": "after"}))
+        self.handler.flush()
+        events = [r.msg["event"] for r in self.target.records]
+        self.assertEqual(events[-2:], ["audit.dropped", "after"])
+        self.assertEqual(self.target.records[-2].msg["count"] + len(events) - 2, 10)
+
+
+class ProcessSafeRotatingFileHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.path = os.path.join(self.dir, "audit.log")
+
+    def test_rotation_by_another_process_is_picked_up(self):
+        h1 = ProcessSafeRotatingFileHandler(self.path, maxBytes=200, backupCount=3)
+        h2 = ProcessSafeRotatingFileHandler(self.path, maxBytes=200, backupCount=3)
+        self.addCleanup(h1.close)
+        self.addCleanup(h2.close)
+        for i in range(20):
+            (h1 if i % 2 else h2).handle(make_record(f"line {i:02d} " + "x" * 20))
+
+        lines = []
+        for name in os.listdir(self.dir):
+            if name.endswith(".lock"):
+                continue
+            path = os.path.join(self.dir, name)
+            # ни один процесс не дописывает в файл, уже повёрнутый другим
+            self.assertLessEqual(os.path.getsize(path), 200, name)
+            with open(path) as fh:
+                lines += fh.read().splitlines()
+        self.assertEqual(sorted(lines), [f"line {i:02d} " + "x" * 20 for i in range(20)])
+
+
+class AuditFormatTests(SimpleTestCase):
+    def test_log_event_schema_and_models_reduced_to_ids(self):
+        user = User(id=7, username="u")
+        wl = Wishlist(id=3, slug="wl-abcd", title="WL")
+        with self.assertLogs("wishlist.audit") as logs:
+            log_event("access.grant", user, wl, granted_to=User(id=9), role="view")
+        payload = logs.records[0].msg
+        self.assertEqual(list(payload), ["ts", "event", "user_id", "wishlist_id", "meta"])
+        self.assertEqual((payload["user_id"], payload["wishlist_id"]), (7, 3))
+        self.assertEqual(
+            payload["meta"], {"granted_to": 9, "role": "view", "wishlist_slug": "wl-abcd"}
+        )
+
+    def test_formatter_writes_one_json_line(self):
+        formatter = AuditJSONFormatter()
+        record = make_record(
+            {
+                "ts": 1.5,
+                "event": "x",
+                "user_id": None,
+                "wishlist_id": None,
+                "meta": {"price": Decimal("9.99"), "who": User(id=4), "tags": {"a"}},
+            }
+        )
+        line = formatter.format(record)
+        self.assertNotIn("\n", line)
+        self.assertEqual(json.loads(line)["meta"], {"price": "9.99", "who": 4, "tags": ["a"]})
+
+        other = json.loads(formatter.format(make_record({"event": "audit.dropped", "count": 3})))
+        self.assertEqual((other["event"], other["meta"]), ("audit.dropped", {"count": 3}))
+
+
+@override_settings(
+    AUDIT_SAMPLING={"og.cache.*": 0.25},
+    AUDIT_RATE_LIMITS={"access.denied": ("user_id", 2, 60)},
+    AUDIT_SUMMARY_INTERVAL=60,
+)
+class AuditVolumeControlTests(SimpleTestCase):
+    def setUp(self):
+        audit._suppressed.clear()
+        audit._windows.clear()
+
+    def logged(self, events):
+        with self.assertLogs("wishlist.audit") as logs:
+            audit.logger.info("start")  # assertLogs требует хотя бы одну запись
+            for event, user in events:
+                log_event(event, user, None)
+        return [r.msg["event"] for r in logs.records if isinstance(r.msg, dict)]
+
+    def test_sampling_by_prefix_and_rate_limit_per_user(self):
+        anon, alice = User(), User(id=5)
+        rolls = iter([0.1, 0.9, 0.3, 0.2])
+        with mock.patch("lists.audit.random.random", lambda: next(rolls)):
+            events = self.logged(
+                [("og.cache.hit", None)] * 4
+                + [("access.denied", anon)] * 3
+                + [("access.denied", alice)]
+                + [("share.revoke", anon)]
+            )
+        self.assertEqual(events, ["og.cache.hit"] * 2 + ["access.denied"] * 3 + ["share.revoke"])
+        self.assertEqual(
+            audit._suppressed, {("og.cache.hit", None): [2, 0], ("access.denied", None): [0, 1]}
+        )
+
+    @override_settings(AUDIT_RATE_LIMITS={"og.fetch.*": ("host", 2, 60)}, AUDIT_SAMPLING={})
+    def test_wildcard_limit_is_shared_by_its_events(self):
+        with self.assertLogs("wishlist.audit") as logs:
+            for event in ("og.fetch.ok", "og.fetch.error", "og.fetch.blocked", "og.fetch.ok"):
+                log_event(event, None, None, host="ex.com")
+            log_event("og.fetch.ok", None, None, host="other.com")
+        self.assertEqual(
+            [(r.msg["event"], r.msg["meta"]["host"]) for r in logs.records],
+            [("og.fetch.ok", "ex.com"), ("og.fetch.error", "ex.com"), ("og.fetch.ok", "other.com")],
+        )
+        self.assertEqual(
+            audit._suppressed,
+            {
+                ("og.fetch.blocked", ("host", "ex.com")): [0, 1],
+                ("og.fetch.ok", ("host", "ex.com")): [0, 1],
+            },
+        )
+        with self.assertLogs("wishlist.audit") as logs:
+            audit.flush_suppressed(force=True)
+        self.assertEqual(
+            sorted((r.msg["meta"]["event"], r.msg["meta"]["host"]) for r in logs.records),
+            [("og.fetch.blocked", "ex.com"), ("og.fetch.ok", "ex.com")],
+        )
+
+    def test_suppressed_counts_are_summarised(self):
+        with mock.patch("lists.audit.random.random", return_value=0.9):
+            self.logged([("og.cache.miss", None)] * 3)
+        with self.assertLogs("wishlist.audit") as logs:
+            audit.flush_suppressed(force=True)
+        (record,) = logs.records
+        self.assertEqual(record.msg["event"], "audit.suppressed")
+        self.assertEqual(
+            {k: record.msg["meta"][k] for k in ("event", "sampled_out", "rate_limited")},
+            {"event": "og.cache.miss", "sampled_out": 3, "rate_limited": 0},
+        )
+        self.assertEqual(audit._suppressed, {})
+
+
+class AnalyzeAuditCommandTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.path = os.path.join(self.tmp, "audit.jsonl")
+
+    def write(self, path, records, opener=open):
+        with opener(path, "wt", encoding="utf-8") as fh:
+            for rec in records:
+                fh.write((json.dumps(rec) if isinstance(rec, dict) else rec) + "\n")
+
+    def rec(self, name, wishlist_id=None, **meta):
+        return {
+            "ts": 100.0,
+            "event": name,
+            "user_id": None,
+            "wishlist_id": wishlist_id,
+            "meta": meta,
+        }
+
+    def test_aggregates_current_rotated_and_gzipped_files(self):
+        self.write(
+            self.path, [self.rec("og.fetch.ok", host="a.com", ms=ms) for ms in range(1, 101)]
+        )
+        self.write(
+            self.path + ".1",
+            [self.rec("access.denied", 7)] * 3 + ["{broken"] + [self.rec("access.denied", 8)],
+        )
+        self.write(
+            self.path + ".2.gz",
+            [
+                self.rec("audit.suppressed", event="access.denied", sampled_out=0, rate_limited=5),
+                self.rec("audit.suppressed", event="og.fetch.ok", host="a.com", rate_limited=20),
+                self.rec("audit.suppressed", event="og.fetch.error", host="b.com", rate_limited=4),
+            ],
+            opener=gzip.open,
+        )
+        self.assertEqual(
+            [os.path.basename(p) for p in log_files(self.path)],
+            ["audit.jsonl.2.gz", "audit.jsonl.1", "audit.jsonl"],
+        )
+
+        out = StringIO()
+        call_command(
+            "analyze_audit",
+            self.path,
+            self.path + ".1",
+            self.path + ".2.gz",
+            format="json",
+            stdout=out,
+        )
+        result = json.loads(out.getvalue())
+        self.assertEqual(result["bad_lines"], 1)
+        self.assertEqual(
+            result["events"]["access.denied"], {"logged": 4, "suppressed": 5, "total": 9}
+        )
+        host = result["hosts"]["a.com"]
+        self.assertEqual((host["count"], host["suppressed"]), (100, 20))
+        self.assertEqual((host["p50"], host["max"]), (50, 100))
+        self.assertEqual(
+            (result["hosts"]["b.com"]["count"], result["hosts"]["b.com"]["suppressed"]), (0, 4)
+        )
+        self.assertLessEqual(abs(host["p95"] - 95), 2)
+        self.assertEqual(result["top_wishlists"][0], {"wishlist_id": 7, "events": 3})
+
+        out = StringIO()
+        call_command("analyze_audit", self.path + ".1", event="og.", stdout=out)
+        self.assertIn("0 records", out.getvalue())
+
+        out = StringIO()
+        call_command("analyze_audit", self.path, self.path + ".2.gz", event="og.", stdout=out)
+        self.assertRegex(out.getvalue(), r"a\.com\s+100\s+20\s+50")
+
+
+def event_record(event, wishlist_id=None, ts=1_700_000_000.0, **meta):
+    return make_record(
+        {"ts": ts, "event": event, "user_id": None, "wishlist_id": wishlist_id, "meta": meta}
+    )
+
+
+class AuditDBHandlerTests(TestCase):
+    def setUp(self):
+        self.handler = AuditDBHandler(batch_size=3, exclude_prefixes=("og.",))
+        self.addCleanup(self.handler.close)
+
+    def test_events_are_buffered_and_written_in_one_insert(self):
+        with self.assertNumQueries(0):
+            self.handler.handle(event_record("item.create", 1, price=Decimal("1.50")))
+            self.handler.handle(event_record("og.cache.hit"))
+            self.handler.handle(event_record("item.delete", 1))
+        self.handler.flush()
+
+        rows = list(AuditEvent.objects.order_by("id"))
+        self.assertEqual([r.event for r in rows], ["item.create", "item.delete"])
+        self.assertEqual(rows[0].meta, {"price": "1.50"})
+        self.assertEqual(rows[0].ts, datetime.fromtimestamp(1_700_000_000, tz=timezone.utc))
+
+    def test_events_without_wishlist_are_not_stored(self):
+        self.handler.handle(event_record("thumb.ok", key="abc"))
+        self.handler.handle(event_record("audit.suppressed", sampled_out=3))
+        self.assertEqual(self.handler._buffer, [])
+
+    def test_pool_threads_leave_full_buffer_to_request_path(self):
+        def worker():
+            for i in range(4):
+                self.handler.handle(event_record("item.create", 1, n=i))
+
+        with mock.patch.object(self.handler, "flush") as flush:
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        flush.assert_not_called()
+        self.assertEqual(len(self.handler._buffer), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.handler.handle(event_record("item.delete", 1))  # главный поток забирает буфер
+        self.assertEqual(AuditEvent.objects.count(), 5)
+
+    def inserts(self):
+        return mock.patch.object(
+            AuditEvent.objects, "bulk_create", wraps=AuditEvent.objects.bulk_create
+        )
+
+    def test_full_batch_inside_transaction_waits_for_commit(self):
+        with self.inserts() as bulk_create:
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(4):
+                    self.handler.handle(event_record("item.create", 1, n=i))
+                self.assertFalse(AuditEvent.objects.exists())
+        self.assertEqual(bulk_create.call_count, 1)
+        self.assertEqual(AuditEvent.objects.count(), 4)
+
+    def test_held_writes_go_out_as_one_batch(self):
+        with self.inserts() as bulk_create:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with audit_logging.hold_db_writes():
+                    for i in range(7):
+                        self.handler.handle(event_record("item.create", 1, n=i))
+                    self.assertEqual(callbacks, [])
+        self.assertEqual(bulk_create.call_count, 1)
+        self.assertEqual(AuditEvent.objects.count(), 7)
+
+
+@mock.patch.object(audit_logging, "_db_handlers", weakref.WeakSet())
+class WishlistHistoryViewTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", email="owner@example.com", password="pw")
+        self.wl = Wishlist.objects.create(owner=self.owner, title="Birthday")
+        self.url = reverse("wishlist_history", kwargs={"slug": self.wl.slug})
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        # у пар событий одинаковый ts — курсор должен различать их по id
+        AuditEvent.objects.bulk_create(
+            AuditEvent(ts=base + timedelta(seconds=i // 2), event=f"e{i}", wishlist_id=self.wl.pk)
+            for i in range(7)
+        )
+        AuditEvent.objects.create(ts=base, event="other", wishlist_id=self.wl.pk + 1)
+
+    def test_keyset_pages_cover_all_events_once(self):
+        self.client.force_login(self.owner)
+        seen, params = [], {}
+        with mock.patch("lists.views_front.WishlistHistoryView.page_size", 3):
+            while True:
+                resp = self.client.get(self.url, params)
+                seen += [e.event for e in resp.context["events"]]
+                if not resp.context["next_cursor"]:
+                    break
+                params = {"before": resp.context["next_cursor"]}
+        self.assertEqual(seen, [f"e{i}" for i in reversed(range(7))])
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        self.client.force_login(self.owner)
+        first = [e.event for e in self.client.get(self.url).context["events"]]
+        for before in ("x-1", "1-", "²-1", "999999999999999999-1", f"1-{2**63}"):
+            resp = self.client.get(self.url, {"before": before})
+            self.assertEqual(resp.status_code, 200, before)
+            self.assertEqual([e.event for e in resp.context["events"]], first)
+
+    def test_only_owner_and_staff_can_see_history(self):
+        User.objects.create_user("guest", email="guest@example.com", password="pw")
+        self.client.login(username="guest", password="pw")
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        User.objects.create_user("admin", email="admin@example.com", password="pw", is_staff=True)
+        self.client.login(username="admin", password="pw")
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class TrackedFieldsSignalTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user("owner", email="owner@example.com", password="pw")
+        # события сигналов пишутся после коммита — «коммитим» создание сразу
+        with self.captureOnCommitCallbacks(execute=True):
+            wl = Wishlist.objects.create(owner=owner, title="Birthday")
+            self.item = Item.objects.create(wishlist=wl, title="Phone", url="https://ex.com/p")
+
+    def audit_events(self, fn):
+        with self.assertLogs("wishlist.audit") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                fn()
+        return {r.msg["event"]: r.msg["meta"] for r in logs.records}
+
+    def test_update_diffs_come_from_loaded_snapshot(self):
+        item = Item.objects.select_related("wishlist").get(pk=self.item.pk)
+        item.title = "Phone 2"
+        # unique-проверки full_clean + UPDATE + touch; старые значения для diff и
+        # для счётчиков (цена и статусы не менялись) — из снимка, без своего SELECT
+        with self.assertNumQueries(4):
+            events = self.audit_events(item.save)
+        self.assertEqual(
+            events["item.update"]["changes"], {"title": {"from": "Phone", "to": "Phone 2"}}
+        )
+
+        # снимок обновился после save: повторное сохранение ничего не меняет
+        with self.assertNoLogs("wishlist.audit"):
+            item.save(update_fields=["note"])
+
+        wl = item.wishlist
+        wl.is_public = True
+        events = self.audit_events(wl.save)
+        self.assertEqual(
+            (events["wishlist.toggle_public"]["old"], events["wishlist.toggle_public"]["new"]),
+            (False, True),
+        )
+
+    def test_events_wait_for_commit_merge_per_object_and_skip_rolled_back_work(self):
+        wl = self.item.wishlist
+        with self.assertLogs("wishlist.audit") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                item = Item.objects.create(wishlist=wl, title="Draft", url="https://ex.com/a")
+                item.title = "Final"
+                item.save()
+                self.item.title = "Phone 2"
+                self.item.save()
+                self.item.title = "Phone 3"
+                self.item.save()
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    Item.objects.create(wishlist=wl, title="Rolled back")
+                    self.item.url = "https://ex.com/rolled-back"
+                    self.item.save()
+                    raise RuntimeError
+                Item.objects.create(wishlist=wl, title="Gone").delete()
+                audit.logger.info("in transaction")  # до коммита ничего не записано
+        events = [
+            (r.msg["event"], r.msg["meta"]) for r in logs.records if r.msg != "in transaction"
+        ]
+        self.assertEqual(logs.records[0].msg, "in transaction")
+        self.assertEqual(
+            [(e, m.get("title"), m.get("changes")) for e, m in events],
+            [
+                ("item.create", "Final", None),
+                ("item.update", None, {"title": {"from": "Phone", "to": "Phone 3"}}),
+            ],
+        )
+
+    def test_rolled_back_events_stay_out_while_callbacks_are_referenced(self):
+        wl = self.item.wishlist
+        with self.assertLogs("wishlist.audit") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                Item.objects.create(wishlist=wl, title="Kept")
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    Item.objects.create(wishlist=wl, title="Rolled back")
+                    # чужая ссылка на колбэки (как у debug toolbar) не воскрешает их
+                    held = list(connection.run_on_commit)
+                    raise RuntimeError
+        self.assertTrue(held)
+        self.assertEqual(
+            [(r.msg["event"], r.msg["meta"]["title"]) for r in logs.records],
+            [("item.create", "Kept")],
+        )
+
+    def test_fields_outside_update_fields_and_deferred_fields_are_not_reported(self):
+        item = Item.objects.get(pk=self.item.pk)
+        item.title, item.url = "Other", "https://ex.com/q"
+        events = self.audit_events(lambda: item.save(update_fields=["url"]))
+        self.assertEqual(list(events["item.update"]["changes"]), ["url"])
+
+        item = Item.objects.only("id", "wishlist").get(pk=self.item.pk)
+        self.assertEqual(item.tracked_changes(), {})
+        item.title  # подгрузка отложенного поля попадает в снимок
+        item.title = "Loaded later"
+        self.assertEqual(item.tracked_changes(), {"title": ("Phone", "Loaded later")})
+
+
+class BulkAuditTests(TestCase):
+    def test_seed_and_wipe_write_one_summary_per_batch(self):
+        owner = User.objects.create_user("owner", email="owner@example.com", password="pw")
+        opts = {"force": True, "tag": "t1", "stdout": StringIO()}
+        with self.assertLogs("wishlist.audit") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("seed_wishlist", user=owner.pk, wl=2, items=3, **opts)
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("wipe_wishlist", **opts)
+        events = [r.msg for r in logs.records]
+
+        self.assertEqual(
+            [e["event"] for e in events],
+            ["wishlist.bulk_create", "item.bulk_create", "wishlist.bulk_delete"],
+        )
+        created, items, deleted = (e["meta"] for e in events)
+        self.assertEqual((created["count"], items["count"], items["wishlists"]), (2, 6, 2))
+        self.assertEqual(items["id_max"] - items["id_min"], 5)
+        self.assertEqual(
+            {k: deleted[k] for k in ("count", "items", "id_min", "id_max", "filters")},
+            {
+                "count": 2,
+                "items": 6,
+                "id_min": created["id_min"],
+                "id_max": created["id_max"],
+                "filters": {"tag": "t1"},
+            },
+        )
+        self.assertFalse(Wishlist.objects.exists())
+
+    def test_rolled_back_seed_leaves_no_summary(self):
+        owner = User.objects.create_user("owner", email="owner@example.com", password="pw")
+        bulk_create = slugs.bulk_create
+
+        def fail_on_items(model, objs, **kwargs):
+            if model is Item:
+                raise RuntimeError("boom")
+            return bulk_create(model, objs, **kwargs)
+
+        with self.assertNoLogs("wishlist.audit"), self.captureOnCommitCallbacks(execute=True):
+            with mock.patch.object(slugs, "bulk_create", fail_on_items):
+                with self.assertRaises(RuntimeError):
+                    call_command("seed_wishlist", user=owner.pk, force=True, stdout=StringIO())
+        self.assertFalse(Wishlist.objects.exists())
@@ -0,0 +1,122 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lists.models import Item, Wishlist
+
+User = get_user_model()
+
+
+class WishlistCountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u = User.objects.create_user("u", "u@e.com", "p")
+
+    def setUp(self):
+        self.wl = Wishlist.objects.create(owner=self.u, title="Gifts")
+
+    def stats(self, wl=None):
+        wl = Wishlist.objects.get(pk=(wl or self.wl).pk)
+        totals = {t.currency: t.amount for t in wl.price_totals.all() if t.amount}
+        return wl.item_count, wl.purchased_count, wl.reserved_count, totals
+
+    def test_item_save_and_delete(self):
+        a = Item.objects.create(
+            wishlist=self.wl, title="A", price_amount=Decimal("10.50"), price_currency="EUR"
+        )
+        Item.objects.create(wishlist=self.wl, title="B", is_reserved=True)
+        self.assertEqual(self.stats(), (2, 0, 1, {"EUR": Decimal("10.50")}))
+
+        a.is_purchased = True
+        a.price_amount = Decimal("12.00")
+        a.save()
+        self.assertEqual(self.stats(), (2, 1, 1, {"EUR": Decimal("12.00")}))
+
+        other = Wishlist.objects.create(owner=self.u, title="Other")
+        a.wishlist = other
+        a.save(update_fields=["wishlist"])
+        self.assertEqual(self.stats(), (1, 0, 1, {}))
+        self.assertEqual(self.stats(other), (1, 1, 0, {"EUR": Decimal("12.00")}))
+
+        Item.objects.get(pk=a.pk).delete()
+        self.assertEqual(self.stats(other), (0, 0, 0, {}))
+
+    def test_stale_copies_do_not_double_count(self):
+        item = Item.objects.create(wishlist=self.wl, title="A", price_amount=5)
+        # два запроса загрузили товар до того, как любой из них сохранился
+        first, second = Item.objects.get(pk=item.pk), Item.objects.get(pk=item.pk)
+        first.is_purchased = True
+        first.save()
+        second.is_purchased, second.price_amount = True, Decimal("7.00")
+        second.save()
+        self.assertEqual(self.stats(), (1, 1, 0, {"": Decimal("7.00")}))
+
+        first.delete()
+        second.delete()  # строки уже нет — вычитать нечего
+        self.assertEqual(self.stats(), (0, 0, 0, {}))
+
+    def test_edit_outside_stats_keeps_concurrent_price(self):
+        item = Item.objects.create(wishlist=self.wl, title="A", price_amount=5)
+        stale = Item.objects.get(pk=item.pk)
+        fresh = Item.objects.get(pk=item.pk)
+        fresh.price_amount = Decimal("9.00")
+        fresh.save()
+
+        stale.note = "gift wrap"
+        with CaptureQueriesContext(connection) as queries:
+            stale.save(validation=Item.VALIDATE_FAST)
+        # ни SELECT … FOR UPDATE, ни других чтений
+        self.assertFalse([q for q in queries if q["sql"].startswith("SELECT")])
+        self.assertEqual(Item.objects.get(pk=item.pk).price_amount, Decimal("9.00"))
+        self.assertEqual(self.stats(), (1, 0, 0, {"": Decimal("9.00")}))
+
+    def test_deferred_fields_keep_stored_values(self):
+        item = Item.objects.create(wishlist=self.wl, title="A", is_reserved=True)
+        partial = Item.objects.only("id", "title").get(pk=item.pk)
+        partial.title = "B"
+        partial.save()
+        self.assertEqual(self.stats(), (1, 0, 1, {}))
+
+    def test_bulk_paths(self):
+        Item.objects.bulk_create(
+            Item(wishlist=self.wl, title=f"I{i}", price_amount=5, price_currency="USD")
+            for i in range(4)
+        )
+        self.assertEqual(self.stats(), (4, 0, 0, {"USD": Decimal("20.00")}))
+
+        Item.objects.filter(wishlist=self.wl, title__in=["I0", "I1"]).update(is_purchased=True)
+        self.assertEqual(self.stats(), (4, 2, 0, {"USD": Decimal("20.00")}))
+
+        Item.objects.filter(wishlist=self.wl, is_purchased=True).delete()
+        self.assertEqual(self.stats(), (2, 0, 0, {"USD": Decimal("10.00")}))
+
+    def test_reconcile_fixes_drift(self):
+        Item.objects.create(wishlist=self.wl, title="A", price_amount=3, price_currency="CZK")
+        Wishlist.objects.filter(pk=self.wl.pk).update(item_count=99)
+        self.wl.price_totals.all().delete()
+
+        call_command("reconcile_wishlist_stats", "--dry-run", stdout=StringIO())
+        self.assertEqual(self.stats()[0], 99)
+        call_command("reconcile_wishlist_stats", "--batch-size", "1", stdout=StringIO())
+        self.assertEqual(self.stats(), (1, 0, 0, {"CZK": Decimal("3.00")}))
+
+    def test_list_cards_do_not_query_per_wishlist(self):
+        self.client.force_login(self.u)
+        url = reverse("wishlist_list")
+        self.client.get(url)  # прогрев сессии
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(url)
+        for i in range(5):
+            wl = Wishlist.objects.create(owner=self.u, title=f"W{i}")
+            Item.objects.create(wishlist=wl, title="X", price_amount=1, price_currency="USD")
+        with CaptureQueriesContext(connection) as six:
+            resp = self.client.get(url)
+        self.assertEqual(len(six), len(one))
+        self.assertContains(resp, "1 item")
+        self.assertContains(resp, "1.00 USD")
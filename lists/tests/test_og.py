@@ -0,0 +1,565 @@
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from lists import (
+    checks,
+    og,
+    og_batch,
+    og_breaker,
+    og_cache,
+    og_extract,
+    og_sessions,
+    og_worker,
+    thumbnails,
+)
+from lists.management.commands import _og_standin as og_standin
+from lists.models import Item, Wishlist
+
+User = get_user_model()
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "og"
+
+
+@override_settings(OG_CACHE_ALIAS="default")
+class OgCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_normalize_url_drops_fragment_and_tracking(self):
+        self.assertEqual(
+            og_cache.normalize_url("HTTPS://Shop.Example.com:443/p/1?utm_source=x&id=5#top"),
+            "https://shop.example.com/p/1?id=5",
+        )
+
+    def test_second_call_is_served_from_cache(self):
+        data = {"title": "Phone", "image_url": "https://cdn.ex.com/p.jpg"}
+        with mock.patch.object(og, "_fetch_og", return_value=(data, og_cache.STATUS_OK)) as f:
+            self.assertEqual(og.enrich_from_url("https://ex.com/p?utm_medium=a"), data)
+            self.assertEqual(og.enrich_from_url("https://ex.com/p"), data)
+        self.assertEqual(f.call_count, 1)
+
+    def test_failures_are_cached_negatively(self):
+        with mock.patch.object(og, "_fetch_og", return_value=({}, og_cache.STATUS_FAILED)) as f:
+            og.enrich_from_url("https://ex.com/broken")
+            og.enrich_from_url("https://ex.com/broken")
+        self.assertEqual(f.call_count, 1)
+
+    def test_use_cache_false_always_fetches(self):
+        with mock.patch.object(og, "_fetch_og", return_value=({}, og_cache.STATUS_OK)) as f:
+            og.enrich_from_url("https://ex.com/x", use_cache=False)
+            og.enrich_from_url("https://ex.com/x", use_cache=False)
+        self.assertEqual(f.call_count, 2)
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@override_settings(OG_CACHE_ALIAS="default", OG_CACHE_TTL=60)
+class RevalidationTests(SimpleTestCase):
+    url = "https://ex.com/p"
+    data = {"title": "Phone", "image_url": "https://cdn.ex.com/p.jpg"}
+    validators = {"etag": '"v1"', "last_modified": "Wed, 01 Oct 2025 10:00:00 GMT"}
+
+    def setUp(self):
+        cache.clear()
+        og_cache.store(self.url, "ex.com", self.data, og_cache.STATUS_OK, self.validators)
+        entry = cache.get(og_cache.url_key(self.url))
+        entry["expires"] = entry["ts"] = time.time() - 1  # устарела секунду назад
+        cache.set(og_cache.url_key(self.url), entry)
+
+    def test_not_modified_extends_freshness(self):
+        with override_settings(OG_STALE_WHILE_REVALIDATE=False):
+            with mock.patch.object(
+                og, "_fetch_og", return_value=({}, og_cache.STATUS_NOT_MODIFIED)
+            ) as f:
+                self.assertEqual(og.enrich_from_url(self.url), self.data)
+                self.assertEqual(og.enrich_from_url(self.url), self.data)
+        f.assert_called_once_with(self.url, validators=self.validators)
+        self.assertTrue(og_cache.is_fresh(cache.get(og_cache.url_key(self.url))))
+
+    def test_changed_page_replaces_entry(self):
+        new = {"title": "Phone 2", "etag": '"v2"'}
+        with override_settings(OG_STALE_WHILE_REVALIDATE=False):
+            with mock.patch.object(og, "_fetch_og", return_value=(new, og_cache.STATUS_OK)):
+                self.assertEqual(og.enrich_from_url(self.url), {"title": "Phone 2"})
+        entry = cache.get(og_cache.url_key(self.url))
+        self.assertEqual(entry["validators"], {"etag": '"v2"'})
+
+    def test_error_keeps_serving_stale_data(self):
+        with override_settings(OG_STALE_WHILE_REVALIDATE=False):
+            with mock.patch.object(og, "_fetch_og", return_value=({}, og_cache.STATUS_FAILED)):
+                self.assertEqual(og.enrich_from_url(self.url), self.data)
+        self.assertEqual(cache.get(og_cache.url_key(self.url))["status"], og_cache.STATUS_OK)
+
+    def test_stale_while_revalidate_returns_at_once(self):
+        new = ({"title": "Phone 2"}, og_cache.STATUS_OK)
+        with mock.patch.object(og, "_refresh_pool", InlineExecutor()):
+            with mock.patch.object(og, "_fetch_og", return_value=new) as f:
+                self.assertEqual(og.enrich_from_url(self.url), self.data)
+                self.assertEqual(og.enrich_from_url(self.url), {"title": "Phone 2"})
+        f.assert_called_once()
+        self.assertIsNone(cache.get(f"{og_cache.url_key(self.url)}:refresh"))
+
+    def test_background_refresh_runs_once_per_url(self):
+        pool = mock.Mock()
+        with mock.patch.object(og, "_refresh_pool", pool):
+            og.enrich_from_url(self.url)
+            og.enrich_from_url(self.url)
+        self.assertEqual(pool.submit.call_count, 1)
+
+    def test_fetch_sends_conditional_headers(self):
+        scraper = mock.Mock()
+        scraper.get.return_value = FakeStreamResponse(b"", status_code=304)
+        pool = og_sessions.SessionPool(factory=lambda: scraper)
+        with mock.patch.object(og_sessions, "get_pool", return_value=pool):
+            result = og._fetch_og(self.url, validators=self.validators)
+        self.assertEqual(result, ({}, og_cache.STATUS_NOT_MODIFIED))
+        headers = scraper.get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"v1"')
+        self.assertEqual(headers["If-Modified-Since"], self.validators["last_modified"])
+
+
+@override_settings(
+    OG_CACHE_ALIAS="default",
+    OG_BREAKER_THRESHOLD=3,
+    OG_BREAKER_BASE_BACKOFF=30,
+    OG_BREAKER_MAX_BACKOFF=100,
+)
+class CircuitBreakerTests(SimpleTestCase):
+    host = "shop.ex.com"
+
+    def setUp(self):
+        cache.clear()
+
+    def _trip(self):
+        for _ in range(3):
+            og_breaker.record_failure(self.host)
+
+    def test_opens_after_threshold(self):
+        og_breaker.record_failure(self.host)
+        og_breaker.record_failure(self.host)
+        self.assertEqual(og_breaker.state(self.host), og_breaker.CLOSED)
+        og_breaker.record_failure(self.host)
+        self.assertEqual(og_breaker.state(self.host), og_breaker.OPEN)
+        self.assertFalse(og_breaker.allow(self.host))
+
+    def test_success_resets_failure_count(self):
+        og_breaker.record_failure(self.host)
+        og_breaker.record_failure(self.host)
+        og_breaker.record_success(self.host)
+        og_breaker.record_failure(self.host)
+        self.assertEqual(og_breaker.state(self.host), og_breaker.CLOSED)
+
+    def test_open_circuit_skips_fetch_for_other_urls(self):
+        self._trip()
+        with mock.patch.object(og, "_fetch_og") as f:
+            self.assertEqual(og.enrich_from_url("https://shop.ex.com/a"), {})
+            self.assertEqual(og.enrich_from_url("https://SHOP.ex.com/b"), {})
+        f.assert_not_called()
+
+    def test_half_open_allows_single_probe(self):
+        self._trip()
+        with mock.patch.object(og_breaker.time, "time", return_value=time.time() + 31):
+            self.assertEqual(og_breaker.state(self.host), og_breaker.HALF_OPEN)
+            self.assertTrue(og_breaker.allow(self.host))
+            self.assertFalse(og_breaker.allow(self.host))
+            og_breaker.record_success(self.host)
+            self.assertEqual(og_breaker.state(self.host), og_breaker.CLOSED)
+
+    def test_failed_probe_doubles_backoff(self):
+        self._trip()
+        later = time.time() + 31
+        with mock.patch.object(og_breaker.time, "time", return_value=later):
+            self.assertTrue(og_breaker.allow(self.host))
+            og_breaker.record_failure(self.host)
+        with mock.patch.object(og_breaker.time, "time", return_value=later + 59):
+            self.assertEqual(og_breaker.state(self.host), og_breaker.OPEN)
+        with mock.patch.object(og_breaker.time, "time", return_value=later + 61):
+            self.assertEqual(og_breaker.state(self.host), og_breaker.HALF_OPEN)
+        self.assertEqual(og_breaker.backoff(10), 100)
+
+    def test_fetch_records_denied_and_not_found(self):
+        responses = {
+            "https://shop.ex.com/missing": FakeStreamResponse(b"", status_code=404),
+            "https://shop.ex.com/denied": FakeStreamResponse(b"", status_code=403),
+        }
+        scraper = mock.Mock()
+        scraper.get.side_effect = lambda url, **kw: responses[url]
+        pool = og_sessions.SessionPool(factory=lambda: scraper)
+        with mock.patch.object(og_sessions, "get_pool", return_value=pool):
+            og._fetch_og("https://shop.ex.com/missing")
+            self.assertIsNone(cache.get(og_breaker._state_key(self.host)))
+            for _ in range(3):
+                og._fetch_og("https://shop.ex.com/denied")
+        self.assertEqual(og_breaker.state(self.host), og_breaker.OPEN)
+
+    @override_settings(OG_BREAKER_THRESHOLD=1000)
+    def test_concurrent_failures_are_all_counted(self):
+        start = threading.Barrier(8)
+
+        def fail():
+            start.wait()
+            for _ in range(25):
+                og_breaker.record_failure(self.host)
+
+        threads = [threading.Thread(target=fail) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(cache.get(og_breaker._failures_key(self.host)), 200)
+
+    def test_check_warns_about_non_atomic_og_cache(self):
+        self.assertEqual(checks.og_cache_is_atomic(None), [])
+        file_cache = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache"}
+        with override_settings(CACHES={"default": file_cache}):
+            warnings = checks.og_cache_is_atomic(None)
+        self.assertEqual([w.id for w in warnings], ["lists.W001"])
+
+
+@override_settings(OG_CACHE_ALIAS="default", OG_FLIGHT_POLL_INTERVAL=0.01)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_requests_share_one_fetch(self):
+        data = {"title": "Phone"}
+        started = threading.Event()
+
+        def slow_fetch(url):
+            started.set()
+            time.sleep(0.2)
+            return data, og_cache.STATUS_OK
+
+        results = []
+        with mock.patch.object(og, "_fetch_og", side_effect=slow_fetch) as f:
+            threads = [
+                threading.Thread(
+                    target=lambda: results.append(og.enrich_from_url("https://ex.com/p#x"))
+                )
+                for _ in range(5)
+            ]
+            threads[0].start()
+            started.wait(1)
+            for t in threads[1:]:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(f.call_count, 1)
+        self.assertEqual(results, [data] * 5)
+
+    def test_waits_for_fetch_in_another_process(self):
+        url = "https://ex.com/p"
+        key = og_cache.url_key(url)
+        cache.add(f"{key}:lock", "other-process", 15)
+        threading.Timer(
+            0.05, og_cache.store, args=(url, "ex.com", {"title": "Remote"}, og_cache.STATUS_OK)
+        ).start()
+        with mock.patch.object(og_cache, "lookup", return_value=None):
+            with mock.patch.object(og, "_fetch_og") as f:
+                self.assertEqual(og.enrich_from_url(url), {"title": "Remote"})
+        f.assert_not_called()
+
+    def test_fetches_itself_when_other_process_gives_up(self):
+        url = "https://ex.com/p"
+        key = og_cache.url_key(url)
+        cache.add(f"{key}:lock", "other-process", 15)
+        threading.Timer(0.05, cache.delete, args=(f"{key}:lock",)).start()
+        with mock.patch.object(og, "_fetch_og", return_value=({"title": "Own"}, "ok")) as f:
+            self.assertEqual(og.enrich_from_url(url), {"title": "Own"})
+        self.assertEqual(f.call_count, 1)
+        self.assertIsNone(cache.get(f"{key}:lock"))
+
+
+class EnrichManyTests(SimpleTestCase):
+    def test_results_keep_input_order_and_run_in_parallel(self):
+        def fake(url):
+            time.sleep(0.2)
+            return {"title": url.rsplit("/", 1)[-1]}
+
+        urls = [f"https://shop{i}.ex.com/{i}" for i in range(6)]
+        with mock.patch.object(og_batch, "enrich_from_url", side_effect=fake):
+            started = time.monotonic()
+            res = og_batch.enrich_many(urls, max_workers=6, per_host=1, deadline=5)
+            elapsed = time.monotonic() - started
+        self.assertEqual(list(res), urls)
+        self.assertEqual(res[urls[3]], {"title": "3"})
+        self.assertLess(elapsed, 0.2 * len(urls) / 2)
+
+    def test_per_host_limit(self):
+        active, peak = Counter(), Counter()
+        lock = threading.Lock()
+
+        def fake(url):
+            host = url.split("/")[2]
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.05)
+            with lock:
+                active[host] -= 1
+            return {}
+
+        urls = [f"https://one.ex.com/{i}" for i in range(6)] + ["https://two.ex.com/1"]
+        with mock.patch.object(og_batch, "enrich_from_url", side_effect=fake):
+            og_batch.enrich_many(urls, max_workers=8, per_host=2, deadline=5)
+        self.assertEqual(peak["one.ex.com"], 2)
+
+    def test_deadline_returns_empty_for_slow_urls(self):
+        def fake(url):
+            if "slow" in url:
+                time.sleep(1)
+            return {"title": "ok"}
+
+        with mock.patch.object(og_batch, "enrich_from_url", side_effect=fake):
+            res = og_batch.enrich_many(
+                ["https://a.ex.com/fast", "https://b.ex.com/slow"], deadline=0.3
+            )
+        self.assertEqual(res["https://a.ex.com/fast"], {"title": "ok"})
+        self.assertEqual(res["https://b.ex.com/slow"], {})
+
+
+class SessionPoolTests(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        return og_sessions.SessionPool(factory=mock.MagicMock, **kwargs)
+
+    def test_session_is_reused_per_host(self):
+        pool = self.make_pool()
+        with pool.session("shop.ex.com") as first:
+            pass
+        with pool.session("shop.ex.com") as second:
+            pass
+        with pool.session("other.ex.com") as third:
+            pass
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+
+    def test_concurrent_users_get_distinct_sessions(self):
+        pool = self.make_pool()
+        with pool.session("shop.ex.com") as a, pool.session("shop.ex.com") as b:
+            self.assertIsNot(a, b)
+        self.assertEqual(len(pool), 2)
+
+    def test_size_is_bounded(self):
+        pool = self.make_pool(max_size=2)
+        sessions = {}
+        for host in ("a", "b", "c"):
+            with pool.session(host) as sess:
+                sessions[host] = sess
+        self.assertEqual(len(pool), 2)
+        # least recently used host is evicted and its session closed
+        sessions["a"].close.assert_called_once()
+        sessions["c"].close.assert_not_called()
+
+    def test_idle_sessions_are_evicted(self):
+        pool = self.make_pool(max_idle=0)
+        with pool.session("a") as first:
+            pass
+        time.sleep(0.01)
+        with pool.session("a") as second:
+            pass
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+
+
+class FakeStreamResponse:
+    def __init__(self, body: bytes, content_type="text/html", chunk=1024, status_code=200):
+        self.body = body
+        self.chunk = chunk
+        self.headers = {"Content-Type": content_type}
+        self.encoding = "ISO-8859-1"
+        self.consumed = 0
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), self.chunk):
+            part = self.body[i : i + self.chunk]
+            self.consumed += len(part)
+            yield part
+
+
+class ReadHtmlTests(SimpleTestCase):
+    HEAD = (
+        "<html><head><title>Кофемолка</title>" '<meta property="og:title" content="Grinder"></head>'
+    ).encode()
+
+    def test_stops_after_head(self):
+        resp = FakeStreamResponse(self.HEAD + b"<body>" + b"x" * 500_000 + b"</body></html>")
+        html = og._read_html(resp)
+        self.assertIn("og:title", html)
+        self.assertLess(resp.consumed, 4096)
+
+    def test_full_body_reads_past_head_up_to_cap(self):
+        resp = FakeStreamResponse(self.HEAD + b"<body>" + b"x" * 50_000 + b"</body>")
+        with override_settings(OG_MAX_BODY_BYTES=10_000):
+            html = og._read_html(resp, full_body=True)
+        self.assertEqual(len(html.encode()), 10_000)
+
+    def test_head_cap_without_head_end(self):
+        resp = FakeStreamResponse(b"<html>" + b"y" * 100_000)
+        with override_settings(OG_MAX_HEAD_BYTES=8192):
+            html = og._read_html(resp)
+        self.assertEqual(len(html), 8192)
+
+    def test_charset_from_meta_when_header_has_none(self):
+        resp = FakeStreamResponse(b'<meta charset="utf-8">' + self.HEAD)
+        self.assertIn("Кофемолка", og._read_html(resp))
+
+    def test_charset_from_header_wins(self):
+        body = "<head><title>Čaj</title></head>".encode("cp1250")
+        resp = FakeStreamResponse(body, content_type="text/html; charset=windows-1250")
+        resp.encoding = "windows-1250"
+        self.assertIn("Čaj", og._read_html(resp))
+
+
+class ExtractorTests(SimpleTestCase):
+    URL = "https://shop.example.com/p/1"
+    SNIPPETS = [
+        "",
+        "<title><b>Bold</b></title>",
+        "<title>a<!--x-->b</title>",
+        "<title><!--only comment--></title>",
+        "<title>   </title><meta name=description content=d>",
+        '<meta property="og:title" content=""><meta name="twitter:title" content="T">',
+        '<meta property="og:title" content="A &amp; B"><meta property="og:title" content="C">',
+        '<meta name="twitter:image" content="/rel.png"><meta property="og:image" content="x">',
+    ]
+
+    def backends(self):
+        return sorted(og_extract.BACKENDS)
+
+    def test_backends_match_reference_on_corpus(self):
+        pages = sorted(FIXTURES.glob("*.html"))
+        self.assertTrue(pages)
+        for page in pages:
+            html = page.read_text(encoding="utf-8")
+            expected = og_extract.extract(html, self.URL, backend="bs4")
+            for backend in self.backends():
+                with self.subTest(page=page.name, backend=backend):
+                    self.assertEqual(og_extract.extract(html, self.URL, backend=backend), expected)
+
+    def test_backends_match_reference_on_edge_cases(self):
+        for html in self.SNIPPETS:
+            expected = og_extract.extract(html, self.URL, backend="bs4")
+            for backend in self.backends():
+                with self.subTest(html=html, backend=backend):
+                    self.assertEqual(og_extract.extract(html, self.URL, backend=backend), expected)
+
+    def test_priority_rules(self):
+        html = (FIXTURES / "shop_generic.html").read_text(encoding="utf-8")
+        data = og_extract.extract(html, self.URL, backend="html.parser")
+        self.assertEqual(data["title"], "Espresso Machine Pro 3000")
+        # twitter:image has priority over og:image
+        self.assertTrue(data["image_url"].endswith("espresso-3000-tw.jpg"))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            og_extract.extract("", self.URL, backend="nope")
+
+
+class EnrichWorkerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("w", "w@e.com", "pass")
+        cls.wl = Wishlist.objects.create(owner=cls.user, title="WL")
+
+    def _pending(self, url, **kwargs):
+        kwargs.setdefault("title", url)
+        return Item.objects.create(
+            wishlist=self.wl, url=url, enrichment_status=Item.ENRICH_PENDING, **kwargs
+        )
+
+    def test_drain_fills_placeholder_fields(self):
+        item = self._pending("https://ex.com/phone")
+        manual = self._pending("https://ex.com/watch", title="My watch")
+        results = {
+            item.url: ({"title": "Phone X", "image_url": "https://cdn.ex.com/x.jpg"}, "ok"),
+            manual.url: ({"title": "Watch", "image_url": "https://cdn.ex.com/w.jpg"}, "ok"),
+        }
+        with mock.patch.object(og_worker, "enrich_many", return_value=results) as f:
+            with mock.patch.object(thumbnails, "schedule") as thumbs:
+                totals = og_worker.drain()
+        f.assert_called_once()
+        self.assertEqual(totals, {Item.ENRICH_OK: 2})
+        self.assertEqual(thumbs.call_count, 2)
+
+        item.refresh_from_db()
+        self.assertEqual(item.title, "Phone X")
+        self.assertEqual(item.slug, "phone-x")
+        self.assertEqual(item.image_url, "https://cdn.ex.com/x.jpg")
+        self.assertEqual(item.enrichment_status, Item.ENRICH_OK)
+        manual.refresh_from_db()
+        self.assertEqual(manual.title, "My watch")
+        self.assertEqual(manual.image_url, "https://cdn.ex.com/w.jpg")
+
+    def test_statuses_and_retry_later(self):
+        failed = self._pending("https://ex.com/a")
+        blocked = self._pending("https://shop.ex.com/b")
+        skipped = self._pending("https://slow.ex.com/c")
+        results = {
+            failed.url: ({}, og_cache.STATUS_FAILED),
+            blocked.url: ({}, og_cache.STATUS_BLOCKED),
+            skipped.url: ({}, og_cache.STATUS_SKIPPED),
+        }
+        with mock.patch.object(og_worker, "enrich_many", return_value=results):
+            totals = og_worker.drain(batch_size=2)
+        self.assertEqual(
+            totals, {Item.ENRICH_FAILED: 1, Item.ENRICH_BLOCKED: 1, Item.ENRICH_PENDING: 1}
+        )
+        skipped.refresh_from_db()
+        self.assertTrue(skipped.is_enrichment_pending)
+        self.assertEqual(skipped.title, "Https://slow.ex.com/c")
+
+
+@override_settings(OG_CACHE_ALIAS="default")
+class StandinServerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.server = og_standin.StandinServer(seed=1).start()
+        self.addCleanup(self.server.stop)
+        env = {"HTTP_PROXY": self.server.url, "http_proxy": self.server.url, "NO_PROXY": ""}
+        patcher = mock.patch.dict(os.environ, env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(og_sessions.get_pool().clear)
+
+    def test_replays_corpus_through_fetcher(self):
+        data, status = og._fetch_og("http://www.amazon.bench/p/amazon_product")
+        self.assertEqual(status, og_cache.STATUS_OK)
+        self.assertTrue(data["title"].startswith("Kaffeemühle"))
+
+        data, status = og._fetch_og("http://shop.bench/p/shop_generic?status=503")
+        self.assertEqual((data, status), ({}, og_cache.STATUS_BLOCKED))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_latency_and_conditional_requests(self):
+        url = f"{self.server.url}/p/shop_generic"
+        started = time.monotonic()
+        first = requests.get(url + "?latency=100")
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        again = requests.get(url, headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(requests.get(f"{self.server.url}/p/nope").status_code, 404)
+        self.assertEqual(og_standin.parse_status_mix("200:9, 503"), [(200, 9), (503, 1)])
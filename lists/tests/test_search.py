@@ -0,0 +1,63 @@
+from unittest import skipIf, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from lists import search
+from lists.models import Item, Wishlist
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u = User.objects.create_user("u", "u@e.com", "p")
+        cls.by_desc = Wishlist.objects.create(
+            owner=cls.u, title="Aaa misc", description="camping gear for the summer"
+        )
+        cls.by_title = Wishlist.objects.create(owner=cls.u, title="Camping")
+        Wishlist.objects.create(owner=cls.u, title="Books")
+        Item.objects.create(wishlist=cls.by_title, title="Tent", note="two person, green")
+        Item.objects.create(wishlist=cls.by_title, title="Stove")
+
+    def setUp(self):
+        self.client.force_login(self.u)
+
+    @skipIf(connection.vendor == "postgresql", "fallback only outside PostgreSQL")
+    def test_sqlite_uses_fallback_backend(self):
+        self.assertIsInstance(search.backend_for(Wishlist.objects.all()), search.SimpleBackend)
+
+    def test_list_search_covers_description_and_ranks_title_first(self):
+        resp = self.client.get(reverse("wishlist_list"), {"q": "camping"})
+        self.assertEqual(resp.context["sort"], search.RELEVANCE)
+        self.assertEqual(list(resp.context["object_list"]), [self.by_title, self.by_desc])
+
+        resp = self.client.get(reverse("wishlist_list"), {"q": "camping", "sort": "title"})
+        self.assertEqual(list(resp.context["object_list"]), [self.by_desc, self.by_title])
+
+    def test_item_search_on_detail_page(self):
+        url = reverse("wishlist_detail", args=[self.by_title.slug])
+        resp = self.client.get(url, {"q": "green"})
+        self.assertEqual([i.title for i in resp.context["object_list"]], ["Tent"])
+        self.assertEqual(len(self.client.get(url).context["object_list"]), 2)
+
+
+@skipUnless(connection.vendor == "postgresql", "tsvector search needs PostgreSQL")
+class PostgresSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        u = User.objects.create_user("u", "u@e.com", "p")
+        cls.by_desc = Wishlist.objects.create(
+            owner=u, title="Weekend", description="new running shoes and socks"
+        )
+        cls.by_title = Wishlist.objects.create(owner=u, title="Running shoes")
+        Wishlist.objects.create(owner=u, title="Books")
+
+    def test_trigger_fills_vector_and_title_ranks_first(self):
+        qs = Wishlist.objects.all()
+        self.assertNotIsInstance(search.backend_for(qs), search.SimpleBackend)
+        found = search.search(qs, "running shoes").order_by("-search_rank")
+        self.assertEqual(list(found), [self.by_title, self.by_desc])
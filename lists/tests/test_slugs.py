@@ -0,0 +1,90 @@
+from collections import defaultdict
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from lists import slugs
+from lists.models import Item, Wishlist, short_hash
+
+User = get_user_model()
+
+
+def _selects(queries):
+    return [q for q in queries if q["sql"].startswith("SELECT")]
+
+
+class SlugAllocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = User.objects.create_user("u1", "u1@e.com", "p")
+        cls.u2 = User.objects.create_user("u2", "u2@e.com", "p")
+        cls.wl = Wishlist.objects.create(owner=cls.u1, title="Gifts")
+
+    def test_wishlist_keeps_hash_suffix_scheme(self):
+        first = Wishlist.objects.create(owner=self.u1, title="Birthday")
+        second = Wishlist.objects.create(owner=self.u2, title="Birthday")
+        self.assertEqual(first.slug, "birthday")
+        self.assertEqual(second.slug, f"birthday-{short_hash(self.u2.pk, 'Birthday')}")
+
+    def test_item_collisions_cost_one_query(self):
+        for _ in range(10):
+            Item.objects.create(wishlist=self.wl, title="Socks")
+        item = Item(wishlist=self.wl, title="Socks")
+        with CaptureQueriesContext(connection) as queries:
+            item.save(validation=Item.VALIDATE_FAST)
+        self.assertEqual(item.slug, "socks-11")
+        self.assertEqual(len(_selects(queries)), 1)
+
+    def test_retry_when_slug_taken_concurrently(self):
+        Item.objects.create(wishlist=self.wl, title="Socks")
+        item = Item(wishlist=self.wl, title="Socks")
+        # первый выбор не видит «параллельно» созданную строку
+        with mock.patch.object(slugs, "_taken", side_effect=[defaultdict(set)]):
+            item.slug = slugs.allocate(item)
+        self.assertEqual(item.slug, "socks")
+        slugs.save_retrying(item, lambda: Item.objects.bulk_create([item]))
+        self.assertEqual(item.slug, "socks-2")
+
+    def test_bulk_assign_avoids_db_and_batch_duplicates(self):
+        Item.objects.create(wishlist=self.wl, title="Socks")
+        other = Wishlist.objects.create(owner=self.u1, title="Other")
+        batch = [Item(wishlist=self.wl, title="Socks") for _ in range(3)]
+        batch.append(Item(wishlist=other, title="Socks"))
+        with CaptureQueriesContext(connection) as queries:
+            created = slugs.bulk_create(Item, batch)
+        self.assertEqual([i.slug for i in created], ["socks-2", "socks-3", "socks-4", "socks"])
+        self.assertEqual(len(_selects(queries)), 1)
+
+
+class SlugRetryAutocommitTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("u1", "u1@e.com", "p")
+        self.wl = Wishlist.objects.create(owner=self.user, title="Gifts")
+
+    def test_top_level_create_takes_no_savepoint(self):
+        item = Item(wishlist=self.wl, title="Socks")
+        with CaptureQueriesContext(connection) as queries:
+            item.save(validation=Item.VALIDATE_FAST)
+        self.assertFalse([q for q in queries if "SAVEPOINT" in q["sql"]])
+
+    def test_retry_reruns_whole_transaction(self):
+        Item.objects.create(wishlist=self.wl, title="Socks")
+        item = Item(wishlist=self.wl, title="Socks")
+        real_taken = slugs._taken
+        calls = []
+
+        def taken(*args, **kwargs):
+            # первый выбор не видит «параллельно» созданную строку
+            calls.append(args)
+            return defaultdict(set) if len(calls) == 1 else real_taken(*args, **kwargs)
+
+        with mock.patch.object(slugs, "_taken", side_effect=taken):
+            with CaptureQueriesContext(connection) as queries:
+                item.save(validation=Item.VALIDATE_FAST)
+        self.assertEqual(item.slug, "socks-2")
+        self.assertFalse([q for q in queries if "SAVEPOINT" in q["sql"]])
+        self.wl.refresh_from_db()
+        self.assertEqual(self.wl.item_count, 2)
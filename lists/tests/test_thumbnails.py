@@ -0,0 +1,109 @@
+import io
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from lists import thumbnails
+from lists.models import Item, Wishlist
+
+User = get_user_model()
+
+
+def make_image(size=(1200, 800), mode="RGB", fmt="JPEG"):
+    buf = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30) if mode == "RGB" else (200, 30, 30, 128)).save(buf, fmt)
+    return buf.getvalue()
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("t", "t@e.com", "pass")
+        cls.wl = Wishlist.objects.create(owner=cls.user, title="WL")
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        overrides = override_settings(THUMB_ROOT=self.root, THUMB_WIDTHS=(160, 320, 640))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_render_writes_all_widths_and_formats(self):
+        key = thumbnails.render(make_image())
+        files = sorted(p.name for p in Path(self.root).iterdir())
+        self.assertEqual(len(files), 6)
+        with Image.open(Path(self.root) / f"{key}-320.webp") as img:
+            self.assertEqual(img.size, (320, 213))
+        # то же содержимое — тот же ключ, повторно не обрабатываем
+        with mock.patch.object(thumbnails, "_write_atomic") as write:
+            self.assertEqual(thumbnails.render(make_image()), key)
+        write.assert_not_called()
+
+    def test_small_and_transparent_images(self):
+        key = thumbnails.render(make_image(size=(100, 50), mode="RGBA", fmt="PNG"))
+        with Image.open(Path(self.root) / f"{key}-640.jpg") as img:
+            self.assertEqual((img.size, img.mode), ((100, 50), "RGB"))
+
+    def test_build_many_records_result_per_item(self):
+        ok = Item.objects.create(wishlist=self.wl, title="A", image_url="https://cdn.ex.com/a.jpg")
+        bad = Item.objects.create(wishlist=self.wl, title="B", image_url="https://cdn.ex.com/b.jpg")
+        images = {ok.image_url: make_image(), bad.image_url: b"not an image"}
+        with mock.patch.object(thumbnails, "download", side_effect=images.get):
+            self.assertEqual(thumbnails.build_many([ok, bad]), 1)
+        ok.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertTrue(ok.has_thumbnail)
+        self.assertEqual((bad.thumb_key, bad.thumb_source), ("", bad.image_url))
+
+        # после смены картинки старое превью не используется
+        ok.image_url = "https://cdn.ex.com/new.jpg"
+        self.assertFalse(ok.has_thumbnail)
+
+    def test_template_filters_and_view(self):
+        item = Item.objects.create(
+            wishlist=self.wl, title="A", image_url="https://cdn.ex.com/a.jpg"
+        )
+        tpl = Template('{% load thumbs %}{{ item|thumb_src }}|{{ item|thumb_srcset:"jpg" }}')
+        self.assertEqual(tpl.render(Context({"item": item})), "https://cdn.ex.com/a.jpg|")
+
+        with mock.patch.object(thumbnails, "download", return_value=make_image()):
+            thumbnails.build_for_item(item)
+        src, srcset = tpl.render(Context({"item": item})).split("|")
+        self.assertEqual(src, f"/thumbs/{item.thumb_key}-320.jpg")
+        self.assertIn(f"/thumbs/{item.thumb_key}-640.jpg 640w", srcset)
+
+        resp = self.client.get(src)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", resp["Cache-Control"])
+        resp.close()
+        self.assertEqual(self.client.get("/thumbs/..%2Fsettings.py").status_code, 404)
+
+    def test_item_form_schedules_thumbnail_on_commit(self):
+        self.client.force_login(self.user)
+        url = reverse("item_create", args=[self.wl.slug])
+        data = {"title": "Lamp", "image_url": "https://cdn.ex.com/lamp.jpg"}
+        with mock.patch.object(thumbnails, "_pool", InlineExecutor()):
+            with mock.patch.object(thumbnails, "download", return_value=make_image()) as dl:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.post(url, data)
+                item = Item.objects.get(wishlist=self.wl)
+                self.assertTrue(item.has_thumbnail)
+
+                # сохранение без смены картинки превью не пересобирает
+                item.note = "blue"
+                with self.captureOnCommitCallbacks(execute=True):
+                    item.save()
+        dl.assert_called_once_with("https://cdn.ex.com/lamp.jpg")
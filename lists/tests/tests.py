@@ -1,9 +1,11 @@
 # tests.py
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.db import IntegrityError, transaction
-from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from lists.forms import ItemForm, WishlistForm
@@ -239,6 +241,81 @@ class WishlistTests(TestCase):
         content = resp.content.decode()
         self.assertLess(content.index("Alpha"), content.index("Beta"))
 
+    def test_item_writes_touch_parent_once_per_transaction(self):
+        wl = Wishlist.objects.create(owner=self.user, title="Alpha")
+        Wishlist.objects.filter(pk=wl.pk).update(updated_at="2020-01-01T00:00:00Z")
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            for i in range(5):
+                Item.objects.create(wishlist=wl, title=f"Item {i}")
+            Item.objects.filter(wishlist=wl).first().delete()
+        wl.refresh_from_db()
+        self.assertEqual(wl.updated_at.year, 2020)  # до коммита родитель не трогаем
+
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        touches = [q for q in queries if q["sql"].startswith('UPDATE "lists_wishlist"')]
+        self.assertEqual(len(touches), 1)
+        wl.refresh_from_db()
+        self.assertGreater(wl.updated_at.year, 2020)
+
+    def test_touch_from_rolled_back_savepoint_does_not_swallow_later_ones(self):
+        wl = Wishlist.objects.create(owner=self.user, title="Alpha")
+        Wishlist.objects.filter(pk=wl.pk).update(updated_at="2020-01-01T00:00:00Z")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Item.objects.create(wishlist=wl, title="Rolled back")
+                # чужая ссылка на колбэки (как у debug toolbar) ничего не меняет
+                held = list(connection.run_on_commit)
+                raise RuntimeError
+            Item.objects.create(wishlist=wl, title="Kept")
+        self.assertTrue(held)
+        wl.refresh_from_db()
+        self.assertGreater(wl.updated_at.year, 2020)
+
+    def test_item_save_validation_modes(self):
+        wl = Wishlist.objects.create(owner=self.user, title="Alpha")
+        with self.assertRaises(ValidationError):
+            Item(wishlist=wl, title="Bad", url="http://insecure.example").save()
+
+        item = Item(wishlist=wl, title="Fast", url="https://shop.example/p/1")
+        with CaptureQueriesContext(connection) as queries:
+            item.save(validation=Item.VALIDATE_FAST)
+        # проверка слага, INSERT и приращение счётчиков — без запросов full_clean()
+        sql = [q["sql"] for q in queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(len(sql), 3)
+
+        with self.assertRaises(ValueError):
+            item.save(validation="none")
+
+
+class TouchAutocommitTests(TransactionTestCase):
+    def test_failed_insert_does_not_touch_parent(self):
+        user = User.objects.create_user("u", "u@e.com", "pass")
+        wl = Wishlist.objects.create(owner=user, title="Alpha")
+        Item.objects.create(wishlist=wl, title="A")
+        Wishlist.objects.filter(pk=wl.pk).update(updated_at="2020-01-01T00:00:00Z")
+
+        with self.assertRaises(IntegrityError):
+            Item(wishlist=wl, title="B", slug="a").save(validation=Item.VALIDATE_FAST)
+        wl.refresh_from_db()
+        self.assertEqual(wl.updated_at.year, 2020)
+
+    def test_bulk_add_commits_rows_separately_and_touches_parent_once(self):
+        user = User.objects.create_user("u", "u@e.com", "pass")
+        wl = Wishlist.objects.create(owner=user, title="Alpha")
+        self.client.force_login(user)
+        urls = "\n".join(f"https://ex.com/{i}" for i in range(3))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse("items_bulk_add", args=[wl.slug]), {"urls_text": urls})
+        self.assertEqual(Item.objects.filter(wishlist=wl).count(), 3)
+        touches = [
+            q for q in queries if q["sql"].startswith('UPDATE "lists_wishlist" SET "updated_at"')
+        ]
+        self.assertEqual(len(touches), 1)
+
 
 class WishlistViewsTests(TestCase):
     @classmethod
@@ -376,9 +453,12 @@ class BulkAddTests(TestCase):
         }
         resp = self.client.post(url, payload, follow=True)
         self.assertEqual(resp.status_code, 200)
-        self.assertEqual(Item.objects.filter(wishlist=self.wl).count(), 1)
+        # Метаданные не загружаются в запросе: товары ждут enrich_items
+        items = Item.objects.filter(wishlist=self.wl)
+        self.assertEqual(items.count(), 3)
+        self.assertFalse(items.exclude(enrichment_status=Item.ENRICH_PENDING).exists())
         content = resp.content.decode()
-        self.assertIn("Created: 1", content)
+        self.assertIn("Created: 3", content)
         self.assertIn("missed", content)
         self.assertIn("Incorrect URL", content)
         self.assertIn("Already exists", content)
@@ -446,6 +526,21 @@ class ImportCSVTests(TestCase):
         self.assertEqual(Item.objects.filter(wishlist=self.wl).count(), 2)
         self.assertContains(resp2, "Created")
 
+    def test_deferred_row_without_title_waits_for_enrichment(self):
+        self.client.force_login(self.user)
+        start = reverse("items_import", args=[self.wl.slug])
+        csv = make_csv("url,title,image_url\nhttps://ex.com/a,,https://ex.com/a.jpg\n")
+        resp = self.client.post(start, {"file": csv}, follow=True)
+        map_url = resp.request["PATH_INFO"]
+
+        self.client.post(
+            map_url, {"url_col": "url", "title_col": "title", "image_col": "image_url"}
+        )
+        item = Item.objects.get(wishlist=self.wl)
+        # ссылка вместо названия — временная: товар ждёт enrich_items
+        self.assertTrue(item.has_placeholder_title())
+        self.assertEqual(item.enrichment_status, Item.ENRICH_PENDING)
+
     def test_invalid_url_row_is_skipped(self):
         self.client.force_login(self.user)
         start = reverse("items_import", args=[self.wl.slug])
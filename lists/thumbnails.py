@@ -0,0 +1,184 @@
+"""
+Локальные превью картинок товаров.
+
+Карточки раньше показывали image_url напрямую с CDN магазина — часто это
+многомегабайтные фото. Здесь картинка скачивается один раз, Pillow делает
+WebP и JPEG нескольких фиксированных ширин (THUMB_WIDTHS), файлы называются
+по хэшу содержимого (<key>-<width>.<ext>) и отдаются с вечным кэшем.
+Одинаковая картинка у разных товаров обрабатывается один раз.
+
+Новую картинку товара обрабатывает фоновый пул после коммита сохранения
+(schedule, см. signals.item_thumbnail); manage.py build_thumbnails — для
+товаров, сохранённых раньше.
+"""
+
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.db import connection, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from lists import og_sessions
+from lists.audit import log_event
+from lists.pools import BackgroundPool, setting
+
+FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpg": ("JPEG", {"quality": 82})}
+NAME_RE = re.compile(r"^(?P<key>[0-9a-f]{32})-(?P<width>\d+)\.(?P<ext>webp|jpg)$")
+
+
+def widths():
+    return tuple(setting("THUMB_WIDTHS", (160, 320, 640)))
+
+
+def root() -> Path:
+    return Path(setting("THUMB_ROOT", Path(settings.BASE_DIR) / "media" / "thumbs"))
+
+
+def file_name(key: str, width: int, ext: str) -> str:
+    return f"{key}-{width}.{ext}"
+
+
+def url(key: str, width: int, ext: str) -> str:
+    return f"{setting('THUMB_URL', '/thumbs/')}{file_name(key, width, ext)}"
+
+
+def srcset(key: str, ext: str) -> str:
+    return ", ".join(f"{url(key, w, ext)} {w}w" for w in widths())
+
+
+def download(image_url: str) -> bytes:
+    """Скачать картинку, не больше THUMB_MAX_SOURCE_BYTES."""
+    cap = setting("THUMB_MAX_SOURCE_BYTES", 15 * 1024 * 1024)
+    host = (urlparse(image_url).netloc or "unknown").lower()
+    with og_sessions.get_pool().session(host) as scraper:
+        with scraper.get(image_url, timeout=10, stream=True) as resp:
+            resp.raise_for_status()
+            buf = bytearray()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                buf += chunk
+                if len(buf) > cap:
+                    raise ValueError(f"image larger than {cap} bytes")
+    return bytes(buf)
+
+
+def render(data: bytes) -> str:
+    """Сделать превью всех ширин и форматов; возвращает ключ (хэш содержимого)."""
+    key = hashlib.sha256(data).hexdigest()[:32]
+    target = root()
+    names = [file_name(key, w, ext) for w in widths() for ext in FORMATS]
+    if all((target / n).exists() for n in names):
+        return key
+
+    with Image.open(io.BytesIO(data)) as src:
+        # JPEG можно декодировать сразу в уменьшенном масштабе — в разы быстрее
+        src.draft("RGB", (max(widths()), max(widths())))
+        img = ImageOps.exif_transpose(src)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        target.mkdir(parents=True, exist_ok=True)
+        src_w, src_h = img.size
+        # От большей ширины к меньшей: каждое следующее уменьшение из предыдущего
+        for width in sorted(widths(), reverse=True):
+            if width < img.width:
+                height = max(1, round(src_h * width / src_w))
+                img = img.resize((width, height), Image.LANCZOS)
+            for ext, (fmt, options) in FORMATS.items():
+                _write_atomic(target / file_name(key, width, ext), img, fmt, options)
+    return key
+
+
+def _write_atomic(path: Path, img, fmt, options):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            img.save(fh, fmt, **options)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def build(image_url: str) -> str:
+    """Скачать и обработать картинку; "" при ошибке. Не трогает БД — можно звать из потоков."""
+    start = time.monotonic()
+    try:
+        key = render(download(image_url))
+    except (
+        requests.RequestException,
+        UnidentifiedImageError,
+        Image.DecompressionBombError,
+        OSError,
+        ValueError,
+    ) as e:
+        log_event("thumb.error", None, None, url=image_url[:200], err=str(e)[:100])
+        return ""
+    log_event("thumb.ok", None, None, key=key, ms=int((time.monotonic() - start) * 1000))
+    return key
+
+
+def _store(pk, image_url, key):
+    from lists.models import Item
+
+    # Неудача тоже запоминается (thumb_source), чтобы backfill не повторял её бесконечно.
+    # Фильтр по image_url: пока качали, картинку могли поменять — тогда превью не наше.
+    Item.objects.filter(pk=pk, image_url=image_url).update(thumb_key=key, thumb_source=image_url)
+
+
+def _save(item, image_url, key):
+    _store(item.pk, image_url, key)
+    item.thumb_key, item.thumb_source = key, image_url
+
+
+def build_for_item(item) -> bool:
+    """Построить превью для item.image_url и записать thumb_key/thumb_source."""
+    key = build(item.image_url)
+    _save(item, item.image_url, key)
+    return bool(key)
+
+
+def build_many(items, max_workers=None) -> int:
+    """Превью для нескольких товаров: загрузки параллельно, запись в БД — в текущем потоке."""
+    items = [i for i in items if i.image_url]
+    if not items:
+        return 0
+    urls = list(dict.fromkeys(i.image_url for i in items))
+    max_workers = max_workers or setting("THUMB_MAX_WORKERS", 4)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbs") as pool:
+        keys = dict(zip(urls, pool.map(build, urls)))
+    for item in items:
+        _save(item, item.image_url, keys[item.image_url])
+    return sum(1 for item in items if item.thumb_key)
+
+
+_pool = BackgroundPool("thumbs-bg", "THUMB_MAX_WORKERS", 4)
+
+
+def schedule(item):
+    """После коммита построить превью item.image_url в фоновом пуле."""
+    pk, image_url = item.pk, item.image_url
+    transaction.on_commit(lambda: _pool.submit(_build_later, pk, image_url))
+
+
+def _build_later(pk, image_url):
+    try:
+        _store(pk, image_url, build(image_url))
+    finally:
+        # У потока пула нет цикла запроса, который закрыл бы его соединение с БД
+        # (в тестах задача выполняется на месте, внутри транзакции теста)
+        if not connection.in_atomic_block:
+            connection.close()
@@ -15,6 +15,7 @@ from .views_front import (
     WishlistCreateView,
     WishlistDeleteView,
     WishlistDetailView,
+    WishlistHistoryView,
     WishlistListView,
     WishlistShareView,
     WishlistUpdateView,
@@ -49,6 +50,7 @@ urlpatterns = [
     path("s/<str:token>/", ShareTokenWishlistView.as_view(), name="wishlist_sharelink"),
     path("<slug:slug>/share/", WishlistShareView.as_view(), name="wishlist_share"),
     path("<slug:slug>/access/", WishlistAccessManageView.as_view(), name="wishlist_access"),
+    path("<slug:slug>/history/", WishlistHistoryView.as_view(), name="wishlist_history"),
     path("og/preview/", og_preview, name="og_preview"),
     path("<slug:slug>/", WishlistDetailView.as_view(), name="wishlist_detail"),
 ]
@@ -1,6 +1,8 @@
+import datetime
 import uuid
 
 from django.contrib import messages
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.cache import cache
@@ -8,7 +10,7 @@ from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.db import IntegrityError, transaction
 from django.db.models import F
-from django.http import Http404, JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
@@ -26,6 +28,7 @@ from django.views.generic import (
 
 from WishListApp import settings
 
+from . import audit_logging, og_worker, search, thumbnails
 from .audit import log_event, mask_token
 from .forms import (
     BulkAddForm,
@@ -36,11 +39,14 @@ from .forms import (
     WishlistForm,
 )
 from .mixins import PolicyCheckMixin
-from .models import Item, Wishlist, WishlistAccess
+from .models import AuditEvent, Item, Wishlist, WishlistAccess, batched_touches
 from .og import enrich_from_url
+from .og_batch import enrich_many
 from .views import _read_csv_bytes
 
 SESSION_KEY = "csv_import_jobs"
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+BIGINT_MAX = 2**63 - 1
 wishlist_tabs = [
     {"key": "my", "label": "My", "url": reverse_lazy("wishlist_list"), "icon": "gift"},
     {
@@ -53,6 +59,23 @@ wishlist_tabs = [
 friends_tabs = []
 
 
+def _item_page(request, wishlist, per_page) -> dict:
+    """Страница товаров вишлиста; ?q= — поиск по названию и заметке (lists.search)."""
+    items = wishlist.items.order_by("created_at", "pk")
+    q = request.GET.get("q", "").strip()
+    if q:
+        items = search.search(items, q).order_by("-search_rank", "created_at", "pk")
+    paginator = Paginator(items, per_page)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    return {
+        "paginator": paginator,
+        "page_obj": page_obj,
+        "is_paginated": page_obj.has_other_pages(),
+        "object_list": page_obj.object_list,
+        "q": q,
+    }
+
+
 @method_decorator(login_required, name="dispatch")
 class WishlistListView(ListView):
     model = Wishlist
@@ -67,19 +90,14 @@ class WishlistListView(ListView):
     }
 
     def get_queryset(self):
-        qs = Wishlist.objects.filter(owner=self.request.user)
-        q = self.request.GET.get("q")
-        sort = self.request.GET.get("sort", "-created")
-        order_by = self.ORDERING_MAP.get(sort, "-created_at")
-        if q:
-            qs = qs.filter(title__icontains=q)
-
-        return qs.order_by(order_by)
+        # счётчики уже в строке вишлиста, суммы по валютам — одним запросом на страницу
+        qs = Wishlist.objects.filter(owner=self.request.user).prefetch_related("price_totals")
+        q, sort = search.list_params(self.request)
+        return search.search_sorted(qs, q, sort, self.ORDERING_MAP)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["q"] = self.request.GET.get("q", "")
-        ctx["sort"] = self.request.GET.get("sort", "-created")
+        ctx["q"], ctx["sort"] = search.list_params(self.request)
         ctx["tabs"] = wishlist_tabs
         return ctx
 
@@ -99,18 +117,14 @@ class SharedWithMeListView(LoginRequiredMixin, ListView):
         qs = (
             Wishlist.objects.filter(accesses__user=self.request.user)
             .select_related("owner")
-            .order_by("-last_viewed_at", "title")
             .distinct()
         )
-        q = self.request.GET.get("q")
-        sort = self.request.GET.get("sort", "-created")
-        order_by = self.ORDERING_MAP.get(sort, "-created_at")
-        if q:
-            qs = qs.filter(title__icontains=q)
-        return qs.order_by(order_by)
+        q, sort = search.list_params(self.request)
+        return search.search_sorted(qs, q, sort, self.ORDERING_MAP)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
+        ctx["q"], ctx["sort"] = search.list_params(self.request)
         ctx["tabs"] = wishlist_tabs
         return ctx
 
@@ -194,17 +208,7 @@ class PublicWishlistView(PolicyCheckMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        items = self.object.items.all()
-        paginator = Paginator(items, self.paginate_by)
-        page_obj = paginator.get_page(self.request.GET.get("page"))
-        context.update(
-            {
-                "paginator": paginator,
-                "page_obj": page_obj,
-                "is_paginated": page_obj.has_other_pages(),
-                "object_list": page_obj.object_list,
-            }
-        )
+        context.update(_item_page(self.request, self.object, self.paginate_by))
         return context
 
 
@@ -221,17 +225,7 @@ class ShareTokenWishlistView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        items = self.object.items.all()
-        paginator = Paginator(items, self.paginate_by)
-        page_obj = paginator.get_page(self.request.GET.get("page"))
-        context.update(
-            {
-                "paginator": paginator,
-                "page_obj": page_obj,
-                "is_paginated": page_obj.has_other_pages(),
-                "object_list": page_obj.object_list,
-            }
-        )
+        context.update(_item_page(self.request, self.object, self.paginate_by))
         return context
 
 
@@ -246,17 +240,7 @@ class WishlistDetailView(LoginRequiredMixin, PolicyCheckMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        items = self.object.items.all()
-        paginator = Paginator(items, self.paginate_by)
-        page_obj = paginator.get_page(self.request.GET.get("page"))
-        context.update(
-            {
-                "paginator": paginator,
-                "page_obj": page_obj,
-                "is_paginated": page_obj.has_other_pages(),
-                "object_list": page_obj.object_list,
-            }
-        )
+        context.update(_item_page(self.request, self.object, self.paginate_by))
         return context
 
 
@@ -348,10 +332,14 @@ class ItemCreateView(LoginRequiredMixin, PolicyCheckMixin, CreateView):
     def form_valid(self, form):
         form.instance.wishlist = self.wishlist
         form.instance.created_by = self.request.user
+        if og_worker.deferred_enabled() and form.instance.url and not form.instance.image_url:
+            # Превью в форме не успело или не смогло — картинку дозагрузит enrich_items
+            form.instance.enrichment_status = Item.ENRICH_PENDING
         try:
             obj = form.save(commit=False)
             obj._last_actor = self.request.user
-            obj.save()
+            # ItemForm уже всё проверил — повторный full_clean только добавил бы запросы
+            obj.save(validation=Item.VALIDATE_FAST)
             messages.success(self.request, "Item created.")
             return super().form_valid(form)
         except ValidationError as e:
@@ -392,7 +380,7 @@ class ItemUpdateView(LoginRequiredMixin, PolicyCheckMixin, UpdateView):
         form.instance.wishlist_id = self.get_object().wishlist_id
         obj = form.save(commit=False)
         obj._last_actor = self.request.user
-        obj.save()
+        obj.save(validation=Item.VALIDATE_FAST)
         messages.success(self.request, "Item updated.")
         return super().form_valid(form)
 
@@ -447,40 +435,52 @@ class BulkAddView(LoginRequiredMixin, FormView):
         existing_urls = set(
             Item.objects.filter(wishlist=self.wishlist).values_list("url", flat=True)
         )
-        for lineno, url in urls:
-            if url in existing_urls:
-                skipped += 1
-                results.append((lineno, url, "skip", "Already exists"))
-                continue
-
-            data = {}
-            try:
-                data = enrich_from_url(url) or {}
-            except Exception:
-                data = {}
-            title = (data.get("title") or "").strip()
-            image_url = (data.get("image_url") or "").strip()
-
-            if title == "":
-                skipped += 1
-                results.append((lineno, url, "skip", "Title was not found."))
-
-            try:
-                with transaction.atomic():
-                    Item.objects.create(
-                        wishlist=self.wishlist,
-                        url=url,
-                        title=title,
-                        image_url=image_url,
-                        note="",
-                        created_by=self.request.user,
-                    )
-                existing_urls.add(url)
-                created += 1
-                results.append((lineno, url, "ok", "Created"))
-            except Exception as e:
-                skipped += 1
-                results.append((lineno, url, "error", f"Error while saving: {e}"))
+        deferred = og_worker.deferred_enabled()
+        enriched = {}
+        if not deferred:
+            # Загружаем метаданные всех новых ссылок параллельно, а не по одной
+            enriched = enrich_many([url for _, url in urls if url not in existing_urls])
+        # У каждой строки своя короткая транзакция: строку вишлиста (счётчики
+        # через F()) не держим заблокированной весь импорт. Склеиваем только
+        # запись audit-событий в БД и касание родителя — по разу на весь список
+        with audit_logging.hold_db_writes(), batched_touches():
+            for lineno, url in urls:
+                if url in existing_urls:
+                    skipped += 1
+                    results.append((lineno, url, "skip", "Already exists"))
+                    continue
+
+                if deferred:
+                    # Название и картинку подтянет manage.py enrich_items,
+                    # пока вместо названия ссылка
+                    title, image_url, status = url[:200], "", Item.ENRICH_PENDING
+                else:
+                    data = enriched.get(url) or {}
+                    title = (data.get("title") or "").strip()
+                    image_url = (data.get("image_url") or "").strip()
+                    status = Item.ENRICH_OK
+
+                    if title == "":
+                        skipped += 1
+                        results.append((lineno, url, "skip", "Title was not found."))
+
+                try:
+                    with transaction.atomic():
+                        Item.objects.create(
+                            wishlist=self.wishlist,
+                            url=url,
+                            title=title,
+                            image_url=image_url,
+                            note="",
+                            created_by=self.request.user,
+                            enrichment_status=status,
+                        )
+                    existing_urls.add(url)
+                    created += 1
+                    results.append((lineno, url, "ok", "Created"))
+                except Exception as e:
+                    skipped += 1
+                    results.append((lineno, url, "error", f"Error while saving: {e}"))
         for lineno, bad, msg in parse_errors:
             results.append((lineno, bad, "error", msg))
             skipped += 1
@@ -633,50 +633,79 @@ class ImportMapView(LoginRequiredMixin, FormView):
             Item.objects.filter(wishlist=self.wishlist).values_list("url", flat=True)
         )
 
-        for idx, r in enumerate(rows, start=1):
-            url = (r.get(map_url) or "").strip()
-            if not url:
-                skipped += 1
-                results.append((idx, "—", "error", "Empty URL"))
-                continue
-            if url in existing_urls:
-                skipped += 1
-                results.append((idx, url, "skip", "Already exists"))
-                continue
-
-            title = (r.get(map_title) or "").strip() if map_title else ""
-            image_url = (r.get(map_image) or "").strip() if map_image else ""
-            note = (r.get(map_note) or "").strip() if map_note else ""
-
-            if not title:
-                title = url  # fallback
-
-            data = dict(
-                wishlist=self.wishlist, url=url, title=title, image_url=image_url, note=note
-            )
-            form = ItemForm(data=data)
-
-            if not form.is_valid():
-                skipped += 1
-                results.append((idx, url, "skip", form.errors))
-                continue
-
-            try:
-                with transaction.atomic():
-                    Item.objects.create(
-                        wishlist=self.wishlist,
-                        url=url,
-                        title=title,
-                        image_url=image_url,
-                        note=note,
-                        created_by=self.request.user,
-                    )
-                existing_urls.add(url)
-                created += 1
-                results.append((idx, url, "ok", "Created"))
-            except Exception as e:
-                skipped += 1
-                results.append((idx, url, "error", f"Error during saving: {e}"))
+        deferred = og_worker.deferred_enabled()
+        enriched = {}
+        if not deferred:
+            # Строки без названия дополняем из OpenGraph — параллельно, одним батчем
+            to_enrich = []
+            for r in rows:
+                url = (r.get(map_url) or "").strip()
+                title = (r.get(map_title) or "").strip() if map_title else ""
+                if url.startswith("https://") and url not in existing_urls and not title:
+                    to_enrich.append(url)
+            enriched = enrich_many(to_enrich)
+
+        # Как в BulkAddView: транзакция на строку, общие только запись
+        # audit-событий в БД и касание родителя
+        with audit_logging.hold_db_writes(), batched_touches():
+            for idx, r in enumerate(rows, start=1):
+                url = (r.get(map_url) or "").strip()
+                if not url:
+                    skipped += 1
+                    results.append((idx, "—", "error", "Empty URL"))
+                    continue
+                if url in existing_urls:
+                    skipped += 1
+                    results.append((idx, url, "skip", "Already exists"))
+                    continue
+
+                title = (r.get(map_title) or "").strip() if map_title else ""
+                image_url = (r.get(map_image) or "").strip() if map_image else ""
+                note = (r.get(map_note) or "").strip() if map_note else ""
+
+                og = enriched.get(url) or {}
+                if not title:
+                    title = (og.get("title") or "").strip()[:200]
+                if not image_url and (og.get("image_url") or "").startswith("https://"):
+                    image_url = og["image_url"]
+
+                status = Item.ENRICH_OK
+                if deferred and url.startswith("https://") and (not title or not image_url):
+                    # недостающее заполнит enrich_items; без названия ставим ссылку,
+                    # и только pending-товар её потом заменит (has_placeholder_title)
+                    status = Item.ENRICH_PENDING
+
+                if not title:
+                    title = url  # fallback
+
+                data = dict(
+                    wishlist=self.wishlist, url=url, title=title, image_url=image_url, note=note
+                )
+                form = ItemForm(data=data)
+
+                if not form.is_valid():
+                    skipped += 1
+                    results.append((idx, url, "skip", form.errors))
+                    continue
+
+                try:
+                    with transaction.atomic():
+                        # строка уже прошла ItemForm выше
+                        Item(
+                            wishlist=self.wishlist,
+                            url=url,
+                            title=title,
+                            image_url=image_url,
+                            note=note,
+                            created_by=self.request.user,
+                            enrichment_status=status,
+                        ).save(force_insert=True, validation=Item.VALIDATE_FAST)
+                    existing_urls.add(url)
+                    created += 1
+                    results.append((idx, url, "ok", "Created"))
+                except Exception as e:
+                    skipped += 1
+                    results.append((idx, url, "error", f"Error during saving: {e}"))
 
         jobs = self.request.session.get(SESSION_KEY, {})
         jobs.pop(self.job_id, None)
@@ -714,6 +743,22 @@ def og_preview(request):
     return JsonResponse(data or {})
 
 
+@require_GET
+def thumbnail(request, name):
+    """
+    Отдать локальное превью. Имя содержит хэш содержимого, поэтому файл никогда
+    не меняется и кэшируется навсегда (в проде THUMB_ROOT лучше отдавать nginx-ом).
+    """
+    match = thumbnails.NAME_RE.match(name)
+    path = thumbnails.root() / name
+    if not match or not path.is_file():
+        raise Http404
+    content_type = "image/webp" if match["ext"] == "webp" else "image/jpeg"
+    resp = FileResponse(open(path, "rb"), content_type=content_type)
+    resp["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
+
 class WishlistAccessManageView(LoginRequiredMixin, View):
     template_name = "lists/wishlist_access.html"
 
@@ -763,3 +808,60 @@ class WishlistAccessManageView(LoginRequiredMixin, View):
         )
         messages.success(request, f"Access for {target.username} = {role}.")
         return redirect("wishlist_access", slug=wl.slug)
+
+
+class WishlistHistoryView(LoginRequiredMixin, PolicyCheckMixin, DetailView):
+    """
+    Журнал audit-событий вишлиста (владелец и staff). Keyset-пагинация по
+    (ts, id): курсор ?before=<ts в микросекундах>-<id>, без OFFSET и COUNT.
+    """
+
+    model = Wishlist
+    slug_field = "slug"
+    slug_url_kwarg = "slug"
+    template_name = "lists/wishlist_history.html"
+    policy_method_name = "can_view_history"
+    page_size = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # свежие события могут ещё лежать в буфере AuditDBHandler
+        audit_logging.flush_db()
+
+        events = AuditEvent.objects.for_wishlist(self.object.pk)
+        cursor = self._parse_cursor(self.request.GET.get("before", ""))
+        if cursor:
+            events = events.before(*cursor)
+        events = list(events[: self.page_size + 1])
+        has_more = len(events) > self.page_size
+        events = events[: self.page_size]
+
+        users = get_user_model().objects.in_bulk({e.user_id for e in events if e.user_id})
+        for e in events:
+            e.actor = users.get(e.user_id)
+
+        next_cursor = None
+        if has_more:
+            last = events[-1]
+            ts_us = (last.ts - EPOCH) // datetime.timedelta(microseconds=1)
+            next_cursor = f"{ts_us}-{last.pk}"
+        context.update(
+            {
+                "events": events,
+                "next_cursor": next_cursor,
+                "cancel_url": reverse("wishlist_detail", kwargs={"slug": self.object.slug}),
+            }
+        )
+        return context
+
+    @staticmethod
+    def _parse_cursor(raw):
+        # курсор приходит от клиента: битый или вне диапазона — первая страница
+        ts_us, _, pk = raw.partition("-")
+        if not (ts_us.isdigit() and pk.isdigit()):
+            return None
+        try:
+            ts, pk = EPOCH + datetime.timedelta(microseconds=int(ts_us)), int(pk)
+        except (OverflowError, ValueError):
+            return None
+        return (ts, pk) if pk <= BIGINT_MAX else None
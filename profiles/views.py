@@ -11,6 +11,7 @@ from django.views import View
 from django.views.generic import DetailView, UpdateView
 
 from accounts.forms import EmailChangeForm
+from lists import search
 from lists.models import Wishlist
 from profiles.forms import PrivacyForm, ProfileForm
 from profiles.models import Profile
@@ -253,14 +254,8 @@ class PublicProfileView(LoginRequiredMixin, DetailView):
             .distinct()
         )
 
-        q = self.request.GET.get("q")
-        sort = self.request.GET.get("sort", "-created")
-        order_by = self.ORDERING_MAP.get(sort, "-created_at")
-
-        if q:
-            qs = qs.filter(title__icontains=q)
-
-        return qs.order_by(order_by)
+        q, sort = search.list_params(self.request)
+        return search.search_sorted(qs, q, sort, self.ORDERING_MAP)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -279,6 +274,5 @@ class PublicProfileView(LoginRequiredMixin, DetailView):
             }
         )
 
-        context["q"] = self.request.GET.get("q", "")
-        context["sort"] = self.request.GET.get("sort", "-created")
+        context["q"], context["sort"] = search.list_params(self.request)
         return context